@@ -0,0 +1,84 @@
+"""Import-time benchmark / guard for intentcp-core.
+
+Measures cold import time of the server app and the CLI in fresh interpreters and
+fails if a heavy dependency sneaks back onto the import path.
+
+Usage:
+  python scripts/bench_import.py
+  python scripts/bench_import.py --runs 10 --budget-ms 800
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# module -> dependencies that must NOT be imported just by importing it.
+TARGETS: dict[str, tuple[str, ...]] = {
+    "intentcp_core.app": (
+        "tuya_iot",
+        "requests",
+        "rich",
+        "httpx",
+        "jinja2",
+        "intentcp_core.drivers.tuya",
+        "intentcp_core.drivers.windows_agent",
+    ),
+    "intentcp_core.cli.main": ("tuya_iot", "requests", "intentcp_core.cli.wizard", "intentcp_core.cli.validate"),
+}
+
+
+def _import_time_us(module: str) -> int:
+    """Cumulative import time of `module` (microseconds) as reported by -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.removeprefix("import time:").split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError(f"No importtime entry for {module}")
+
+
+def _loaded_modules(module: str, candidates: tuple[str, ...]) -> list[str]:
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {candidates!r} if m in sys.modules))"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    out = proc.stdout.strip()
+    return out.split(",") if out else []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if median import exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    for module, forbidden in TARGETS.items():
+        samples = [_import_time_us(module) / 1000 for _ in range(args.runs)]
+        median = statistics.median(samples)
+        leaked = _loaded_modules(module, forbidden)
+
+        status = "ok"
+        if leaked:
+            status = f"FAIL (eagerly imports: {', '.join(leaked)})"
+            failed = True
+        elif args.budget_ms is not None and median > args.budget_ms:
+            status = f"FAIL (median over {args.budget_ms:.0f} ms budget)"
+            failed = True
+
+        print(f"{module:<28} median {median:7.1f} ms  min {min(samples):7.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,17 @@ import os
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from rich import print as rich_print
 
-from .routers import control, panel, status, health
+from .config.settings import get_settings
+from .routers import control, events, panel, schedules, snapshots, status, health, telemetry
+from .services.discovery import discovery_service
+from .services.events import EventSourceMiddleware, event_log
+from .services.leader import leader_election
+from .services.push import push_ingestion
+from .services.rules import rule_engine
+from .services.scheduler import scheduler
+from .services.telemetry import telemetry_recorder
+from .services.tuya_local import tuya_local
 
 
 def create_app() -> FastAPI:
@@ -15,22 +23,61 @@ def create_app() -> FastAPI:
         version="0.1.0",
     )
 
+    # Tags event-log entries with the request that caused them.
+    app.add_middleware(EventSourceMiddleware)
+
     # Static (Admin Panel assets)
     base_dir = Path(__file__).resolve().parents[2]  # .../intentcp-core
     static_dir = base_dir / "web" / "static"
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
     # Routers
-    # status / health / panel routers define their own prefixes internally.
+    # status / health / panel / snapshots / schedules / events / telemetry routers define their own prefixes internally.
     app.include_router(status.router)
     app.include_router(health.router)
     app.include_router(panel.router)
+    app.include_router(snapshots.router)
+    app.include_router(schedules.router)
+    app.include_router(events.router)
+    app.include_router(telemetry.router)
 
     # control router is mounted under /tuya
     app.include_router(control.router, prefix="/tuya", tags=["tuya"])
 
+    # Background services run on exactly one worker (see services/leader.py);
+    # every worker can still enqueue jobs through the shared state store.
+    scheduler.set_runner(control.run_scheduled_action)
+    scheduler.set_action_runner(control.run_automation_action)
+    leader_election.register(scheduler.start, scheduler.stop)
+    rule_engine.set_runner(control.run_automation_action)
+    leader_election.register(rule_engine.start, rule_engine.stop)
+    leader_election.register(telemetry_recorder.start, telemetry_recorder.stop)
+
+    @app.on_event("startup")
+    async def _start_background_services():
+        # Settings are read here rather than at import so a fresh install (no
+        # settings.toml yet) can still boot and use the panel to create one.
+        try:
+            runtime = get_settings().runtime
+        except FileNotFoundError:
+            runtime = None
+        if runtime is not None and runtime.push_enabled:
+            leader_election.register(push_ingestion.start, push_ingestion.stop)
+        if runtime is not None and runtime.discovery_enabled:
+            leader_election.register(discovery_service.start, discovery_service.stop)
+        await leader_election.start()
+
+    @app.on_event("shutdown")
+    async def _stop_background_services():
+        await leader_election.stop()
+        await control.cancel_background_tasks()
+        tuya_local.close()
+        event_log.close()
+
     @app.on_event("startup")
     async def _startup_message():
+        from rich import print as rich_print
+
         host = os.getenv("HOST", "127.0.0.1")
         # Uvicorn commonly uses PORT; fall back to 8000 if not set
         port = os.getenv("PORT") or os.getenv("UVICORN_PORT") or "8000"
@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
+import copy
+import re
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-import tomllib
 import typer
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.prompt import Prompt, Confirm
 
+from ..config.service import config_file
+from ..config.toml_edit import TomlDocument, toml_value, values_equal
 from .io import default_devices_path
 
 app = typer.Typer(help="Manage IntentCP devices.toml (alias-based device registry).")
@@ -21,78 +25,67 @@ console = Console()
 
 
 def _read_toml(path: Path) -> Dict[str, Any]:
-    if not path.exists():
-        return {}
-    raw = path.read_bytes()
-    if not raw:
-        return {}
-    return tomllib.loads(raw.decode("utf-8"))
+    """Parsed devices.toml from the shared config cache (the server's snapshot when it is current)."""
+    if path == default_devices_path():
+        from ..domain.devices import devices_file
 
-
-def _ensure_parent(path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
+        file = devices_file()
+    else:
+        file = config_file(path)
+    return copy.deepcopy(file.read().data)
 
 
-def _toml_quote(s: str) -> str:
-    # Minimal TOML string quoting (good enough for ids/aliases/notes)
-    escaped = s.replace("\\", "\\\\").replace('"', '\\"')
-    return f'"{escaped}"'
+# Common fields first (in this order) when a device table is written from scratch.
+_PREFERRED_KEYS = (
+    "kind",
+    "location",
+    "tuya_device_id",
+    "tuya_on_device_id",
+    "tuya_off_device_id",
+    "base_url",
+    "supports_brightness",
+    "supports_temperature",
+    "note",
+)
 
 
-def _toml_value(v: Any) -> str:
-    if isinstance(v, bool):
-        return "true" if v else "false"
-    if isinstance(v, int):
-        return str(v)
-    if isinstance(v, float):
-        # Avoid scientific notation for common values
-        return format(v, "f").rstrip("0").rstrip(".") or "0"
-    if v is None:
-        return '""'
-    return _toml_quote(str(v))
+def _ordered_block(block: Dict[str, Any]) -> Dict[str, Any]:
+    ordered = {k: block[k] for k in _PREFERRED_KEYS if k in block}
+    ordered.update((k, block[k]) for k in sorted(block) if k not in ordered)
+    return ordered
 
 
-def _write_devices_file(path: Path, devices: Dict[str, Dict[str, Any]]) -> None:
-    """Write devices.toml.
+def _patch_devices_file(path: Path, devices: Dict[str, Dict[str, Any]]) -> TomlDocument:
+    """devices.toml with its `[devices.*]` tables patched to match `devices`.
 
-    Note: This writer intentionally keeps the format simple and deterministic.
-    It does NOT preserve comments or ordering from an existing file.
+    Only tables whose contents differ are rewritten, and within them only the
+    changed keys; new devices are inserted in alias order, removed ones are
+    dropped with the comment block above them. Comments, scenes, rules,
+    schedules etc. are kept exactly as written.
     """
+    doc = TomlDocument.load(path)
+    current = doc.data().get("devices")
+    current = current if isinstance(current, dict) else {}
+    for alias in current:
+        if alias not in devices:
+            doc.remove_table(("devices", alias))
+    for alias in sorted(devices):
+        # Each edit re-reads the document: skip the (usually many) unchanged devices up front.
+        if not values_equal(current.get(alias), devices[alias] or {}):
+            doc.set_table(("devices", alias), _ordered_block(devices[alias] or {}))
+    return doc
 
-    lines: List[str] = []
 
-    # Deterministic ordering
-    for alias in sorted(devices.keys()):
-        block = devices[alias] or {}
-        lines.append(f"[devices.{alias}]")
-
-        # Keep a pleasant key order for the common fields, then add remaining keys.
-        preferred = [
-            "kind",
-            "location",
-            "tuya_device_id",
-            "tuya_on_device_id",
-            "tuya_off_device_id",
-            "base_url",
-            "supports_brightness",
-            "supports_temperature",
-            "note",
-        ]
-        emitted = set()
-        for k in preferred:
-            if k in block:
-                lines.append(f"{k} = {_toml_value(block[k])}")
-                emitted.add(k)
-
-        for k in sorted(block.keys()):
-            if k in emitted:
-                continue
-            lines.append(f"{k} = {_toml_value(block[k])}")
-
-        lines.append("")
-
-    _ensure_parent(path)
-    path.write_text("\n".join(lines).rstrip() + "\n", encoding="utf-8")
+def _render_devices_file(path: Path, devices: Dict[str, Dict[str, Any]]) -> str:
+    return _patch_devices_file(path, devices).text
+
+
+def _write_devices_file(path: Path, devices: Dict[str, Dict[str, Any]]) -> None:
+    """Patch devices.toml and replace it atomically, so the server never reads half a file."""
+    doc = _patch_devices_file(path, devices)
+    if path.exists() and path.read_text(encoding="utf-8") == doc.text:
+        return
+    doc.save(path)
 
 
 def _load_devices(path: Optional[Path] = None) -> Tuple[Path, Dict[str, Dict[str, Any]]]:
@@ -123,17 +116,54 @@ def _print_path_hint(path: Path) -> None:
     console.print(f"[dim]devices.toml (spec):[/dim] {path}")
 
 
-@app.command("list")
-def list_devices(path: Optional[Path] = typer.Option(None, "--path", help="Override devices.toml path"), verbose: bool = typer.Option(False, "--verbose", help="Show more columns")) -> None:
-    """List registered devices."""
+_POWER_CODES = ("switch_led", "switch_1", "switch")
+_ONLINE_REFRESH_S = 60.0
 
-    devices_path, devices = _load_devices(path)
-    _print_path_hint(devices_path)
 
-    if not devices:
-        console.print(Panel.fit("No devices configured yet. Use `intentcp devices add`.", title="Devices"))
-        raise typer.Exit(code=0)
+def _fetch_live(
+    devices: Dict[str, Dict[str, Any]], with_online: bool
+) -> Tuple[Dict[str, Dict[str, Any]], Optional[Dict[str, bool]]]:
+    """Current state of every listed Tuya device: one batched status call per 20
+    devices (served from the shared status cache when fresh), plus one batched
+    device-info call per 20 for the online flag."""
+    from intentcp_core.services.tuya_client import tuya_client
+
+    state_ids = [str(d["tuya_device_id"]) for d in devices.values() if d.get("tuya_device_id")]
+    all_ids = [
+        str(d[k]) for d in devices.values() for k in ("tuya_device_id", "tuya_on_device_id", "tuya_off_device_id") if d.get(k)
+    ]
+    states = tuya_client.get_status_batch(state_ids) if state_ids else {}
+    online = tuya_client.get_online_batch(all_ids) if with_online and all_ids else ({} if with_online else None)
+    return states, online
+
 
+def _status_cells(block: Dict[str, Any], states: Dict[str, Dict[str, Any]], online: Dict[str, bool]) -> List[str]:
+    from intentcp_core.services.device_specs import spec_cache
+
+    ids = [str(block[k]) for k in ("tuya_device_id", "tuya_on_device_id", "tuya_off_device_id") if block.get(k)]
+    if not ids:
+        return ["[dim]-[/dim]"] * 3
+    flags = [online.get(i) for i in ids]
+    online_text = (
+        "[red]no[/red]" if False in flags else "[dim]?[/dim]" if None in flags else "[green]yes[/green]"
+    )
+    device_id = block.get("tuya_device_id")
+    status = states.get(str(device_id)) if device_id else None
+    if status is None:
+        # Dual-Fingerbot lights have no readable light state; others did not report.
+        return ["[dim]-[/dim]", "[dim]-[/dim]", online_text]
+    power = next((status[c] for c in _POWER_CODES if isinstance(status.get(c), bool)), None)
+    power_text = "[dim]-[/dim]" if power is None else "[green]on[/green]" if power else "off"
+    brightness = spec_cache.brightness_percent(str(device_id), status)
+    return [power_text, f"{brightness}%" if brightness is not None else "[dim]-[/dim]", online_text]
+
+
+def _devices_table(
+    devices: Dict[str, Dict[str, Any]],
+    verbose: bool,
+    status_rows: Optional[Dict[str, List[str]]] = None,
+    changed: Iterable[str] = (),
+) -> Table:
     table = Table(title="IntentCP Devices")
     table.add_column("alias", style="bold")
     table.add_column("kind")
@@ -143,8 +173,13 @@ def list_devices(path: Optional[Path] = typer.Option(None, "--path", help="Overr
         table.add_column("tuya_on_device_id")
         table.add_column("tuya_off_device_id")
         table.add_column("base_url")
+    if status_rows is not None:
+        table.add_column("power")
+        table.add_column("brightness", justify="right")
+        table.add_column("online")
     table.add_column("note")
 
+    changed = set(changed)
     for alias in sorted(devices.keys()):
         d = devices[alias]
         kind = str(d.get("kind", ""))
@@ -159,10 +194,90 @@ def list_devices(path: Optional[Path] = typer.Option(None, "--path", help="Overr
                 str(d.get("tuya_off_device_id", "")),
                 str(d.get("base_url", "")),
             ]
+        if status_rows is not None:
+            row += status_rows.get(alias, ["", "", ""])
         row += [note]
-        table.add_row(*row)
+        table.add_row(*row, style="reverse" if alias in changed else None)
+    return table
 
-    console.print(table)
+
+def _watch_devices(devices: Dict[str, Dict[str, Any]], verbose: bool, interval: float) -> None:
+    """Refresh the state columns every `interval` seconds, redrawing only when a row changed.
+
+    Rows whose state changed since the previous refresh are highlighted. Status
+    comes from the shared cache when the server keeps it fresh (push, polling),
+    so watching costs no extra cloud calls in that case; online flags are
+    refreshed once a minute.
+    """
+    from rich.live import Live
+
+    rows: Dict[str, List[str]] = {}
+    online: Dict[str, bool] = {}
+    online_at = 0.0
+    with Live(console=console, auto_refresh=False) as live:
+        while True:
+            caption = None
+            try:
+                refresh_online = time.monotonic() - online_at >= _ONLINE_REFRESH_S
+                states, fresh_online = _fetch_live(devices, refresh_online)
+                if fresh_online is not None:
+                    online, online_at = fresh_online, time.monotonic()
+            except Exception as e:
+                states, caption = None, f"[red]refresh failed: {e}[/red]"
+
+            changed = []
+            if states is not None:
+                for alias, block in devices.items():
+                    cells = _status_cells(block, states, online)
+                    if rows.get(alias) != cells:
+                        rows[alias] = cells
+                        changed.append(alias)
+            if changed or caption or not rows:
+                table = _devices_table(devices, verbose, rows, changed if len(changed) < len(devices) else ())
+                table.caption = caption or f"updated {time.strftime('%H:%M:%S')} · every {interval:g}s · Ctrl+C to stop"
+                live.update(table, refresh=True)
+            time.sleep(interval)
+
+
+@app.command("list")
+def list_devices(
+    path: Optional[Path] = typer.Option(None, "--path", help="Override devices.toml path"),
+    verbose: bool = typer.Option(False, "--verbose", help="Show more columns"),
+    status: bool = typer.Option(False, "--status", help="Add live power/brightness/online columns"),
+    watch: bool = typer.Option(False, "--watch", help="Keep refreshing the live columns (implies --status)"),
+    interval: float = typer.Option(5.0, "--interval", min=1.0, help="Seconds between --watch refreshes"),
+) -> None:
+    """List registered devices."""
+
+    devices_path, devices = _load_devices(path)
+    _print_path_hint(devices_path)
+
+    if not devices:
+        console.print(Panel.fit("No devices configured yet. Use `intentcp devices add`.", title="Devices"))
+        raise typer.Exit(code=0)
+
+    if watch:
+        try:
+            _watch_devices(devices, verbose, interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    status_rows = None
+    if status:
+        try:
+            with console.status("Fetching device state..."):
+                states, online = _fetch_live(devices, with_online=True)
+        except Exception as e:
+            console.print(Panel.fit(str(e), title="Tuya", border_style="red"))
+            raise typer.Exit(code=1)
+        status_rows = {alias: _status_cells(block, states, online or {}) for alias, block in devices.items()}
+
+    console.print(_devices_table(devices, verbose, status_rows))
+
+
+# `local_key = "..."` (optionally a diff line); the value is masked on screen.
+_LOCAL_KEY_LINE = re.compile(r'^([+\- ]?local_key = )".*"$')
 
 
 @app.command("show")
@@ -180,11 +295,167 @@ def show_device(alias: str, path: Optional[Path] = typer.Option(None, "--path",
     # Pretty-ish TOML-like output
     lines = [f"[devices.{alias}]"]
     for k in sorted(d.keys()):
-        lines.append(f"{k} = {_toml_value(d[k])}")
+        lines.append(_LOCAL_KEY_LINE.sub(r'\1"***"', f"{k} = {toml_value(d[k])}"))
 
     console.print(Panel("\n".join(lines), title=f"devices.{alias}"))
 
 
+@app.command("discover")
+def discover_devices(
+    seconds: float = typer.Option(6.0, "--seconds", "-s", help="How long to listen for broadcasts"),
+    path: Optional[Path] = typer.Option(None, "--path", help="Override devices.toml path"),
+) -> None:
+    """Listen for Tuya LAN broadcasts and update the device IP cache."""
+    import asyncio
+
+    from intentcp_core.services.discovery import CACHE_PATH, discovery_cache, discovery_service
+
+    devices_path, devices = _load_devices(path)
+    _print_path_hint(devices_path)
+    aliases = {str(d.get("tuya_device_id")): alias for alias, d in devices.items() if d.get("tuya_device_id")}
+
+    with console.status(f"Listening on UDP 6666/6667 for {seconds:g}s..."):
+        heard = asyncio.run(discovery_service.scan(seconds))
+
+    entries = discovery_cache.entries()
+    if not entries:
+        console.print(Panel.fit("No Tuya devices heard. Same subnet? UDP 6666/6667 blocked?", title="Discovery"))
+        raise typer.Exit(code=0)
+
+    table = Table(title="Tuya devices on the LAN")
+    table.add_column("tuya_device_id")
+    table.add_column("alias", style="bold")
+    table.add_column("ip")
+    table.add_column("version")
+    table.add_column("local_key")
+    table.add_column("seen")
+    for device_id, entry in entries.items():
+        alias = aliases.get(device_id, "")
+        has_key = "yes" if alias and devices[alias].get("local_key") else ("[dim]-[/dim]" if not alias else "[yellow]missing[/yellow]")
+        seen = "now" if device_id in heard else f"{int(time.time() - entry['seen_at'])}s ago"
+        table.add_row(device_id, alias, entry["ip"], entry.get("version") or "?", has_key, seen)
+    console.print(table)
+    console.print(f"[dim]cache:[/dim] {CACHE_PATH}")
+
+
+@app.command("sync")
+def sync_devices(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show the devices.toml diff without writing it"),
+    concurrency: int = typer.Option(8, "--concurrency", "-j", min=1, max=32, help="Parallel specification fetches"),
+    path: Optional[Path] = typer.Option(None, "--path", help="Override devices.toml path"),
+) -> None:
+    """Import every device of the Tuya app account into devices.toml.
+
+    Kind, brightness/temperature support and command codes are inferred from each
+    device's specification. Devices already in devices.toml keep their alias and
+    settings; only local_key and command codes are refreshed.
+    """
+    import difflib
+
+    from intentcp_core.services.device_sync import (
+        DeviceSyncError,
+        fetch_specifications,
+        iter_cloud_devices,
+        merge_devices,
+    )
+
+    devices_path, devices = _load_devices(path)
+    _print_path_hint(devices_path)
+
+    try:
+        with console.status("Listing devices...") as status:
+            cloud_devices = []
+            for device in iter_cloud_devices():
+                cloud_devices.append(device)
+                status.update(f"Listing devices... {len(cloud_devices)}")
+            status.update(f"Fetching {len(cloud_devices)} specification(s)...")
+            specs = fetch_specifications([d["id"] for d in cloud_devices if d.get("id")], concurrency)
+    except (DeviceSyncError, RuntimeError) as e:
+        console.print(Panel.fit(str(e), title="Tuya", border_style="red"))
+        raise typer.Exit(code=1)
+
+    merged, report = merge_devices(devices, cloud_devices, specs)
+
+    styles = {"added": "green", "updated": "yellow", "unchanged": "dim", "skipped": "dim"}
+    table = Table(title="Device sync" + (" (dry run)" if dry_run else ""))
+    table.add_column("alias", style="bold")
+    table.add_column("tuya name")
+    table.add_column("action")
+    table.add_column("detail")
+    for item in report:
+        style = styles[item["action"]]
+        detail = item.get("reason") or item.get("kind") or ", ".join(item.get("fields") or [])
+        table.add_row(item["alias"] or "", item["name"], f"[{style}]{item['action']}[/{style}]", detail)
+    console.print(table)
+
+    before = devices_path.read_text(encoding="utf-8") if devices_path.exists() else ""
+    after = _render_devices_file(devices_path, merged)
+    if before == after:
+        console.print(Panel.fit("devices.toml is up to date.", title="OK", border_style="green"))
+        return
+
+    if dry_run:
+        diff = difflib.unified_diff(
+            before.splitlines(), after.splitlines(), "devices.toml", "devices.toml (synced)", lineterm=""
+        )
+        for line in diff:
+            line = _LOCAL_KEY_LINE.sub(r'\1"***"', line)
+            style = "green" if line.startswith("+") else "red" if line.startswith("-") else "dim"
+            console.print(line, style=style, markup=False, highlight=False)
+        return
+
+    _write_devices_file(devices_path, merged)
+    added = sum(1 for item in report if item["action"] == "added")
+    updated = sum(1 for item in report if item["action"] == "updated")
+    console.print(Panel.fit(f"Added {added}, updated {updated} device(s).", title="OK", border_style="green"))
+
+
+@app.command("spec")
+def show_spec(
+    alias: str,
+    refresh: bool = typer.Option(False, "--refresh", help="Fetch the specification from Tuya again"),
+    path: Optional[Path] = typer.Option(None, "--path", help="Override devices.toml path"),
+) -> None:
+    """Show the cached Tuya specification (data points and ranges) of a device."""
+    from intentcp_core.services.device_specs import spec_cache
+
+    devices_path, devices = _load_devices(path)
+    if alias not in devices:
+        console.print(Panel.fit(f"Unknown alias: {alias}", title="Not Found", border_style="red"))
+        raise typer.Exit(code=1)
+    block = devices[alias]
+    ids = [str(block[k]) for k in ("tuya_device_id", "tuya_on_device_id", "tuya_off_device_id") if block.get(k)]
+    if not ids:
+        console.print(Panel.fit(f"{alias} has no Tuya device id.", title="Spec", border_style="yellow"))
+        raise typer.Exit(code=1)
+
+    for device_id in dict.fromkeys(ids):
+        try:
+            if refresh:
+                spec_cache.refresh(device_id)
+            spec = spec_cache.get(device_id)
+        except RuntimeError as e:
+            console.print(Panel.fit(str(e), title="Tuya", border_style="red"))
+            raise typer.Exit(code=1)
+        if spec is None:
+            console.print(Panel.fit(f"Tuya has no specification for {device_id}.", title=alias, border_style="yellow"))
+            continue
+        table = Table(title=f"{alias} ({device_id}, category {spec.category or '?'})")
+        table.add_column("code", style="bold")
+        table.add_column("type")
+        table.add_column("values")
+        for code, function in sorted(spec.functions.items()):
+            values = function.values
+            if "min" in values and "max" in values:
+                detail = f"{values['min']}-{values['max']}" + (f" step {values['step']}" if values.get("step", 1) != 1 else "")
+            elif values.get("range"):
+                detail = ", ".join(map(str, values["range"]))
+            else:
+                detail = ""
+            table.add_row(code, function.type, detail)
+        console.print(table)
+
+
 @app.command("remove")
 def remove_device(alias: str, yes: bool = typer.Option(False, "-y", "--yes", help="Do not ask for confirmation"), path: Optional[Path] = typer.Option(None, "--path", help="Override devices.toml path")) -> None:
     """Remove a device by alias."""
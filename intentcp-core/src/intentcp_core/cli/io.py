@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import copy
 from pathlib import Path
 from typing import Any, Dict
 
 import tomllib
 
+from ..config.service import config_file
+from ..config.toml_edit import TomlDocument
+
 
 def _core_root() -> Path:
     """Resolve the `intentcp-core` package root directory.
@@ -39,74 +43,24 @@ def ensure_parent_dir(path: Path) -> None:
 
 
 def load_toml_if_exists(path: Path) -> Dict[str, Any]:
-    if not path.exists():
-        return {}
-
-    data = path.read_bytes()
-    if not data:
-        return {}
-
     try:
-        return dict(tomllib.loads(data.decode("utf-8")))
+        return copy.deepcopy(config_file(path).read().data)
     except Exception:
         # Keep it safe: if parsing fails, don't crash the wizard.
         # The doctor command should provide stricter validation.
         return {}
 
 
-def _toml_escape_basic(value: str) -> str:
-    # Minimal escaping for TOML basic strings.
-    return value.replace("\\", "\\\\").replace('"', '\\"')
-
-
-def _toml_dump(obj: Any, indent: int = 0) -> str:
-    """Very small TOML writer.
-
-    This avoids adding a heavy dependency (tomlkit). It supports:
-    - dict[str, Any]
-    - str/int/float/bool
-    - nested dicts as tables
+def write_toml(path: Path, data: Dict[str, Any]) -> None:
+    """Make the file at `path` hold `data`, editing it in place.
 
-    It is intentionally minimal for IntentCP config needs.
+    Keys and tables that did not change keep their original text (and
+    comments); the file is replaced atomically.
     """
-
-    lines: list[str] = []
-
-    # First write scalar keys
-    if isinstance(obj, dict):
-        scalar_items: list[tuple[str, Any]] = []
-        table_items: list[tuple[str, dict]] = []
-
-        for k, v in obj.items():
-            if isinstance(v, dict):
-                table_items.append((k, v))
-            else:
-                scalar_items.append((k, v))
-
-        for k, v in scalar_items:
-            if isinstance(v, bool):
-                vv = "true" if v else "false"
-            elif isinstance(v, (int, float)):
-                vv = str(v)
-            elif v is None:
-                vv = '""'
-            else:
-                vv = f'"{_toml_escape_basic(str(v))}"'
-            lines.append(f"{k} = {vv}")
-
-        # Then write nested tables
-        for k, v in table_items:
-            if lines:
-                lines.append("")
-            lines.append(f"[{k}]")
-            lines.append(_toml_dump(v, indent=indent))
-
-        return "\n".join(lines).strip() + "\n"
-
-    raise TypeError(f"Unsupported type for TOML dump: {type(obj)}")
-
-
-def write_toml(path: Path, data: Dict[str, Any]) -> None:
-    ensure_parent_dir(path)
-    text = _toml_dump(data)
-    path.write_text(text, encoding="utf-8")
+    try:
+        doc = TomlDocument.load(path)
+    except tomllib.TOMLDecodeError:
+        # Unparseable (see load_toml_if_exists): start over, as the wizard always did.
+        doc = TomlDocument()
+    doc.set_table("", data)
+    doc.save(path)
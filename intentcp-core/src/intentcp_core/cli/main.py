@@ -1,11 +1,9 @@
 from __future__ import annotations
 
 import typer
-from rich import print
 
-from intentcp_core.cli.wizard import run_setup_wizard
-from intentcp_core.cli.validate import run_doctor
 from intentcp_core.cli.devices import app as devices_app
+from intentcp_core.cli.scenes import app as scenes_app
 
 app = typer.Typer(
     name="intentcp",
@@ -14,6 +12,7 @@ app = typer.Typer(
 )
 
 app.add_typer(devices_app, name="devices")
+app.add_typer(scenes_app, name="scenes")
 
 
 @app.command()
@@ -26,19 +25,41 @@ def init():
     - Generates settings.toml
     - Validates connection immediately
     """
+    # Subcommand modules are imported on demand to keep `intentcp --help` fast.
+    from rich import print
+
+    from intentcp_core.cli.wizard import run_setup_wizard
+
     print("[bold cyan]🚀 IntentCP Setup Wizard[/bold cyan]")
     run_setup_wizard()
 
 
 @app.command()
-def doctor():
+def doctor(
+    all_devices: bool = typer.Option(False, "--all", help="Probe every device in devices.toml and the Windows agents"),
+    json_output: bool = typer.Option(False, "--json", help="With --all: print a machine-readable JSON report"),
+    concurrency: int = typer.Option(8, "--concurrency", "-j", min=1, max=32, help="With --all: parallel probes"),
+):
     """
     Validate current IntentCP configuration.
 
     - Checks settings.toml existence and format
     - Tests Tuya Cloud connectivity
     - Prints actionable error messages
+    - With --all: online state, status latency and errors for every device
     """
+    from rich import print
+
+    if all_devices:
+        from intentcp_core.cli.validate import run_doctor_all
+
+        if not json_output:
+            print("[bold yellow]🩺 IntentCP Doctor[/bold yellow]")
+        run_doctor_all(as_json=json_output, concurrency=concurrency)
+        return
+
+    from intentcp_core.cli.validate import run_doctor
+
     print("[bold yellow]🩺 IntentCP Doctor[/bold yellow]")
     run_doctor()
 
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import typer
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+app = typer.Typer(help="Manage [scenes.*] and their Tuya tap-to-run counterparts.")
+
+console = Console()
+
+
+def _compile_plans(names: List[str]):
+    # Server modules are imported on demand to keep `intentcp --help` fast.
+    from fastapi import HTTPException
+
+    from intentcp_core.domain.devices import get_scene_registry
+    from intentcp_core.routers.control import get_scene_plan
+
+    scenes = get_scene_registry()
+    unknown = [n for n in names if n not in scenes]
+    if unknown:
+        console.print(Panel.fit(f"Unknown scene(s): {', '.join(unknown)}", title="Not Found", border_style="red"))
+        raise typer.Exit(code=1)
+
+    plans = []
+    for name in names or sorted(scenes):
+        try:
+            plans.append(get_scene_plan(name))
+        except HTTPException as e:
+            console.print(Panel.fit(str(e.detail), title=f"scenes.{name}", border_style="red"))
+            raise typer.Exit(code=1)
+    return plans
+
+
+@app.command("list")
+def list_scenes() -> None:
+    """List scenes and whether a synced cloud scene is in use for them."""
+    from intentcp_core.services import cloud_scenes
+
+    plans = _compile_plans([])
+    if not plans:
+        console.print(Panel.fit("No scenes configured. Add [scenes.<name>] to devices.toml.", title="Scenes"))
+        raise typer.Exit(code=0)
+
+    mapping = cloud_scenes.load_mapping()
+    table = Table(title="Scenes")
+    table.add_column("name", style="bold")
+    table.add_column("batches", justify="right")
+    table.add_column("cloud")
+    for plan in plans:
+        if not cloud_scenes.is_offloadable(plan):
+            cloud = "[dim]local only[/dim]"
+        elif cloud_scenes.remote_scene_for(plan) is not None:
+            cloud = f"[green]in sync[/green] ({mapping[plan.name]['scene_id']})"
+        elif plan.name in mapping:
+            cloud = "[yellow]out of date[/yellow]"
+        else:
+            cloud = "[dim]not synced[/dim]"
+        table.add_row(plan.name, str(len(plan.nodes)), cloud)
+    console.print(table)
+
+
+@app.command("sync")
+def sync_scenes(
+    names: Optional[List[str]] = typer.Argument(None, help="Scenes to sync (default: all)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show what would change without calling Tuya"),
+    prune: bool = typer.Option(False, "--prune", help="Delete synced cloud scenes that no longer exist locally"),
+) -> None:
+    """Create or update Tuya tap-to-run scenes for immediate (delay-free) scenes."""
+    from intentcp_core.services.cloud_scenes import CloudSceneError, sync_scenes as _sync
+
+    if prune and names:
+        raise typer.BadParameter("--prune only makes sense when syncing all scenes")
+
+    plans = _compile_plans(names or [])
+    try:
+        report = _sync(plans, dry_run=dry_run, prune=prune)
+    except CloudSceneError as e:
+        console.print(Panel.fit(str(e), title="Tuya", border_style="red"))
+        raise typer.Exit(code=1)
+
+    styles = {"created": "green", "updated": "yellow", "deleted": "red", "unchanged": "dim", "skipped": "dim"}
+    table = Table(title="Scene sync" + (" (dry run)" if dry_run else ""))
+    table.add_column("scene", style="bold")
+    table.add_column("action")
+    table.add_column("detail")
+    for item in report:
+        style = styles.get(item["action"], "")
+        detail = item.get("reason") or item.get("scene_id") or ""
+        table.add_row(item["scene"], f"[{style}]{item['action']}[/{style}]" if style else item["action"], detail)
+    console.print(table)
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import typer
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 
 from intentcp_core.cli.io import default_devices_path, default_settings_path, load_toml_if_exists
 
@@ -35,6 +39,16 @@ def _human_hint_for_failure(msg: str) -> str:
     return "Double-check your credentials and region. Region mismatch is the most common cause."
 
 
+_TUYA_KEYS = ("access_id", "access_key", "endpoint", "region", "username", "password", "country_code", "app_schema")
+
+
+def _missing_tuya_keys(settings_data: object) -> List[str]:
+    tuya = settings_data.get("tuya", {}) if isinstance(settings_data, dict) else {}
+    if not isinstance(tuya, dict):
+        tuya = {}
+    return [f"tuya.{key}" for key in _TUYA_KEYS if not str(tuya.get(key, "")).strip()]
+
+
 def _pick_any_tuya_device_id(devices_data: object) -> Optional[str]:
     """Best-effort: extract a Tuya device_id from devices.toml.
 
@@ -172,20 +186,7 @@ def run_doctor(settings_path: Optional[Path] = None) -> None:
     country_code = str(tuya.get("country_code", "")).strip()
     app_schema = str(tuya.get("app_schema", "")).strip()
 
-    missing = [
-        name
-        for name, val in [
-            ("tuya.access_id", access_id),
-            ("tuya.access_key", access_key),
-            ("tuya.endpoint", endpoint),
-            ("tuya.region", region),
-            ("tuya.username", username),
-            ("tuya.password", password),
-            ("tuya.country_code", country_code),
-            ("tuya.app_schema", app_schema),
-        ]
-        if not val
-    ]
+    missing = _missing_tuya_keys(data)
 
     if missing:
         console.print(
@@ -224,3 +225,208 @@ def run_doctor(settings_path: Optional[Path] = None) -> None:
 
     console.print(Panel.fit(f"[green]{message}[/green]", title="Tuya Validation OK"))
     console.print("[green]✅ Your IntentCP configuration looks good.[/green]")
+
+
+# ─────────────────────────────────────────────
+# doctor --all: probe every configured device
+# ─────────────────────────────────────────────
+
+@dataclass
+class DeviceProbe:
+    alias: str
+    device_id: str
+    role: str
+    online: Optional[bool] = None
+    status_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.online is not False
+
+
+@dataclass
+class AgentProbe:
+    base_url: str
+    aliases: List[str]
+    latency_ms: Optional[float] = None
+    http_status: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _device_targets(devices_data: object) -> List[DeviceProbe]:
+    devices = devices_data.get("devices") if isinstance(devices_data, dict) else None
+    targets: List[DeviceProbe] = []
+    for alias, block in sorted((devices or {}).items()):
+        if not isinstance(block, dict):
+            continue
+        for key, role in (("tuya_device_id", "main"), ("tuya_on_device_id", "on"), ("tuya_off_device_id", "off")):
+            value = block.get(key)
+            if isinstance(value, str) and value.strip():
+                targets.append(DeviceProbe(alias=str(alias), device_id=value.strip(), role=role))
+    return targets
+
+
+def _agent_targets(devices_data: object, settings_data: object) -> List[AgentProbe]:
+    agent = settings_data.get("windows_agent") if isinstance(settings_data, dict) else None
+    default_url = str((agent or {}).get("base_url") or "").rstrip("/")
+    by_url: Dict[str, List[str]] = {}
+    unconfigured: List[AgentProbe] = []
+    devices = devices_data.get("devices") if isinstance(devices_data, dict) else None
+    for alias, block in sorted((devices or {}).items()):
+        if not isinstance(block, dict) or block.get("kind") != "windows_pc" and not block.get("base_url"):
+            continue
+        url = str(block.get("base_url") or default_url).rstrip("/")
+        if not url:
+            # Nothing to probe; say so rather than let httpx fail on "".
+            unconfigured.append(AgentProbe(base_url="", aliases=[str(alias)], error=f"no base_url configured for {alias}"))
+            continue
+        by_url.setdefault(url, []).append(str(alias))
+    if default_url:
+        by_url.setdefault(default_url, [])
+    return [AgentProbe(base_url=url, aliases=aliases) for url, aliases in by_url.items()] + unconfigured
+
+
+def _fill_online(probes: List[DeviceProbe]) -> None:
+    from intentcp_core.services.tuya_client import tuya_client
+
+    online = tuya_client.get_online_batch(p.device_id for p in probes)
+    for probe in probes:
+        probe.online = online.get(probe.device_id)
+
+
+def _probe_status(probe: DeviceProbe) -> None:
+    # Straight to the cloud (no status cache): the point is to measure it.
+    from intentcp_core.services.tuya_client import tuya_client
+
+    started = time.perf_counter()
+    try:
+        resp = tuya_client.request("GET", f"/v1.0/iot-03/devices/{probe.device_id}/status")
+    except Exception as e:
+        probe.error = f"{type(e).__name__}: {e}"
+        return
+    probe.status_ms = (time.perf_counter() - started) * 1000
+    if not (isinstance(resp, dict) and resp.get("success")):
+        code = resp.get("code") if isinstance(resp, dict) else None
+        msg = (resp.get("msg") if isinstance(resp, dict) else None) or "unknown error"
+        probe.error = f"{code} {msg}" if code is not None else msg
+
+
+def _probe_agent(probe: AgentProbe) -> None:
+    import httpx
+
+    started = time.perf_counter()
+    try:
+        # Any HTTP answer means the agent is up; it has no dedicated health route.
+        resp = httpx.get(probe.base_url, timeout=3.0)
+    except Exception as e:
+        probe.error = f"{type(e).__name__}: {e}"
+        return
+    probe.latency_ms = (time.perf_counter() - started) * 1000
+    probe.http_status = resp.status_code
+    if resp.status_code >= 500:
+        probe.error = f"HTTP {resp.status_code}"
+
+
+def _fail(message: str, code: int, as_json: bool, title: str = "IntentCP Doctor") -> None:
+    if as_json:
+        print(json.dumps({"ok": False, "error": message}))
+    else:
+        console.print(Panel.fit(f"[red]{message}[/red]", title=title))
+    raise typer.Exit(code=code)
+
+
+def run_doctor_all(settings_path: Optional[Path] = None, as_json: bool = False, concurrency: int = 8) -> None:
+    """Log in once and probe every device in devices.toml (and the Windows agents) concurrently."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    settings_path = settings_path or default_settings_path()
+    if not settings_path.exists():
+        _fail(f"settings.toml not found: {settings_path}. Run `intentcp init` to generate it.", 1, as_json)
+    settings_data = load_toml_if_exists(settings_path)
+    missing = _missing_tuya_keys(settings_data)
+    if missing:
+        _fail("Missing required config keys: " + ", ".join(missing) + ". Run `intentcp init` to fix.", 2, as_json)
+    devices_path = default_devices_path()
+    devices_data = load_toml_if_exists(devices_path) if devices_path.exists() else {}
+
+    from intentcp_core.services.tuya_client import tuya_client
+
+    started = time.perf_counter()
+    try:
+        with console.status("Connecting to Tuya OpenAPI...") if not as_json else nullcontext():
+            tuya_client.user_id()
+    except Exception as e:
+        msg = str(e) or repr(e)
+        _fail(f"{msg}\n\nHint: {_human_hint_for_failure(msg)}", 3, as_json, "Tuya Validation Failed")
+    login_ms = (time.perf_counter() - started) * 1000
+
+    probes = _device_targets(devices_data)
+    agents = _agent_targets(devices_data, settings_data)
+    started = time.perf_counter()
+    with console.status(f"Probing {len(probes)} device(s)...") if not as_json else nullcontext():
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="intentcp-doctor") as pool:
+            online = pool.submit(_fill_online, probes)
+            checks = [pool.submit(_probe_status, p) for p in probes] + [pool.submit(_probe_agent, a) for a in agents if a.base_url]
+            for future in checks:
+                future.result()
+    online_error = None
+    try:
+        online.result()
+    except Exception as e:
+        online_error = f"{type(e).__name__}: {e}"
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    failed = [p for p in probes if not p.ok] + [a for a in agents if not a.ok]
+    if as_json:
+        print(
+            json.dumps(
+                {
+                    "ok": not failed,
+                    "login_ms": round(login_ms, 1),
+                    "elapsed_ms": round(elapsed_ms, 1),
+                    **({"online_error": online_error} if online_error else {}),
+                    "devices": [{**asdict(p), "ok": p.ok} for p in probes],
+                    "agents": [{**asdict(a), "ok": a.ok} for a in agents],
+                },
+                ensure_ascii=False,
+            )
+        )
+    else:
+        table = Table(title=f"Devices ({len(probes)} probed in {elapsed_ms:.0f} ms, login {login_ms:.0f} ms)")
+        table.add_column("alias", style="bold")
+        table.add_column("device_id")
+        table.add_column("online")
+        table.add_column("status", justify="right")
+        table.add_column("error")
+        for p in probes:
+            online_text = {True: "[green]yes[/green]", False: "[red]no[/red]", None: "[dim]?[/dim]"}[p.online]
+            latency = f"{p.status_ms:.0f} ms" if p.status_ms is not None else "-"
+            device = p.device_id if p.role == "main" else f"{p.device_id} ({p.role})"
+            table.add_row(p.alias, device, online_text, latency, f"[red]{p.error}[/red]" if p.error else "")
+        console.print(table)
+        if online_error:
+            console.print(f"[yellow]Online state unavailable: {online_error}[/yellow]")
+
+        if agents:
+            agent_table = Table(title="Windows agents")
+            agent_table.add_column("base_url", style="bold")
+            agent_table.add_column("devices")
+            agent_table.add_column("latency", justify="right")
+            agent_table.add_column("error")
+            for a in agents:
+                latency = f"{a.latency_ms:.0f} ms" if a.latency_ms is not None else "-"
+                agent_table.add_row(a.base_url or "[dim](none)[/dim]", ", ".join(a.aliases), latency, f"[red]{a.error}[/red]" if a.error else "")
+            console.print(agent_table)
+
+        if failed:
+            console.print(f"[red]❌ {len(failed)} of {len(probes) + len(agents)} check(s) failed.[/red]")
+        else:
+            console.print("[green]✅ Every device answered.[/green]")
+
+    if failed:
+        raise typer.Exit(code=4)
@@ -74,7 +74,7 @@ def run_setup_wizard(
     - Writing `settings.toml` safely
     - Validating the config immediately via Tuya token request
 
-    `devices.toml` is not generated yet (future command: `intentcp devices sync`).
+    Devices are imported afterwards with `intentcp devices sync`.
     """
 
     settings_path = settings_path or default_settings_path()
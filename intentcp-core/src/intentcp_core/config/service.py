@@ -0,0 +1,205 @@
+# src/intentcp_core/config/service.py
+"""One cache for the TOML config files, shared by the server, the panel and the CLI.
+
+A `ConfigFile` reads, parses and validates its file at most once per content:
+the result stays in memory until the file changes (inode, mtime, size) and is
+persisted as a pickled snapshot under `config/.cache/`, keyed by the hash of
+the file's bytes and of the code that validates it. Other workers, later
+starts and CLI runs load that snapshot instead of parsing and validating
+again. The snapshot directory is as trusted as the config files next to it.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import logging
+import pickle
+import sys
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import tomllib
+
+from .toml_edit import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_FORMAT = 1
+_CACHE_DIR = ".cache"
+_UNSET: Any = object()
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    path: Path
+    digest: str  # blake2b of the file's bytes; "" when the file does not exist
+    text: str
+    data: Dict[str, Any]
+    # Bumped (per process) whenever the file's content changed.
+    version: int
+    # What the file's loader built from `data` (validated models); None until load().
+    value: Any = None
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.digest)
+
+
+# (snapshot, previous value or None) -> value; raises when the file is invalid.
+Loader = Callable[[ConfigSnapshot, Any], Any]
+
+
+class ConfigFile:
+    """A config file and its parsed / validated forms, reloaded when it changes."""
+
+    def __init__(self, path: Path, loader: Optional[Loader] = None, schema: Tuple[str, ...] = ()) -> None:
+        self.path = Path(path)
+        self.loader = loader
+        # Modules whose code decides what `loader` builds: part of the snapshot key.
+        self.schema = schema
+        self._lock = threading.RLock()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._raw: Optional[ConfigSnapshot] = None
+        self._loaded: Optional[ConfigSnapshot] = None
+        self._persisted_value: Tuple[str, Any] = ("", _UNSET)
+        # The last content that failed to parse / validate, so it is not retried on every call.
+        self._parse_error: Optional[Tuple[Optional[Tuple[int, int, int]], Exception]] = None
+        self._load_error: Optional[Tuple[int, Exception]] = None
+        self._fingerprint: Optional[str] = None
+        self._version = 0
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read(self) -> ConfigSnapshot:
+        """The file's text and parsed data (not validated); raises TOMLDecodeError."""
+        raw = self._raw
+        if raw is not None and self._stat() == self._signature:
+            return raw
+        with self._lock:
+            signature = self._stat()
+            if self._raw is not None and signature == self._signature:
+                return self._raw
+            if self._parse_error is not None and self._parse_error[0] == signature:
+                raise self._parse_error[1].with_traceback(None)
+            try:
+                content = self.path.read_bytes() if signature is not None else b""
+            except FileNotFoundError:
+                signature, content = None, b""
+            digest = hashlib.blake2b(content, digest_size=20).hexdigest() if signature is not None else ""
+            if self._raw is not None and digest == self._raw.digest:
+                self._signature = signature  # rewritten with the same content
+                return self._raw
+
+            persisted = self._read_snapshot(digest) if digest else None
+            try:
+                text = content.decode("utf-8")
+                if persisted is not None:
+                    data, value = persisted
+                    self._persisted_value = (digest, value)
+                else:
+                    data = tomllib.loads(text) if text.strip() else {}
+            except ValueError as e:  # TOMLDecodeError, UnicodeDecodeError
+                self._parse_error = (signature, e)
+                raise
+            self._parse_error = None
+            self._version += 1
+            self._raw = ConfigSnapshot(self.path, digest, text, data, self._version)
+            self._signature = signature
+            return self._raw
+
+    def load(self) -> ConfigSnapshot:
+        """Parsed and validated by the loader. On errors the exception propagates
+        (again on every call until the file changes) and the previous good
+        snapshot stays in place."""
+        raw = self.read()
+        loaded = self._loaded
+        if loaded is not None and loaded.version == raw.version:
+            return loaded
+        with self._lock:
+            raw = self.read()
+            if self._loaded is not None and self._loaded.version == raw.version:
+                return self._loaded
+            if self._load_error is not None and self._load_error[0] == raw.version:
+                raise self._load_error[1].with_traceback(None)
+            digest, value = self._persisted_value
+            if digest != raw.digest or value is _UNSET:
+                if self.loader is None:
+                    value = None
+                else:
+                    try:
+                        value = self.loader(raw, self._loaded.value if self._loaded is not None else None)
+                    except Exception as e:
+                        self._load_error = (raw.version, e)
+                        raise
+                    if raw.exists:
+                        self._write_snapshot(raw, value)
+            self._persisted_value = ("", _UNSET)
+            self._loaded = replace(raw, value=value)
+            return self._loaded
+
+    # --- persisted snapshots -------------------------------------------------
+
+    def _snapshot_path(self) -> Path:
+        return self.path.parent / _CACHE_DIR / f"{self.path.name}.pickle"
+
+    def _key(self, digest: str) -> Tuple[Any, ...]:
+        if self._fingerprint is None:
+            import pydantic
+
+            # Pickled models are only valid for the code (and pydantic) that made them.
+            h = hashlib.blake2b(digest_size=16)
+            h.update(f"{sys.version_info[:2]} {pydantic.VERSION}".encode())
+            for name in self.schema:
+                spec = importlib.util.find_spec(name)
+                if spec is not None and spec.origin:
+                    h.update(Path(spec.origin).read_bytes())
+            self._fingerprint = h.hexdigest()
+        return (_SNAPSHOT_FORMAT, self._fingerprint, digest)
+
+    def _read_snapshot(self, digest: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        if self.loader is None:
+            return None
+        try:
+            with open(self._snapshot_path(), "rb") as fh:
+                if pickle.load(fh) != self._key(digest):
+                    return None  # other content or other code: parse and validate instead
+                data, value = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug("Ignoring unreadable config snapshot %s: %s", self._snapshot_path(), e)
+            return None
+        return data, value
+
+    def _write_snapshot(self, raw: ConfigSnapshot, value: Any) -> None:
+        try:
+            payload = pickle.dumps(self._key(raw.digest), protocol=pickle.HIGHEST_PROTOCOL) + pickle.dumps(
+                (raw.data, value), protocol=pickle.HIGHEST_PROTOCOL
+            )
+            atomic_write_bytes(self._snapshot_path(), payload)
+        except Exception as e:
+            # A read-only config dir only costs the next start a parse.
+            logger.debug("Could not write config snapshot %s: %s", self._snapshot_path(), e)
+
+
+_FILES: Dict[Path, ConfigFile] = {}
+_FILES_LOCK = threading.Lock()
+
+
+def config_file(path: Path, loader: Optional[Loader] = None, schema: Tuple[str, ...] = ()) -> ConfigFile:
+    """The process-wide `ConfigFile` for `path` (registering its loader on first use)."""
+    key = Path(path).resolve()
+    with _FILES_LOCK:
+        file = _FILES.get(key)
+        if file is None:
+            file = _FILES[key] = ConfigFile(key, loader, schema)
+        elif loader is not None and file.loader is None:
+            file.loader, file.schema = loader, schema
+        return file
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from pathlib import Path
 from typing import Any
-import tomllib
 from pydantic import BaseModel, AnyHttpUrl, Field, ConfigDict
 
+from .service import ConfigFile, ConfigSnapshot, config_file
+
 
 # Resolve paths robustly (independent of CWD)
 # .../intentcp-core/src/intentcp_core/config/settings.py
@@ -21,30 +22,91 @@ class TuyaSettings(BaseModel):
     endpoint: str = "https://openapi.tuya.com"
     country_code: str = Field(default="82")
     app_schema: str = Field(default="tuyaSmart")
+    # Home that synced cloud scenes are created in; defaults to the account's first home.
+    home_id: str | int | None = None
 
 
 class WindowsAgentSettings(BaseModel):
     base_url: AnyHttpUrl | None = None
 
 
+class LocationSettings(BaseModel):
+    # Used to compute sunrise/sunset locally for rule conditions.
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
+
+class RuntimeSettings(BaseModel):
+    # Max age (seconds) of a shared status-cache entry before Tuya is asked again.
+    status_cache_ttl: float = 2.0
+    # Subscribe to Tuya's MQTT message service (leader worker only).
+    push_enabled: bool = False
+    # Connect/read timeout (seconds) for LAN-local device sessions before falling back to the cloud.
+    local_timeout: float = 2.0
+    # Listen for Tuya UDP discovery broadcasts (leader worker only) to learn device IPs.
+    discovery_enabled: bool = True
+    # Poll devices referenced by rule triggers this often (seconds; 0 = rely on
+    # push and on status reads made by other requests).
+    rule_poll_interval: float = 0.0
+    # Audit trail of commands/status fetches/schedules in config/events.sqlite3.
+    events_enabled: bool = True
+    event_retention_days: float = 14.0
+    event_max_rows: int = 100_000
+    # Sample devices' `telemetry` data points this often (seconds; 0 = off).
+    telemetry_interval: float = 0.0
+    # Threads for blocking Tuya SDK / LAN / agent calls, and how many calls may
+    # wait for one (background polling is refused at half of that, status reads
+    # at three quarters).
+    sdk_workers: int = Field(default=8, ge=1)
+    sdk_queue_limit: int = Field(default=64, ge=1)
+
+
 class Settings(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
     tuya: TuyaSettings
     windows_agent: WindowsAgentSettings | None = None
+    location: LocationSettings | None = None
+    runtime: RuntimeSettings = Field(default_factory=RuntimeSettings)
 
 
-def load_settings(path: Path | str | None = None) -> Settings:
-    if path is None:
-        path = CONFIG_DIR / "settings.toml"
-
-    path = Path(path)
-    if not path.exists():
+def _load(snapshot: ConfigSnapshot, previous: Any) -> Settings:
+    if not snapshot.exists:
         raise FileNotFoundError(
-            f"settings.toml not found at {path}. Run `intentcp init` to create it."
+            f"settings.toml not found at {snapshot.path}. Run `intentcp init` to create it."
         )
-    data: dict[str, Any] = tomllib.loads(path.read_text(encoding="utf-8"))
-    return Settings.model_validate(data)
+    return Settings.model_validate(snapshot.data)
+
+
+_SCHEMA = (__name__,)
+_DEFAULT_FILE: ConfigFile | None = None
+
+
+def settings_file(path: Path | str | None = None) -> ConfigFile:
+    """The shared cache entry for settings.toml (parsed and validated once per content)."""
+    global _DEFAULT_FILE
+
+    if path is not None:
+        return config_file(Path(path), _load, _SCHEMA)
+    if _DEFAULT_FILE is None:
+        _DEFAULT_FILE = config_file(CONFIG_DIR / "settings.toml", _load, _SCHEMA)
+    return _DEFAULT_FILE
+
+
+def load_settings(path: Path | str | None = None) -> Settings:
+    return settings_file(path).load().value
+
+
+def get_settings() -> Settings:
+    """Dependency provider for the current settings (raises if settings.toml is missing).
+
+    Parsed lazily on first use (not at import) and reloaded when the file changes.
+    """
+    return settings_file().load().value
 
 
-settings = load_settings()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Backwards compatibility for `from ..config.settings import settings`.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,444 @@
+# src/intentcp_core/config/toml_edit.py
+"""In-place edits of the TOML config files.
+
+tomllib can only read, and regenerating a whole file from parsed data loses
+comments, key order and formatting. `TomlDocument` instead patches the text of
+the one table being changed: unchanged keys keep their original line (value
+spelling, trailing comment and all), and every other table is left byte for
+byte. Files are written with `atomic_write_text` so a reader (the server
+reloading devices.toml) never sees half a file.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import tomllib
+
+# One component of a dotted key: bare, "basic" (with escapes) or 'literal'.
+_KEY_PART = r"""(?:[A-Za-z0-9_\-]+|"(?:[^"\\]|\\.)*"|'[^']*')"""
+_KEY_PATH = rf"{_KEY_PART}(?:\s*\.\s*{_KEY_PART})*"
+# `[table]` / `[[array.of.tables]]` header lines, with bare or quoted components.
+_HEADER = re.compile(rf"^\s*(\[\[?)\s*({_KEY_PATH})\s*\]\]?\s*(#.*)?$")
+_HEADER_PART = re.compile(rf"\s*({_KEY_PART})\s*(?:\.|$)")
+# `key = ...`, `"quoted key" = ...` and dotted `key.sub = ...` (grouped under `key`).
+_KEY = re.compile(rf"^(\s*)({_KEY_PART})\s*(?:\.\s*{_KEY_PATH})?\s*=")
+_BARE_KEY = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+# A table's key path; a dotted string ("devices.desk_lamp") is accepted
+# wherever one is taken, a tuple is needed when a component contains a dot.
+TablePath = Union[str, Sequence[str]]
+
+
+def _quote(s: str) -> str:
+    escaped = s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+
+def toml_key(key: str) -> str:
+    return key if _BARE_KEY.match(key) else _quote(key)
+
+
+def _unquote_key(part: str) -> str:
+    if part.startswith("'"):
+        return part[1:-1]
+    if part.startswith('"'):
+        return tomllib.loads(f"k = {part}")["k"] if "\\" in part else part[1:-1]
+    return part
+
+
+def _path(name: TablePath) -> Tuple[str, ...]:
+    if isinstance(name, str):
+        return tuple(name.split(".")) if name else ()
+    return tuple(name)
+
+
+def _render_path(path: Sequence[str]) -> str:
+    return ".".join(toml_key(p) for p in path)
+
+
+def toml_value(v: Any) -> str:
+    """Render a value on one line (dicts as inline tables)."""
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, float):
+        # Avoid scientific notation for common values
+        return format(v, "f").rstrip("0").rstrip(".") or "0"
+    if v is None:
+        return '""'
+    if isinstance(v, dict):
+        # Inline table (e.g. local_dps = { switch_led = 20 })
+        return "{ " + ", ".join(f"{toml_key(str(k))} = {toml_value(x)}" for k, x in v.items()) + " }"
+    if isinstance(v, (list, tuple)):
+        return "[" + ", ".join(toml_value(x) for x in v) + "]"
+    return _quote(str(v))
+
+
+def atomic_write_bytes(path: Path, content: bytes) -> None:
+    """Replace `path` with `content`: temp file in the same directory, fsync, rename."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            fh.write(content)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    try:
+        # Persist the rename itself (not supported on every platform).
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def _scan(text: str, depth: int, delim: Optional[str]) -> Tuple[int, Optional[str], int]:
+    """Track brackets and multi-line strings through one line of a value.
+
+    Returns (bracket depth, open multi-line string delimiter, index of a
+    trailing `#` comment or -1).
+    """
+    i, n = 0, len(text)
+    while i < n:
+        if delim:
+            j = text.find(delim, i)
+            if j < 0:
+                return depth, delim, -1
+            i, delim = j + 3, None
+            continue
+        c = text[i]
+        if text.startswith('"""', i) or text.startswith("'''", i):
+            delim, i = text[i : i + 3], i + 3
+            continue
+        if c == '"':
+            i += 1
+            while i < n and text[i] != '"':
+                i += 2 if text[i] == "\\" else 1
+            i += 1
+            continue
+        if c == "'":
+            j = text.find("'", i + 1)
+            i = n if j < 0 else j + 1
+            continue
+        if c == "#":
+            return depth, delim, i
+        if c in "[{":
+            depth += 1
+        elif c in "]}":
+            depth -= 1
+        i += 1
+    return depth, delim, -1
+
+
+def values_equal(a: Any, b: Any) -> bool:
+    """Equality that does not confuse true with 1 or 1 with 1.0."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(values_equal(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(values_equal(x, y) for x, y in zip(a, b))
+    return type(a) is type(b) and a == b
+
+
+class _Section:
+    __slots__ = ("path", "header", "start", "end", "entries")
+
+    def __init__(self, path: Tuple[str, ...], header: int, start: int) -> None:
+        self.path = path  # () for the keys before the first header
+        self.header = header
+        self.start = start  # first line, including the comment block right above the header
+        self.end = header + 1  # one past the last header/key line
+        # (key, first line, last line) of every `key = value` in the table
+        self.entries: List[Tuple[str, int, int]] = []
+
+
+class TomlDocument:
+    """A TOML file's text with table-level edit operations."""
+
+    def __init__(self, text: str = "") -> None:
+        self._lines = text.splitlines()
+        tomllib.loads(text)  # refuse to edit a file that does not parse
+
+    @classmethod
+    def load(cls, path: Path) -> "TomlDocument":
+        path = Path(path)
+        return cls(path.read_text(encoding="utf-8") if path.exists() else "")
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self._lines).strip("\n") + "\n" if any(s.strip() for s in self._lines) else ""
+
+    def data(self) -> Dict[str, Any]:
+        return tomllib.loads(self.text)
+
+    def save(self, path: Path) -> None:
+        """Write the document; raises TOMLDecodeError instead of writing a file that does not parse."""
+        text = self.text
+        tomllib.loads(text)
+        atomic_write_text(path, text)
+
+    # --- structure ---------------------------------------------------------
+
+    def _sections(self) -> List[_Section]:
+        lines = self._lines
+        sections = [_Section((), -1, 0)]
+        sections[0].end = 0
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            m = _HEADER.match(line)
+            if m:
+                start = i
+                while start > sections[-1].end and lines[start - 1].lstrip().startswith("#"):
+                    start -= 1
+                parts = tuple(_unquote_key(p) for p in _HEADER_PART.findall(m.group(2)))
+                sections.append(_Section(parts, i, start))
+                i += 1
+                continue
+            km = _KEY.match(line)
+            if km:
+                depth, delim, _ = _scan(line[km.end() :], 0, None)
+                j = i
+                while (depth > 0 or delim) and j + 1 < len(lines):
+                    j += 1
+                    depth, delim, _ = _scan(lines[j], depth, delim)
+                sections[-1].entries.append((_unquote_key(km.group(2)), i, j))
+                sections[-1].end = j + 1
+                i = j + 1
+                continue
+            i += 1
+        return sections
+
+    @staticmethod
+    def _child_key(parent: Tuple[str, ...], path: Tuple[str, ...]) -> Optional[str]:
+        """First component of `path` below `parent`, or None if `path` is not inside it."""
+        if len(path) > len(parent) and path[: len(parent)] == parent:
+            return path[len(parent)]
+        return None
+
+    @staticmethod
+    def _inline_owner(path: Tuple[str, ...], sections: List[_Section]) -> Optional[Tuple[_Section, str]]:
+        """(section, key) whose value holds `path` when no header can declare it.
+
+        `devices = { ... }` or `devices.lamp.ip = ...` defines `devices` (or
+        `devices.lamp`) as a key; a `[devices.x]` header would then declare it a
+        second time.
+        """
+        by_path = {s.path: s for s in sections}
+        for i in range(len(path) - 1, -1, -1):
+            section = by_path.get(path[:i])
+            if section is not None:
+                return (section, path[i]) if any(k == path[i] for k, _, _ in section.entries) else None
+        return None
+
+    def table_names(self) -> List[str]:
+        return [_render_path(s.path) for s in self._sections() if s.path]
+
+    def line_of(self, path: Sequence[Any]) -> Optional[int]:
+        """1-based line defining `path` (table names, then keys), for error messages.
+
+        The deepest table or key found along the path wins, so a missing key
+        points at its table's header; None if not even the table is there.
+        """
+        parts = tuple(str(p) for p in path)
+        by_path = {s.path: s for s in self._sections()}
+        for i in range(len(parts), -1, -1):
+            section = by_path.get(parts[:i])
+            if section is None:
+                continue
+            rest = parts[i:]
+            if rest:
+                for key, first, _last in section.entries:
+                    if key == rest[0]:
+                        return first + 1
+            if section.header >= 0:
+                return section.header + 1
+        return None
+
+    # --- editing -----------------------------------------------------------
+
+    def _delete(self, start: int, end: int) -> None:
+        del self._lines[start:end]
+        # Do not leave two blank lines (or a leading blank line) where the block was.
+        while start < len(self._lines) and not self._lines[start].strip() and (
+            start == 0 or not self._lines[start - 1].strip()
+        ):
+            del self._lines[start]
+
+    def _insert_block(self, at: int, block: List[str]) -> None:
+        if at > 0 and self._lines[at - 1].strip():
+            block = [""] + block
+        if at < len(self._lines) and self._lines[at].strip():
+            block = block + [""]
+        self._lines[at:at] = block
+
+    def _render_table(self, path: Tuple[str, ...], values: Dict[str, Any]) -> List[str]:
+        # Nested dicts become sub-tables at the top level ([tuya], [runtime])
+        # and inline tables below it (local_dps = { ... }).
+        nested = {k: v for k, v in values.items() if isinstance(v, dict)} if not path else {}
+        lines = [f"[{_render_path(path)}]"] if path else []
+        lines += [f"{toml_key(k)} = {toml_value(v)}" for k, v in values.items() if k not in nested]
+        for key, sub in nested.items():
+            lines += [""] + self._render_table((key,), sub)
+        return lines
+
+    def _table_data(self, path: Tuple[str, ...]) -> Any:
+        current: Any = self.data()
+        for part in path:
+            current = current.get(part) if isinstance(current, dict) else None
+        return current
+
+    def _set_inline(self, owner: _Section, key: str, path: Tuple[str, ...], values: Optional[Dict[str, Any]]) -> bool:
+        """Set (or with None, remove) `path` inside the value of `key` in `owner`."""
+        data = self._table_data(owner.path)
+        data = dict(data) if isinstance(data, dict) else {}
+        rest = path[len(owner.path) + 1 :]
+        if not rest:
+            if values is None:
+                data.pop(key, None)
+            else:
+                data[key] = values
+            return self.set_table(owner.path, data)
+        # Copy the dicts along the way; `values is None` drops the last component.
+        node = data[key] = dict(data.get(key) or {})
+        for part in rest[:-1]:
+            node = node[part] = dict(node.get(part) or {})
+        if values is None:
+            if rest[-1] not in node:
+                return False
+            del node[rest[-1]]
+        else:
+            node[rest[-1]] = values
+        return self.set_table(owner.path, data)
+
+    def remove_table(self, name: TablePath) -> bool:
+        """Remove `[name]` and its sub-tables; False if there was none."""
+        path = _path(name)
+        sections = self._sections()
+        removed = False
+        for section in reversed(sections):
+            if section.path[: len(path)] == path and section.path:
+                self._delete(section.start, section.end)
+                removed = True
+        if not removed and path:
+            owner = self._inline_owner(path, sections)
+            if owner is not None:
+                return self._set_inline(owner[0], owner[1], path, None)
+        return removed
+
+    def set_table(self, name: TablePath, values: Dict[str, Any]) -> bool:
+        """Make `[name]` hold exactly `values`, touching only lines that change.
+
+        `name` is a dotted table name ("devices.desk_lamp") or a sequence of
+        components (("devices", "my.lamp")); "" is the whole document. A table
+        that the file defines inline or with dotted keys is updated there
+        rather than given a header of its own. Returns whether anything changed.
+        """
+        path = _path(name)
+        current = self._table_data(path)
+        if isinstance(current, dict) and values_equal(current, values):
+            return False
+        current = current if isinstance(current, dict) else {}
+
+        sections = self._sections()
+        section = next((s for s in sections if s.path == path), None)
+        if section is None:
+            owner = self._inline_owner(path, sections)
+            if owner is not None:
+                return self._set_inline(owner[0], owner[1], path, values)
+            if current:
+                # Only implied by sub-tables so far ([a.b.c] without [a.b]).
+                self.remove_table(path)
+                sections = self._sections()
+            self._insert_block(self._new_table_position(path, sections), self._render_table(path, values))
+            return True
+
+        # Sub-tables first (bottom-up), so the line numbers of this table's keys stay valid.
+        handled = set()
+        for key in dict.fromkeys(
+            k for s in sections if s is not section for k in [self._child_key(path, s.path)] if k is not None
+        ):
+            handled.add(key)
+            if key in values and values_equal(current.get(key), values[key]):
+                continue
+            own = next((s for s in sections if s.path == path + (key,)), None)
+            if key in values and isinstance(values[key], dict) and own is not None:
+                self.set_table(own.path, values[key])
+            else:
+                self.remove_table(path + (key,))
+                if key in values:
+                    handled.discard(key)  # re-added as a key below
+
+        section = next(s for s in self._sections() if s.path == path)
+        replaced = set()
+        for key, first, last in reversed(section.entries):
+            if key not in values or key in handled:
+                del self._lines[first : last + 1]
+            elif values_equal(current.get(key), values[key]):
+                continue
+            elif key in replaced:
+                # A changed dotted-key group (`a.b = 1`, `a.c = 2`) becomes one line.
+                del self._lines[first : last + 1]
+            else:
+                self._lines[first : last + 1] = [self._replacement(self._lines[first], key, values[key], first == last)]
+                replaced.add(key)
+
+        present = {key for key, _, _ in section.entries}
+        added = [k for k in values if k not in present and k not in handled]
+        inline = [k for k in added if path or not isinstance(values[k], dict)]
+        if inline:
+            section = next(s for s in self._sections() if s.path == path)
+            new_lines = [f"{toml_key(k)} = {toml_value(values[k])}" for k in inline]
+            if path or section.entries:
+                self._lines[section.end : section.end] = new_lines
+            else:
+                # First top-level key: before the first table (and its comment block).
+                tables = [s for s in self._sections() if s.path]
+                self._insert_block(tables[0].start if tables else len(self._lines), new_lines)
+        for key in added:
+            if key not in inline:
+                self._insert_block(len(self._lines), self._render_table((key,), values[key]))
+        return True
+
+    @staticmethod
+    def _replacement(line: str, key: str, value: Any, single_line: bool) -> str:
+        """`key = value` in place of `line`, keeping its indentation and trailing comment."""
+        indent = line[: len(line) - len(line.lstrip())]
+        comment = ""
+        m = _KEY.match(line)
+        if single_line and m:
+            _, _, at = _scan(line[m.end() :], 0, None)
+            if at >= 0:
+                comment = "  " + line[m.end() + at :].strip()
+        return f"{indent}{toml_key(key)} = {toml_value(value)}{comment}"
+
+    def _new_table_position(self, path: Tuple[str, ...], sections: List[_Section]) -> int:
+        """Where a new table goes: among its siblings (in order if they are sorted), else at the end."""
+        parent = path[:-1]
+        family = [s for s in sections if s.path and (not parent or self._child_key(parent, s.path) is not None)]
+        if not parent or not family:
+            return len(self._lines)
+        siblings = [s for s in family if len(s.path) == len(path)]
+        names = [s.path for s in siblings]
+        if names == sorted(names):
+            after = next((s for s in siblings if s.path > path), None)
+            if after is not None:
+                return after.start
+        return max(s.end for s in family)
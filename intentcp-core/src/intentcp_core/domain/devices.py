@@ -1,13 +1,26 @@
 # src/intentcp_core/domain/devices.py
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Dict
+from typing import TYPE_CHECKING, Any, Callable, FrozenSet, Literal, List, Optional, Dict, Tuple
 
-import tomllib
 from pydantic import BaseModel, Field
 
+from ..config.service import ConfigFile, ConfigSnapshot, config_file
+
+if TYPE_CHECKING:
+    from .rules import RuleConfig
+    from .scenes import SceneConfig
+    from .schedules import ScheduleConfig
+
+logger = logging.getLogger(__name__)
+
 
 class DeviceKind(str, Enum):
     LIGHT = "light"
@@ -15,19 +28,45 @@ class DeviceKind(str, Enum):
     AIRCON = "aircon"
     PROJECTOR = "projector"
     WINDOWS_PC = "windows_pc"
+    # Read-only devices (door/motion sensors) used as rule triggers.
+    SENSOR = "sensor"
 
 
 class DeviceInfo(BaseModel):
     kind: DeviceKind
+    # Backend that controls the device (see drivers/registry.py); defaults by kind.
+    driver: Optional[str] = None
     tuya_device_id: Optional[str] = None
 
     tuya_on_device_id: Optional[str] = None
     tuya_off_device_id: Optional[str] = None
 
+    # HTTP agents (e.g. kind = "windows_pc"); falls back to settings.toml.
+    base_url: Optional[str] = None
+
     location: Optional[str] = None
     supports_brightness: bool = False
     supports_temperature: bool = False
 
+    # Tuya data point codes for on/off and brightness when the defaults
+    # (switch_led / switch_1, bright_value_v2) do not fit; `intentcp devices sync`
+    # fills them in from the device specification.
+    switch_code: Optional[str] = None
+    brightness_code: Optional[str] = None
+
+    # LAN-local control of `tuya_device_id` (Tuya protocol 3.3/3.4 on TCP 6668).
+    # Without a local_key the device is controlled via the cloud only. IP and
+    # version default to what UDP discovery last saw (then "3.3").
+    local_key: Optional[str] = None
+    local_ip: Optional[str] = None
+    local_version: Optional[Literal["3.3", "3.4"]] = None
+    # Command code -> data point id, for codes outside the standard instruction set.
+    local_dps: Dict[str, int] = Field(default_factory=dict)
+
+    # Numeric data points to record over time (e.g. ["cur_power", "add_ele"]);
+    # sampled every runtime.telemetry_interval seconds.
+    telemetry: List[str] = Field(default_factory=list)
+
 
 # ─────────────────────────────────────────────
 # TOML 로딩
@@ -40,52 +79,248 @@ _BASE_DIR = Path(__file__).resolve().parents[3]
 _CONFIG_DIR = _BASE_DIR / "config"
 _DEVICES_FILE = _CONFIG_DIR / "devices.toml"
 
-# In-process cache to avoid requiring server restarts on config edits.
-_DEVICE_REGISTRY_CACHE: Dict[str, DeviceInfo] | None = None
-_DEVICE_REGISTRY_MTIME_NS: int | None = None
+_SECTIONS = ("devices", "scenes", "rules", "schedules")
+# Modules whose code decides how devices.toml is validated (keys the persisted snapshot).
+_SCHEMA = (__name__, "intentcp_core.domain.rules", "intentcp_core.domain.scenes", "intentcp_core.domain.schedules")
+
+
+@dataclass(frozen=True)
+class _Registry:
+    devices: Dict[str, DeviceInfo]
+    scenes: Dict[str, "SceneConfig"]
+    rules: Dict[str, "RuleConfig"]
+    schedules: Dict[str, "ScheduleConfig"]
+    # Section -> entry name -> hash of its raw TOML content.
+    hashes: Dict[str, Dict[str, str]]
+
+
+_EMPTY = _Registry({}, {}, {}, {}, {})
+
+# The registry in use (validated, swapped whole) and the file snapshot it came from.
+_REGISTRY: _Registry = _EMPTY
+_LOADED_VERSION: int | None = None
+_FILE: ConfigFile | None = None
+# Bumped on every reload that changed something (never reset); what get_registry_version() reports.
+_DEVICE_REGISTRY_VERSION: int | None = None
+_RELOAD_LOCK = threading.Lock()
+_REJECTED: Optional[BaseException] = None  # last load error logged
+_REGISTRY_LISTENERS: List[Callable[["RegistryDiff"], None]] = []
+
+
+@dataclass(frozen=True)
+class RegistryDiff:
+    """What a reload of devices.toml changed: names per section."""
+
+    version: int
+    added: FrozenSet[str] = frozenset()  # device aliases
+    removed: FrozenSet[str] = frozenset()
+    changed: FrozenSet[str] = frozenset()
+    # Scene / rule / schedule names that were added, removed or changed.
+    scenes: FrozenSet[str] = frozenset()
+    rules: FrozenSet[str] = frozenset()
+    schedules: FrozenSet[str] = frozenset()
+
+    @property
+    def devices(self) -> FrozenSet[str]:
+        return self.added | self.removed | self.changed
+
+
+def _content_hash(raw: Any) -> str:
+    return hashlib.blake2b(json.dumps(raw, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def _validate_entries(
+    raw: Any, model: Any, previous: Dict[str, Any], hashes: Dict[str, str]
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Validate the entries of one `[section.*]`, reusing the model of every entry whose content is unchanged."""
+    if not isinstance(raw, dict):
+        raw = {}
+    entries: Dict[str, Any] = {}
+    new_hashes: Dict[str, str] = {}
+    for name, cfg in raw.items():
+        digest = new_hashes[name] = _content_hash(cfg)
+        if hashes.get(name) == digest and name in previous:
+            entries[name] = previous[name]
+        else:
+            entries[name] = model.model_validate(cfg)
+    return entries, new_hashes
+
+
+def _changed_names(old: Dict[str, str], new: Dict[str, str]) -> FrozenSet[str]:
+    return frozenset(k for k in old.keys() | new.keys() if old.get(k) != new.get(k))
+
 
 # Keys in DEVICE_REGISTRY are logical device names (e.g. "bed_light", "living_light")
 # defined in config/devices.toml under the [devices.*] tables.
-def _load_device_registry() -> Dict[str, DeviceInfo]:
-    if not _DEVICES_FILE.exists():
-        # Fresh setup: allow server to boot without devices configured yet.
-        return {}
+# Scenes ([scenes.*]), rules ([rules.*]) and recurring schedules ([schedules.*])
+# live in the same file and are validated against it.
+def _load_device_config(snapshot: ConfigSnapshot, previous: Optional[_Registry]) -> _Registry:
+    """Validate devices.toml; entries identical to `previous` ones keep their models.
+
+    Cross-checks (scene/rule/schedule references) always run over the whole
+    file, since a changed device can break an unchanged scene. A missing file
+    is an empty registry, so a fresh setup can boot without devices.
+    """
+    from .rules import RuleConfig, validate_rules
+    from .scenes import SceneConfig, validate_scenes
+    from .schedules import ScheduleConfig, validate_schedules
+
+    data = snapshot.data
+    previous = previous or _EMPTY
+    hashes: Dict[str, Dict[str, str]] = {}
+    registry, hashes["devices"] = _validate_entries(
+        data.get("devices", {}), DeviceInfo, previous.devices, previous.hashes.get("devices", {})
+    )
+    scenes, hashes["scenes"] = _validate_entries(
+        data.get("scenes", {}), SceneConfig, previous.scenes, previous.hashes.get("scenes", {})
+    )
+    validate_scenes(scenes, registry)
+
+    rules, hashes["rules"] = _validate_entries(
+        data.get("rules", {}), RuleConfig, previous.rules, previous.hashes.get("rules", {})
+    )
+    validate_rules(rules, registry, scenes)
+
+    schedules, hashes["schedules"] = _validate_entries(
+        data.get("schedules", {}), ScheduleConfig, previous.schedules, previous.hashes.get("schedules", {})
+    )
+    validate_schedules(schedules, registry, scenes)
+
+    return _Registry(registry, scenes, rules, schedules, hashes)
+
+
+def devices_file() -> ConfigFile:
+    """The shared cache entry for devices.toml (parsed and validated once per content)."""
+    global _FILE
+
+    if _FILE is None:
+        _FILE = config_file(_DEVICES_FILE, _load_device_config, _SCHEMA)
+    return _FILE
+
 
-    data = tomllib.loads(_DEVICES_FILE.read_text(encoding="utf-8"))
+def _adopt(new: _Registry, old: _Registry) -> _Registry:
+    """`new` with every unchanged entry replaced by the object already in use.
 
-    devices_raw = data.get("devices", {})
-    if not isinstance(devices_raw, dict):
-        return {}
+    Snapshots loaded from disk (written by another worker) are fresh copies;
+    consumers rely on unchanged entries keeping their identity.
+    """
+    sections = []
+    for section in _SECTIONS:
+        entries, previous = getattr(new, section), getattr(old, section)
+        new_hashes, old_hashes = new.hashes.get(section, {}), old.hashes.get(section, {})
+        sections.append(
+            {
+                name: previous[name] if name in previous and old_hashes.get(name) == new_hashes.get(name) else model
+                for name, model in entries.items()
+            }
+        )
+    return _Registry(*sections, new.hashes)
 
-    registry: Dict[str, DeviceInfo] = {}
 
-    for logical_name, cfg in devices_raw.items():
-        registry[logical_name] = DeviceInfo.model_validate(cfg)
+def _refresh() -> _Registry:
+    global _REGISTRY, _LOADED_VERSION, _DEVICE_REGISTRY_VERSION, _REJECTED
 
-    return registry
+    try:
+        snapshot = devices_file().load()
+    except Exception as e:
+        if _LOADED_VERSION is None:
+            raise  # nothing valid to fall back to
+        # A broken edit (made outside the panel, which refuses to save one)
+        # must not take the control path down: keep serving the last good registry.
+        if e is not _REJECTED:
+            _REJECTED = e
+            logger.error("devices.toml is invalid, keeping the previous registry: %s", e)
+        return _REGISTRY
+    if snapshot.version == _LOADED_VERSION:
+        return _REGISTRY
+    with _RELOAD_LOCK:
+        if _LOADED_VERSION is not None and snapshot.version <= _LOADED_VERSION:
+            return _REGISTRY  # another thread applied this (or a newer) one meanwhile
+        old, first_load = _REGISTRY, _LOADED_VERSION is None
+        new = _adopt(snapshot.value, old)
+        changed = {
+            section: _changed_names(old.hashes.get(section, {}), new.hashes.get(section, {})) for section in _SECTIONS
+        }
+        _REGISTRY, _LOADED_VERSION = new, snapshot.version
+        if not any(changed.values()) and not (first_load and snapshot.exists):
+            return new  # same content (or still no file): nothing to report
+        # Never reuse a number: caches keyed on the version must not revive.
+        _DEVICE_REGISTRY_VERSION = (_DEVICE_REGISTRY_VERSION or 0) + 1
+        old_devices, new_devices = old.hashes.get("devices", {}), new.hashes.get("devices", {})
+        diff = RegistryDiff(
+            version=_DEVICE_REGISTRY_VERSION,
+            added=frozenset(new_devices.keys() - old_devices.keys()),
+            removed=frozenset(old_devices.keys() - new_devices.keys()),
+            changed=frozenset(changed["devices"] & new_devices.keys() & old_devices.keys()),
+            scenes=changed["scenes"],
+            rules=changed["rules"],
+            schedules=changed["schedules"],
+        )
+        listeners = list(_REGISTRY_LISTENERS)
 
+    logger.info(
+        "devices.toml reloaded: %d added, %d removed, %d changed device(s)",
+        len(diff.added),
+        len(diff.removed),
+        len(diff.changed),
+    )
+    for listener in listeners:
+        try:
+            listener(diff)
+        except Exception:
+            logger.exception("Registry listener failed")
+    return new
+
+
+def subscribe_registry(callback: Callable[[RegistryDiff], None]) -> Callable[[], None]:
+    """Call `callback(diff)` after every reload of devices.toml in this process.
+
+    Entries outside the diff keep their model objects, so derived state keyed
+    on them stays valid. Callbacks run on the thread that noticed the change
+    and must be quick. Returns an unsubscribe function.
+    """
+    _REGISTRY_LISTENERS.append(callback)
+
+    def _unsubscribe() -> None:
+        if callback in _REGISTRY_LISTENERS:
+            _REGISTRY_LISTENERS.remove(callback)
+
+    return _unsubscribe
 
 
 def get_device_registry() -> Dict[str, DeviceInfo]:
     """Return the latest device registry, reloading if config/devices.toml changed."""
-    global _DEVICE_REGISTRY_CACHE, _DEVICE_REGISTRY_MTIME_NS
+    return _refresh().devices
+
+
+def get_scene_registry() -> Dict[str, "SceneConfig"]:
+    """Return the validated `[scenes.*]` definitions from config/devices.toml."""
+    return _refresh().scenes
+
+
+def get_rule_registry() -> Dict[str, "RuleConfig"]:
+    """Return the validated `[rules.*]` definitions from config/devices.toml."""
+    return _refresh().rules
+
 
-    if not _DEVICES_FILE.exists():
-        _DEVICE_REGISTRY_CACHE = {}
-        _DEVICE_REGISTRY_MTIME_NS = None
-        return _DEVICE_REGISTRY_CACHE
+def get_schedule_registry() -> Dict[str, "ScheduleConfig"]:
+    """Return the validated `[schedules.*]` definitions from config/devices.toml."""
+    return _refresh().schedules
 
-    mtime_ns = _DEVICES_FILE.stat().st_mtime_ns
-    if _DEVICE_REGISTRY_CACHE is None or _DEVICE_REGISTRY_MTIME_NS != mtime_ns:
-        _DEVICE_REGISTRY_CACHE = _load_device_registry()
-        _DEVICE_REGISTRY_MTIME_NS = mtime_ns
 
-    return _DEVICE_REGISTRY_CACHE
+def get_registry_version() -> int | None:
+    """Opaque version of the loaded devices.toml; changes whenever a reload changed something."""
+    _refresh()
+    return _DEVICE_REGISTRY_VERSION
 
 
 def get_device_info(device_name: str) -> Optional[DeviceInfo]:
     return get_device_registry().get(device_name)
 
 
-# Backwards-compatible snapshot (may be stale). Prefer `get_device_registry()`.
-DEVICE_REGISTRY: Dict[str, DeviceInfo] = get_device_registry()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Backwards-compatible `DEVICE_REGISTRY`, now resolved lazily on access instead
+    # of parsing devices.toml at import time. Prefer `get_device_registry()`.
+    if name == "DEVICE_REGISTRY":
+        return get_device_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
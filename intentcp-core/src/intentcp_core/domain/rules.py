@@ -0,0 +1,110 @@
+# src/intentcp_core/domain/rules.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from .devices import DeviceInfo
+
+
+class RuleTrigger(BaseModel):
+    """The data point a rule watches, and the predicate that makes it fire.
+
+    The rule fires when the predicate goes from false to true (an edge), not on
+    every report that keeps it true. Without a predicate any change fires.
+    """
+
+    device: str
+    code: str
+    equals: Optional[Any] = None
+    not_equals: Optional[Any] = None
+    above: Optional[float] = None
+    below: Optional[float] = None
+
+    @model_validator(mode="after")
+    def _one_comparison(self) -> "RuleTrigger":
+        if self.equals is not None and self.not_equals is not None:
+            raise ValueError("a rule trigger takes 'equals' or 'not_equals', not both")
+        if (self.equals is not None or self.not_equals is not None) and (
+            self.above is not None or self.below is not None
+        ):
+            raise ValueError("a rule trigger cannot mix 'equals'/'not_equals' with 'above'/'below'")
+        return self
+
+    @property
+    def is_change_trigger(self) -> bool:
+        return self.equals is None and self.not_equals is None and self.above is None and self.below is None
+
+    def matches(self, value: Any) -> bool:
+        if self.equals is not None:
+            return value == self.equals
+        if self.not_equals is not None:
+            return value != self.not_equals
+        if self.above is not None or self.below is not None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return False
+            if self.above is not None and not value > self.above:
+                return False
+            if self.below is not None and not value < self.below:
+                return False
+        return True
+
+
+class RuleCondition(BaseModel):
+    """Checked when the trigger fires; the rule is skipped unless it holds.
+
+    `sun = "down"` means between sunset and sunrise at `[location]` from
+    settings.toml. `sun_offset` (minutes) shortens the daytime window on both
+    ends, so a positive offset counts dusk and dawn as "down".
+    """
+
+    sun: Optional[Literal["up", "down"]] = None
+    sun_offset: float = 0.0
+
+
+class RuleAction(BaseModel):
+    """Run a device action (optionally with a value) or a whole scene."""
+
+    device: Optional[str] = None
+    action: Optional[str] = None
+    value: Optional[Any] = None
+    scene: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _one_target(self) -> "RuleAction":
+        if (self.device is None) == (self.scene is None):
+            raise ValueError("a rule action needs exactly one of 'device' or 'scene'")
+        if self.device is not None and not self.action:
+            raise ValueError("a device rule action needs an 'action'")
+        if self.action is not None:
+            self.action = self.action.strip().lower()
+        return self
+
+
+class RuleConfig(BaseModel):
+    description: Optional[str] = None
+    enabled: bool = True
+    trigger: RuleTrigger
+    condition: RuleCondition = Field(default_factory=RuleCondition)
+    actions: List[RuleAction] = Field(min_length=1)
+    # Seconds the trigger must keep matching before the rule fires.
+    debounce: float = Field(default=0, ge=0)
+    # Minimum seconds between two firings of this rule.
+    cooldown: float = Field(default=0, ge=0)
+
+
+def validate_rules(
+    rules: Dict[str, RuleConfig],
+    registry: Dict[str, DeviceInfo],
+    scenes: Dict[str, Any],
+) -> None:
+    """Cross-check rules against devices and scenes; raise ValueError on problems."""
+    for name, rule in rules.items():
+        if rule.trigger.device not in registry:
+            raise ValueError(f"rule '{name}': unknown trigger device '{rule.trigger.device}'")
+        for idx, action in enumerate(rule.actions):
+            if action.device is not None and action.device not in registry:
+                raise ValueError(f"rule '{name}' action {idx}: unknown device '{action.device}'")
+            if action.scene is not None and action.scene not in scenes:
+                raise ValueError(f"rule '{name}' action {idx}: unknown scene '{action.scene}'")
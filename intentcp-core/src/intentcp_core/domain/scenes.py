@@ -0,0 +1,168 @@
+# src/intentcp_core/domain/scenes.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, model_validator
+
+from .devices import DeviceInfo, DeviceKind
+
+
+class SceneStep(BaseModel):
+    """One step of a `[scenes.*]` entry in devices.toml.
+
+    Targets either a single `device` alias or every device of a `kind`.
+    `delay` is relative to the moment all `after` steps have completed
+    (or to the start of the scene when `after` is empty).
+    """
+
+    id: Optional[str] = None
+    device: Optional[str] = None
+    kind: Optional[DeviceKind] = None
+    action: str
+    value: Optional[Any] = None
+    delay: float = Field(default=0, ge=0)
+    after: List[str] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def _one_target(self) -> "SceneStep":
+        if (self.device is None) == (self.kind is None):
+            raise ValueError("a scene step needs exactly one of 'device' or 'kind'")
+        self.action = self.action.strip().lower()
+        return self
+
+
+class SceneConfig(BaseModel):
+    description: Optional[str] = None
+    steps: List[SceneStep]
+
+
+def validate_scenes(scenes: Dict[str, SceneConfig], registry: Dict[str, DeviceInfo]) -> None:
+    """Cross-check scenes against the device registry; raise ValueError on problems."""
+    for name, scene in scenes.items():
+        ids = [s.id for s in scene.steps if s.id]
+        if len(ids) != len(set(ids)):
+            raise ValueError(f"scene '{name}': duplicate step id")
+
+        known = set(ids)
+        deps: Dict[str, List[str]] = {}
+        for idx, step in enumerate(scene.steps):
+            if step.device is not None and step.device not in registry:
+                raise ValueError(f"scene '{name}' step {idx}: unknown device '{step.device}'")
+            for dep in step.after:
+                if dep not in known:
+                    raise ValueError(f"scene '{name}' step {idx}: unknown 'after' step id '{dep}'")
+            if step.id:
+                deps[step.id] = list(step.after)
+
+        # Reject dependency cycles (depth-first search with colouring).
+        state: Dict[str, int] = {}
+
+        def _visit(node: str) -> None:
+            if state.get(node) == 1:
+                raise ValueError(f"scene '{name}': dependency cycle through step '{node}'")
+            if state.get(node) == 2:
+                return
+            state[node] = 1
+            for dep in deps.get(node, []):
+                _visit(dep)
+            state[node] = 2
+
+        for node in deps:
+            _visit(node)
+
+
+# ─────────────────────────────────────────────
+# Compilation into an execution plan
+# ─────────────────────────────────────────────
+
+# (device alias, device info, action, value) -> (driver name, target, lane key, command code, value)
+CommandResolver = Callable[[str, DeviceInfo, str, Any], Tuple[str, str, str, str, Any]]
+
+
+@dataclass
+class PlanNode:
+    """A batch of commands for one driver target that become ready together."""
+
+    index: int
+    driver: str
+    device_id: str  # driver target: Tuya device id, agent URL, ...
+    lane_key: str
+    delay: float
+    aliases: List[str] = field(default_factory=list)
+    commands: List[Dict[str, Any]] = field(default_factory=list)
+    depends_on: List[int] = field(default_factory=list)
+
+
+@dataclass
+class ScenePlan:
+    name: str
+    nodes: List[PlanNode]
+    skipped: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def has_delays(self) -> bool:
+        return any(n.delay > 0 for n in self.nodes)
+
+
+def compile_scene(
+    name: str,
+    scene: SceneConfig,
+    registry: Dict[str, DeviceInfo],
+    resolve: CommandResolver,
+) -> ScenePlan:
+    """Compile a scene into a DAG of per-device command batches.
+
+    Steps that target the same device (per driver), wait on the same steps and
+    share the same delay are merged into one node, so they go out as a single
+    request.
+    Nodes without a dependency path between them can run in parallel.
+    """
+    nodes: Dict[Tuple[str, str, float, Tuple[str, ...]], PlanNode] = {}
+    nodes_by_step_id: Dict[str, List[PlanNode]] = {}
+    pending_deps: List[Tuple[PlanNode, List[str]]] = []
+    skipped: List[Dict[str, Any]] = []
+
+    for step in scene.steps:
+        if step.device is not None:
+            targets = [step.device]
+        else:
+            targets = sorted(alias for alias, info in registry.items() if info.kind == step.kind)
+
+        for alias in targets:
+            info = registry[alias]
+            try:
+                driver, device_id, lane_key, code, value = resolve(alias, info, step.action, step.value)
+            except Exception as e:
+                # Kind selectors naturally match devices that cannot do the action.
+                if step.kind is None:
+                    raise
+                skipped.append({"device": alias, "action": step.action, "reason": str(e)})
+                continue
+
+            key = (driver, device_id, step.delay, tuple(sorted(step.after)))
+            node = nodes.get(key)
+            if node is None:
+                node = PlanNode(
+                    index=len(nodes), driver=driver, device_id=device_id, lane_key=lane_key, delay=step.delay
+                )
+                nodes[key] = node
+                pending_deps.append((node, step.after))
+            if alias not in node.aliases:
+                node.aliases.append(alias)
+            # A later step for the same data point wins within a batch.
+            node.commands = [c for c in node.commands if c["code"] != code]
+            node.commands.append({"code": code, "value": value})
+
+            if step.id:
+                nodes_by_step_id.setdefault(step.id, [])
+                if node not in nodes_by_step_id[step.id]:
+                    nodes_by_step_id[step.id].append(node)
+
+    for node, after in pending_deps:
+        deps = {dep.index for step_id in after for dep in nodes_by_step_id.get(step_id, [])}
+        deps.discard(node.index)
+        node.depends_on = sorted(deps)
+
+    return ScenePlan(name=name, nodes=list(nodes.values()), skipped=skipped)
@@ -0,0 +1,194 @@
+# src/intentcp_core/domain/schedules.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Literal, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pydantic import BaseModel, Field, field_validator
+
+from .devices import DeviceInfo
+from .rules import RuleAction
+
+# ─────────────────────────────────────────────
+# Cron expressions
+# ─────────────────────────────────────────────
+
+_MONTHS = {m: i for i, m in enumerate("jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1)}
+_WEEKDAYS = {d: i for i, d in enumerate("sun mon tue wed thu fri sat".split())}
+_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+
+def _parse_field(text: str, low: int, high: int, names: Dict[str, int]) -> FrozenSet[int]:
+    values = set()
+    for part in text.lower().split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"invalid step in {text!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start = names[a] if a in names else int(a)
+            end = names[b] if b in names else int(b)
+        else:
+            start = names[part] if part in names else int(part)
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high and start <= end):
+            raise ValueError(f"value out of range in {text!r} (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronExpr:
+    """Standard 5-field cron (minute hour day-of-month month day-of-week).
+
+    Supports `*`, lists, ranges, `/step`, month and weekday names and the usual
+    `@daily`-style aliases. Like Vixie cron, when both day fields are restricted
+    a day matches if either does.
+    """
+
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    days_restricted: bool
+    weekdays_restricted: bool
+
+    @classmethod
+    def parse(cls, text: str) -> "CronExpr":
+        expr = _ALIASES.get(text.strip().lower(), text)
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {len(fields)}: {text!r}")
+        try:
+            weekdays = _parse_field(fields[4], 0, 7, _WEEKDAYS)
+            return cls(
+                minutes=_parse_field(fields[0], 0, 59, {}),
+                hours=_parse_field(fields[1], 0, 23, {}),
+                days=_parse_field(fields[2], 1, 31, {}),
+                months=_parse_field(fields[3], 1, 12, _MONTHS),
+                # 7 is Sunday too.
+                weekdays=frozenset(d % 7 for d in weekdays),
+                # As in Vixie cron, a field starting with "*" ("*", "*/2") does not restrict.
+                days_restricted=not fields[2].startswith("*"),
+                weekdays_restricted=not fields[4].startswith("*"),
+            )
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"invalid cron expression {text!r}: {e}") from None
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = (day.isoweekday() % 7) in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`, in `after`'s zone (naive: local time)."""
+        tz = after.tzinfo
+        # Walk local wall-clock time, then attach the zone (DST gaps resolve forward).
+        t = after.replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            later = [m for m in self.minutes if m >= t.minute]
+            if not later:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            return t.replace(minute=min(later), tzinfo=tz)
+        raise ValueError("cron expression never fires")
+
+
+_parse_cron = lru_cache(maxsize=256)(CronExpr.parse)
+
+
+# ─────────────────────────────────────────────
+# [schedules.*] entries
+# ─────────────────────────────────────────────
+
+
+class ScheduleConfig(BaseModel):
+    """A recurring automation: `cron` in `timezone` (default: the host's).
+
+    `missed` decides what happens to occurrences that passed while the server
+    (or every worker) was down for longer than `grace` seconds: "skip" them, or
+    "run_once" to catch up with a single run. `jitter` delays each run by a
+    random 0..jitter seconds.
+    """
+
+    description: Optional[str] = None
+    enabled: bool = True
+    cron: str
+    timezone: Optional[str] = None
+    actions: List[RuleAction] = Field(min_length=1)
+    missed: Literal["skip", "run_once"] = "skip"
+    grace: float = Field(default=60, ge=0)
+    jitter: float = Field(default=0, ge=0)
+
+    @field_validator("cron")
+    @classmethod
+    def _valid_cron(cls, value: str) -> str:
+        CronExpr.parse(value)
+        return value
+
+    @field_validator("timezone")
+    @classmethod
+    def _valid_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"unknown timezone {value!r}") from None
+        return value
+
+    @property
+    def expr(self) -> CronExpr:
+        return _parse_cron(self.cron)
+
+    def zone(self) -> Optional[tzinfo]:
+        """The schedule's zone; None means the host's local time, DST rules included."""
+        return ZoneInfo(self.timezone) if self.timezone else None
+
+    def next_fire(self, after: float) -> float:
+        """Next occurrence (epoch seconds) strictly after `after` (epoch seconds)."""
+        # Naive datetimes convert through the system's local time rules, so a
+        # schedule without a timezone follows the host's DST changes.
+        return self.expr.next_after(datetime.fromtimestamp(after, self.zone())).timestamp()
+
+
+def validate_schedules(
+    schedules: Dict[str, ScheduleConfig],
+    registry: Dict[str, DeviceInfo],
+    scenes: Dict[str, object],
+) -> None:
+    """Cross-check schedule actions against devices and scenes; raise ValueError on problems."""
+    for name, schedule in schedules.items():
+        for idx, action in enumerate(schedule.actions):
+            if action.device is not None and action.device not in registry:
+                raise ValueError(f"schedule '{name}' action {idx}: unknown device '{action.device}'")
+            if action.scene is not None and action.scene not in scenes:
+                raise ValueError(f"schedule '{name}' action {idx}: unknown scene '{action.scene}'")
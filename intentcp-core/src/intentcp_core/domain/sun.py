@@ -0,0 +1,65 @@
+# src/intentcp_core/domain/sun.py
+"""Sunrise/sunset from coordinates (NOAA approximation, about a minute of error)."""
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# Geometric horizon plus atmospheric refraction and the sun's radius.
+_ZENITH = 90.833
+
+
+def _solar_position(day: date, latitude: float) -> Tuple[float, float]:
+    """(equation of time in minutes, cosine of the sunrise hour angle) for `day`."""
+    n = day.timetuple().tm_yday
+    g = 2 * math.pi / 365 * (n - 1)
+    eqtime = 229.18 * (
+        0.000075 + 0.001868 * math.cos(g) - 0.032077 * math.sin(g) - 0.014615 * math.cos(2 * g) - 0.040849 * math.sin(2 * g)
+    )
+    decl = (
+        0.006918
+        - 0.399912 * math.cos(g)
+        + 0.070257 * math.sin(g)
+        - 0.006758 * math.cos(2 * g)
+        + 0.000907 * math.sin(2 * g)
+        - 0.002697 * math.cos(3 * g)
+        + 0.00148 * math.sin(3 * g)
+    )
+    lat = math.radians(latitude)
+    cos_ha = math.cos(math.radians(_ZENITH)) / (math.cos(lat) * math.cos(decl)) - math.tan(lat) * math.tan(decl)
+    return eqtime, cos_ha
+
+
+def sun_times(day: date, latitude: float, longitude: float) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Return (sunrise, sunset) in UTC for the local solar date `day`.
+
+    Both are None when the sun does not cross the horizon that day
+    (polar night or midnight sun).
+    """
+    eqtime, cos_ha = _solar_position(day, latitude)
+    if not -1.0 <= cos_ha <= 1.0:
+        return None, None
+
+    ha = math.degrees(math.acos(cos_ha))
+    midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    sunrise = midnight + timedelta(minutes=720 - 4 * (longitude + ha) - eqtime)
+    sunset = midnight + timedelta(minutes=720 - 4 * (longitude - ha) - eqtime)
+    return sunrise, sunset
+
+
+def is_sun_up(at: datetime, latitude: float, longitude: float, offset_minutes: float = 0.0) -> bool:
+    """True between sunrise + offset and sunset - offset at `at` (aware datetime).
+
+    A positive offset shrinks the daytime window (it gets "dark" earlier),
+    a negative one widens it.
+    """
+    at = at.astimezone(timezone.utc)
+    # Local solar date: shift by the longitude's offset from UTC.
+    solar_day = (at + timedelta(hours=longitude / 15.0)).date()
+    sunrise, sunset = sun_times(solar_day, latitude, longitude)
+    if sunrise is None or sunset is None:
+        # cos(hour angle) < -1: the sun never sets; > 1: it never rises.
+        return _solar_position(solar_day, latitude)[1] < -1.0
+    offset = timedelta(minutes=offset_minutes)
+    return sunrise + offset <= at < sunset - offset
@@ -0,0 +1,18 @@
+# src/intentcp_core/drivers/__init__.py
+"""Device drivers: one backend per device family, loaded on demand."""
+
+from .base import BaseDriver, DeviceDriver, DriverCommand, DriverError, InvalidValue, UnsupportedAction
+from .registry import driver_name, get_driver, get_driver_by_name, register_driver
+
+__all__ = [
+    "BaseDriver",
+    "DeviceDriver",
+    "DriverCommand",
+    "DriverError",
+    "InvalidValue",
+    "UnsupportedAction",
+    "driver_name",
+    "get_driver",
+    "get_driver_by_name",
+    "register_driver",
+]
@@ -0,0 +1,86 @@
+# src/intentcp_core/drivers/base.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Protocol
+
+if TYPE_CHECKING:
+    from ..domain.devices import DeviceInfo
+
+# callback(alias, reported data points)
+StateCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class DriverError(Exception):
+    """A device cannot be driven as configured (missing ids, unknown driver, ...)."""
+
+
+class UnsupportedAction(DriverError):
+    """The device's driver does not implement the requested action."""
+
+
+class InvalidValue(DriverError, ValueError):
+    """The action is supported but its value is not (out of range, wrong type, missing)."""
+
+
+@dataclass(frozen=True)
+class DriverCommand:
+    """One resolved write: what to send, where, and on which command lane."""
+
+    target: str  # backend address: Tuya device id, agent base URL, ...
+    lane_key: str  # orders calls for the same physical device
+    code: str
+    value: Any
+
+
+class DeviceDriver(Protocol):
+    """Backend for one family of devices.
+
+    `resolve` turns a logical action into a backend command without doing I/O,
+    so scenes can compile and merge commands ahead of time; `batch` sends
+    several commands for one target in as few calls as the backend allows.
+    """
+
+    name: str
+
+    def resolve(self, alias: str, info: "DeviceInfo", action: str, value: Any = None) -> DriverCommand: ...
+
+    async def batch(self, target: str, commands: List[Dict[str, Any]], lane_key: str) -> Any: ...
+
+    async def execute(self, alias: str, info: "DeviceInfo", action: str, value: Any = None) -> Dict[str, Any]: ...
+
+    async def status(self, alias: str, info: "DeviceInfo") -> Any: ...
+
+    def subscribe(self, alias: str, info: "DeviceInfo", callback: StateCallback) -> Callable[[], None]: ...
+
+
+class BaseDriver(ABC):
+    """Default `execute` built on `resolve` + `batch`; status/subscribe unsupported.
+
+    Subclasses must implement `batch`.
+    """
+
+    name = ""
+    # Key under which `execute` reports the backend response.
+    response_key = "response"
+
+    def resolve(self, alias: str, info: "DeviceInfo", action: str, value: Any = None) -> DriverCommand:
+        raise UnsupportedAction(f"Unsupported action for {alias}: {action}")
+
+    @abstractmethod
+    async def batch(self, target: str, commands: List[Dict[str, Any]], lane_key: str) -> Any: ...
+
+    async def execute(self, alias: str, info: "DeviceInfo", action: str, value: Any = None) -> Dict[str, Any]:
+        if action == "status":
+            return {"status": await self.status(alias, info)}
+        cmd = self.resolve(alias, info, action, value)
+        resp = await self.batch(cmd.target, [{"code": cmd.code, "value": cmd.value}], cmd.lane_key)
+        return {self.response_key: resp}
+
+    async def status(self, alias: str, info: "DeviceInfo") -> Any:
+        raise UnsupportedAction(f"{alias}: status is not supported by the {self.name} driver")
+
+    def subscribe(self, alias: str, info: "DeviceInfo", callback: StateCallback) -> Callable[[], None]:
+        return lambda: None
+
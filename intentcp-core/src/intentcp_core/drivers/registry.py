@@ -0,0 +1,69 @@
+# src/intentcp_core/drivers/registry.py
+from __future__ import annotations
+
+import importlib
+import threading
+from typing import TYPE_CHECKING, Dict
+
+from ..domain.devices import DeviceKind
+from .base import DeviceDriver, DriverError
+
+if TYPE_CHECKING:
+    from ..domain.devices import DeviceInfo
+
+# Driver name -> "module:attribute". Modules are imported the first time a
+# configured device needs them, so unused backends cost nothing at startup.
+_DRIVER_PATHS: Dict[str, str] = {
+    "tuya": "intentcp_core.drivers.tuya:TuyaDriver",
+    "windows_agent": "intentcp_core.drivers.windows_agent:WindowsAgentDriver",
+}
+
+# Driver used when a device has no explicit `driver =` in devices.toml.
+_KIND_DEFAULTS: Dict[DeviceKind, str] = {
+    DeviceKind.WINDOWS_PC: "windows_agent",
+}
+DEFAULT_DRIVER = "tuya"
+
+_instances: Dict[str, DeviceDriver] = {}
+_lock = threading.Lock()
+
+
+def register_driver(name: str, path: str) -> None:
+    """Register (or override) a driver as `"package.module:ClassName"`."""
+    with _lock:
+        _DRIVER_PATHS[name] = path
+        _instances.pop(name, None)
+
+
+def driver_name(info: "DeviceInfo") -> str:
+    return info.driver or _KIND_DEFAULTS.get(info.kind, DEFAULT_DRIVER)
+
+
+def get_driver_by_name(name: str) -> DeviceDriver:
+    """Return the shared driver instance, importing its module on first use.
+
+    Besides registered names, `driver = "package.module:ClassName"` in
+    devices.toml loads a third-party driver directly.
+    """
+    driver = _instances.get(name)
+    if driver is not None:
+        return driver
+
+    with _lock:
+        driver = _instances.get(name)
+        if driver is None:
+            path = _DRIVER_PATHS.get(name, name)
+            module_name, _, attr = path.partition(":")
+            if not attr:
+                raise DriverError(f"Unknown driver: {name!r} (known: {', '.join(sorted(_DRIVER_PATHS))})")
+            try:
+                factory = getattr(importlib.import_module(module_name), attr)
+            except (ImportError, AttributeError) as e:
+                raise DriverError(f"Cannot load driver {name!r} from {path}: {e}") from e
+            driver = factory()
+            _instances[name] = driver
+    return driver
+
+
+def get_driver(info: "DeviceInfo") -> DeviceDriver:
+    return get_driver_by_name(driver_name(info))
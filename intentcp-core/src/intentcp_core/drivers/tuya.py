@@ -0,0 +1,128 @@
+# src/intentcp_core/drivers/tuya.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+from ..domain.devices import DeviceKind
+from ..services.device_specs import spec_cache
+from ..services.dispatcher import command_dispatcher
+from ..services.sdk_executor import NORMAL
+from ..services.state_store import state_store
+from ..services.tuya_client import tuya_client
+from .base import BaseDriver, DriverCommand, DriverError, InvalidValue, StateCallback, UnsupportedAction
+
+if TYPE_CHECKING:
+    from ..domain.devices import DeviceInfo
+
+
+def command_code_on(info: "DeviceInfo") -> str:
+    """
+    Decide which Tuya command code to use for turning a device ON.
+
+    An explicit `switch_code` wins; otherwise:
+    - Dimmable lights (supports_brightness): use 'switch_led'
+    - Everything else (Fingerbot, smart plug, etc.): use 'switch_1'
+    """
+    if info.switch_code:
+        return info.switch_code
+    if info.kind == DeviceKind.LIGHT and info.supports_brightness:
+        return "switch_led"
+    return "switch_1"
+
+
+def command_code_off(info: "DeviceInfo") -> str:
+    """
+    Decide which Tuya command code to use for turning a device OFF.
+
+    Same heuristic as command_code_on; many Tuya devices use the same
+    boolean 'switch_1' (or 'switch_led') field for both on/off.
+    """
+    if info.switch_code:
+        return info.switch_code
+    if info.kind == DeviceKind.LIGHT and info.supports_brightness:
+        return "switch_led"
+    return "switch_1"
+
+
+def lane_key(info: "DeviceInfo") -> str:
+    """Pick the command lane for a logical device.
+
+    Dual-Fingerbot lights are keyed by their ON bot so that the ON and OFF presses
+    for the same light share one lane and can never overtake each other.
+    """
+    key = info.tuya_device_id or info.tuya_on_device_id or info.tuya_off_device_id
+    if not key:
+        raise DriverError("No Tuya device configured")
+    return key
+
+
+def on_device_id(info: "DeviceInfo") -> str:
+    if info.tuya_on_device_id:
+        return info.tuya_on_device_id
+    if info.tuya_device_id:
+        return info.tuya_device_id
+    raise DriverError("No Tuya device configured for ON")
+
+
+def off_device_id(info: "DeviceInfo") -> str:
+    if info.tuya_off_device_id:
+        return info.tuya_off_device_id
+    if info.tuya_device_id:
+        return info.tuya_device_id
+    raise DriverError("No Tuya device configured for OFF")
+
+
+def status_device_id(info: "DeviceInfo") -> str:
+    # Prefer main device_id, then ON, then OFF as a fallback for status checks
+    device_id = info.tuya_device_id or info.tuya_on_device_id or info.tuya_off_device_id
+    if not device_id:
+        raise DriverError("No Tuya device configured for status")
+    return device_id
+
+
+class TuyaDriver(BaseDriver):
+    """Tuya devices through TuyaClient (LAN-local first, OpenAPI fallback).
+
+    Calls for one device are serialized on its command lane; `batch` sends all
+    data points for a device in a single request.
+    """
+
+    name = "tuya"
+    response_key = "tuya_response"
+
+    def resolve(self, alias: str, info: "DeviceInfo", action: str, value: Any = None) -> DriverCommand:
+        if info.kind == DeviceKind.SENSOR:
+            raise UnsupportedAction(f"{alias} is a sensor and cannot be controlled")
+        if action == "on":
+            return DriverCommand(on_device_id(info), lane_key(info), command_code_on(info), True)
+        if action == "off":
+            return DriverCommand(off_device_id(info), lane_key(info), command_code_off(info), False)
+        if action == "brightness":
+            if not info.supports_brightness or not info.tuya_device_id:
+                raise UnsupportedAction(f"{alias} does not support brightness")
+            if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 100:
+                raise InvalidValue(f"{alias}: brightness value must be an integer between 1 and 100")
+            return DriverCommand(info.tuya_device_id, lane_key(info), info.brightness_code or "bright_value_v2", value)
+        raise UnsupportedAction(f"Unsupported action for {alias}: {action}")
+
+    @staticmethod
+    def _send(target: str, commands: List[Dict[str, Any]]) -> Any:
+        # `brightness` actions carry 1-100 %; the device wants its own range.
+        return tuya_client.send_commands(target, spec_cache.scale_brightness(target, commands))
+
+    async def batch(self, target: str, commands: List[Dict[str, Any]], lane_key: str) -> Any:
+        return await command_dispatcher.submit(lane_key, self._send, target, commands)
+
+    async def status(self, alias: str, info: "DeviceInfo") -> Any:
+        return await command_dispatcher.submit(
+            lane_key(info), tuya_client.get_status, status_device_id(info), priority=NORMAL
+        )
+
+    def subscribe(self, alias: str, info: "DeviceInfo", callback: StateCallback) -> Callable[[], None]:
+        ids = {i for i in (info.tuya_device_id, info.tuya_on_device_id, info.tuya_off_device_id) if i}
+
+        def _on_state(device_id: str, values: Dict[str, Any], source: str) -> None:
+            if device_id in ids:
+                callback(alias, values)
+
+        return state_store.subscribe(_on_state)
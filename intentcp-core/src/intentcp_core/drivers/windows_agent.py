@@ -0,0 +1,64 @@
+# src/intentcp_core/drivers/windows_agent.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from ..config.settings import get_settings
+from ..services.dispatcher import command_dispatcher
+from ..services.windows_agent import WindowsAgentClient
+from .base import BaseDriver, DriverCommand, DriverError, InvalidValue, UnsupportedAction
+
+if TYPE_CHECKING:
+    from ..domain.devices import DeviceInfo
+
+# Logical action -> WindowsAgentClient method.
+_ACTIONS = {
+    "off": "screen_off",
+    "screen_off": "screen_off",
+    "youtube": "open_youtube",
+}
+
+
+class WindowsAgentDriver(BaseDriver):
+    """PCs running the IntentCP Windows agent (HTTP).
+
+    Each device may set its own `base_url`; otherwise `[windows_agent].base_url`
+    from settings.toml is used.
+    """
+
+    name = "windows_agent"
+    response_key = "agent_response"
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, WindowsAgentClient] = {}
+
+    def _base_url(self, alias: str, info: "DeviceInfo") -> str:
+        if info.base_url:
+            return info.base_url.rstrip("/")
+        agent = get_settings().windows_agent
+        if agent is None or agent.base_url is None:
+            raise DriverError(f"{alias}: no base_url in devices.toml and windows_agent.base_url is not configured")
+        return str(agent.base_url).rstrip("/")
+
+    def resolve(self, alias: str, info: "DeviceInfo", action: str, value: Any = None) -> DriverCommand:
+        method = _ACTIONS.get(action)
+        if method is None:
+            raise UnsupportedAction(f"Unsupported action for {alias}: {action}")
+        if method == "open_youtube" and not value:
+            raise InvalidValue(f"{alias}: 'youtube' needs a URL value")
+        base_url = self._base_url(alias, info)
+        return DriverCommand(base_url, f"agent:{base_url}", method, value)
+
+    def _run(self, base_url: str, commands: List[Dict[str, Any]]) -> Any:
+        client = self._clients.get(base_url)
+        if client is None:
+            client = self._clients[base_url] = WindowsAgentClient(base_url)
+        results = []
+        for cmd in commands:
+            fn = getattr(client, cmd["code"])
+            results.append(fn(cmd["value"]) if cmd["value"] is not None else fn())
+        return results[0] if len(results) == 1 else results
+
+    async def batch(self, target: str, commands: List[Dict[str, Any]], lane_key: str) -> Any:
+        # The agent has no batch endpoint: run the calls back to back on one lane.
+        return await command_dispatcher.submit(lane_key, self._run, target, commands)
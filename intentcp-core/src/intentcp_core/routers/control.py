@@ -1,16 +1,34 @@
 # routers/control.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from typing import Any
 
 import asyncio
+import logging
+import time
 from dataclasses import dataclass
 from urllib.parse import parse_qs
 import anyio
 
-from ..domain.devices import DEVICE_REGISTRY, DeviceInfo, DeviceKind
-from ..services.tuya_client import tuya_client
+from ..domain.devices import (
+    DeviceInfo,
+    RegistryDiff,
+    get_device_registry,
+    get_registry_version,
+    get_scene_registry,
+    subscribe_registry,
+)
+from ..domain.rules import RuleAction
+from ..domain.scenes import ScenePlan, compile_scene
+from ..drivers import DriverError, InvalidValue, UnsupportedAction, driver_name, get_driver, get_driver_by_name
+from ..services import cloud_scenes
+from ..services.device_specs import InvalidCommand
+from ..services.events import event_log
+from ..services.idempotency import idempotency_cache
+from ..services.scheduler import scheduler
+from ..services.sdk_executor import INTERACTIVE, ExecutorSaturated, sdk_executor
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # --- New URL scheme (IntentCP v1):
 # Single action:
@@ -18,6 +36,11 @@ router = APIRouter()
 # Sequence:
 #   /sequence?actions=step1,step2,...
 #   step format: {device}:{action}[?delay=seconds]
+# Scene (declared under [scenes.*] in devices.toml):
+#   /scene/{name}[?local=true]   (legacy alias: /sequence/{name})
+#
+# Retries (iOS Shortcuts, flaky mobile networks) can pass an `Idempotency-Key`
+# header or `?idem=` query param; repeats within the window replay the first response.
 #
 # Note: We keep the legacy `/devices/{device}/...` routes for compatibility.
 
@@ -72,22 +95,47 @@ def _parse_sequence_actions(actions: str) -> list[_SeqStep]:
     return steps
 
 async def _run_after_delay(delay: int, fn, *args, **kwargs) -> None:
-    """Run a blocking function after delay seconds without blocking the event loop.
+    """Await an async function after delay seconds.
     Any exception is caught and logged to avoid crashing background tasks.
     """
     try:
         if delay > 0:
             await anyio.sleep(delay)
-        await anyio.to_thread.run_sync(fn, *args, **kwargs)
-    except HTTPException as e:
-        # Unknown device or bad action should not crash background tasks
-        # Consider this a skipped/failed step
-        return
-    except Exception:
-        return
+        await fn(*args, **kwargs)
+    except Exception as e:
+        # Unknown device or bad action should not crash background tasks, but the
+        # failure is logged (the step itself already recorded a command event).
+        detail = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+        logger.warning("Background step %s%s failed: %s", getattr(fn, "__name__", fn), args, detail)
+
+# Fire-and-forget work started by a request (delayed scenes, immediate sequence
+# steps); kept referenced so it is not garbage collected mid-run, and cancelled
+# on shutdown.
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+
+async def cancel_background_tasks() -> None:
+    """Cancel request-started background work (app shutdown)."""
+    tasks = list(_BACKGROUND_TASKS)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _BACKGROUND_TASKS.clear()
+
+
+async def _execute_single_action_now(device_name: str, action: str) -> dict[str, Any]:
+    """Execute a single action immediately and return a standard response payload.
 
-def _execute_single_action_now(device_name: str, action: str) -> dict[str, Any]:
-    """Execute a single action immediately and return a standard response payload."""
+    The device's driver sends the call through its per-device command lane, so it
+    is ordered against any other command (immediate or delayed) for the same device.
+    """
     action = action.strip().lower()
     device_name = device_name.strip()
 
@@ -95,6 +143,7 @@ def _execute_single_action_now(device_name: str, action: str) -> dict[str, Any]:
         info = _get_device_info(device_name)
     except HTTPException as e:
         if e.status_code == 404:
+            event_log.record("command", device=device_name, action=action, ok=False, error="unknown_device")
             return {
                 "ok": False,
                 "skipped": True,
@@ -104,29 +153,253 @@ def _execute_single_action_now(device_name: str, action: str) -> dict[str, Any]:
             }
         raise
 
-    if action in ("on", "off"):
-        if action == "on":
-            device_id = _resolve_on_device_id(info)
-            code = _command_code_on(info)
-            resp = tuya_client.send_command(device_id, code, True)
+    return await _drive(device_name, info, action)
+
+
+def _schedule_action(device_name: str, action: str, delay: int) -> dict[str, Any]:
+    """Persist a delayed action in the shared scheduler.
+
+    The job is stored in the cross-worker state store and run by whichever worker
+    is the leader; an identical job already pending for about the same time is reused.
+    """
+    job = scheduler.schedule(device_name.strip(), action.strip().lower(), delay)
+    payload: dict[str, Any] = {
+        "ok": True,
+        "scheduled": True,
+        "job_id": job["job_id"],
+        "device": device_name,
+        "action": action,
+        "delay": delay,
+    }
+    if job["deduplicated"]:
+        payload["deduplicated"] = True
+        payload["delay"] = max(0, round(job["due_at"] - time.time()))
+    return payload
+
+
+async def run_scheduled_action(device_name: str, action: str) -> dict[str, Any]:
+    """Scheduler job runner: execute now and raise on failure so it gets recorded."""
+    result = await _execute_single_action_now(device_name, action)
+    if not result.get("ok"):
+        raise RuntimeError(result.get("reason") or "action failed")
+    return result
+
+
+async def run_automation_action(step: RuleAction) -> dict[str, Any]:
+    """Action runner for rules and recurring schedules: a device action or a scene; raises on failure."""
+    if step.scene is not None:
+        plan = get_scene_plan(step.scene)
+        results = await _execute_scene_plan(plan)
+        failed = [r for r in results if not r["ok"]]
+        if failed:
+            raise RuntimeError(f"scene {step.scene}: {len(failed)} failed step(s)")
+        return {"ok": True, "scene": step.scene, "results": results}
+
+    assert step.device is not None and step.action is not None
+    return await _drive(step.device, _get_device_info(step.device), step.action, step.value)
+
+
+async def _run_idempotent(
+    response: Response,
+    idem_key: str | None,
+    fingerprint: tuple,
+    fn,
+) -> dict[str, Any]:
+    """Run `fn` once per idempotency key; replays are flagged with a response header."""
+    if not idem_key:
+        return await fn()
+
+    result, replayed = await idempotency_cache.run((idem_key, fingerprint), fn)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+# --- Scenes ---
+#
+# Scenes are compiled into a DAG of per-device command batches (see
+# domain/scenes.py), kept until the scene or one of its devices changes, and
+# executed with as much parallelism as their `after` dependencies allow. Scenes pushed to Tuya with
+# `intentcp scenes sync` are triggered in one cloud call while still in sync.
+
+# scene name -> (plan, aliases it depends on; None when a `kind` step makes it depend on every device)
+_SCENE_PLAN_CACHE: dict[str, tuple[ScenePlan, frozenset[str] | None]] = {}
+
+
+def _drop_stale_plans(diff: RegistryDiff) -> None:
+    """Forget plans whose scene or devices changed; the rest stay compiled."""
+    for name, (_, aliases) in list(_SCENE_PLAN_CACHE.items()):
+        if name in diff.scenes or (diff.devices and (aliases is None or aliases & diff.devices)):
+            _SCENE_PLAN_CACHE.pop(name, None)
+
+
+subscribe_registry(_drop_stale_plans)
+
+
+def _resolve_scene_command(alias: str, info: DeviceInfo, action: str, value: Any) -> tuple[str, str, str, str, Any]:
+    cmd = get_driver(info).resolve(alias, info, action, value)
+    return driver_name(info), cmd.target, cmd.lane_key, cmd.code, cmd.value
+
+
+def get_scene_plan(name: str) -> ScenePlan:
+    scene = get_scene_registry().get(name)  # reloads devices.toml (and drops stale plans) if it changed
+    version = get_registry_version()
+    cached = _SCENE_PLAN_CACHE.get(name)
+    if cached is not None:
+        return cached[0]
+
+    if scene is None:
+        raise HTTPException(status_code=404, detail=f"Unknown scene: {name}")
+    try:
+        plan = compile_scene(name, scene, get_device_registry(), _resolve_scene_command)
+    except (DriverError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Scene '{name}' cannot be compiled: {e}")
+
+    devices = [step.device for step in scene.steps]
+    if get_registry_version() == version:  # not reloaded while compiling
+        _SCENE_PLAN_CACHE[name] = (plan, None if None in devices else frozenset(devices))
+    return plan
+
+
+async def _execute_scene_plan(plan: ScenePlan) -> list[dict[str, Any]]:
+    """Run every node as soon as its dependencies are done (and its delay elapsed)."""
+    tasks: dict[int, asyncio.Task] = {}
+    latencies: dict[int, float] = {}
+
+    async def _run_node(index: int) -> Any:
+        node = plan.nodes[index]
+        if node.depends_on:
+            await asyncio.gather(*(tasks[dep] for dep in node.depends_on))
+        if node.delay > 0:
+            await anyio.sleep(node.delay)
+        started = time.perf_counter()
+        try:
+            return await get_driver_by_name(node.driver).batch(node.device_id, node.commands, node.lane_key)
+        finally:
+            latencies[index] = (time.perf_counter() - started) * 1000
+
+    for node in plan.nodes:
+        tasks[node.index] = asyncio.create_task(_run_node(node.index))
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    results: list[dict[str, Any]] = []
+    for node in plan.nodes:
+        task = tasks[node.index]
+        entry: dict[str, Any] = {"devices": node.aliases, "commands": node.commands, "delay": node.delay}
+        if task.exception() is not None:
+            entry.update(ok=False, error=f"{type(task.exception()).__name__}: {task.exception()}")
         else:
-            device_id = _resolve_off_device_id(info)
-            code = _command_code_off(info)
-            resp = tuya_client.send_command(device_id, code, False)
+            resp = task.result()
+            response_key = getattr(get_driver_by_name(node.driver), "response_key", "response")
+            entry.update(ok=not (isinstance(resp, dict) and resp.get("success") is False), **{response_key: resp})
+        results.append(entry)
+        for alias in node.aliases:
+            event_log.record(
+                "command",
+                device=alias,
+                action=f"scene:{plan.name}",
+                ok=entry["ok"],
+                latency_ms=latencies.get(node.index),
+                commands=node.commands,
+                **({"error": entry["error"]} if "error" in entry else {}),
+            )
+    return results
+
+
+async def _run_scene_in_background(plan: ScenePlan) -> None:
+    results = await _execute_scene_plan(plan)
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        logger.warning("Scene %s finished with %d failed step(s): %s", plan.name, len(failed), failed)
+
+
+@router.get("/scenes")
+async def list_scenes() -> dict[str, Any]:
+    scenes = get_scene_registry()
+    return {
+        "ok": True,
+        "scenes": [
+            {"name": name, "description": scene.description, "steps": len(scene.steps)}
+            for name, scene in sorted(scenes.items())
+        ],
+    }
+
+
+@router.post("/scene/{name}")
+@router.get("/scene/{name}")
+@router.post("/sequence/{name}")
+@router.get("/sequence/{name}")
+async def run_scene(
+    name: str,
+    response: Response,
+    local: bool = Query(False, description="Always fan out locally, even if a synced cloud scene exists"),
+    idem: str | None = Query(None, description="Idempotency key (alternative to the header)"),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+) -> dict[str, Any]:
+    """Run a scene declared under [scenes.<name>] in devices.toml.
+
+    If the scene was synced to a Tuya tap-to-run scene and its config has not
+    changed since, the remote scene is triggered in a single call; otherwise (or
+    if that call fails) commands are fanned out locally. Scenes without delays
+    are awaited and report per-batch results; scenes with delayed steps are
+    started in the background and return immediately.
+    """
+    async def _run() -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = await _start()
+        except Exception as e:
+            latency_ms = (time.perf_counter() - started) * 1000
+            event_log.record("scene", action=name, ok=False, latency_ms=latency_ms, error=str(e))
+            raise
+        event_log.record(
+            "scene",
+            action=name,
+            ok=result.get("ok", True),
+            latency_ms=(time.perf_counter() - started) * 1000,
+            mode=result.get("mode"),
+            **({"fallback_reason": result["fallback_reason"]} if "fallback_reason" in result else {}),
+        )
+        return result
+
+    async def _start() -> dict[str, Any]:
+        plan = get_scene_plan(name)
+        summary = {"ok": True, "scene": name, "batches": len(plan.nodes), "skipped": plan.skipped}
+
+        fallback_reason = None
+        remote = None
+        if not local and cloud_scenes.is_offloadable(plan):
+            try:
+                # Comparing against the synced scene may fetch device specs from Tuya.
+                remote = await sdk_executor.run(cloud_scenes.remote_scene_for, plan, priority=INTERACTIVE)
+            except ExecutorSaturated as e:
+                fallback_reason = f"{type(e).__name__}: {e}"
+                logger.warning("Cloud scene %s not checked, running it locally: %s", name, fallback_reason)
+        if remote is not None:
+            try:
+                resp = await sdk_executor.run(cloud_scenes.trigger_remote_scene, remote, priority=INTERACTIVE)
+                return {**summary, "mode": "cloud", "scene_id": remote["scene_id"], "tuya_response": resp}
+            except Exception as e:
+                fallback_reason = f"{type(e).__name__}: {e}"
+                logger.warning("Cloud scene %s failed, falling back to local fan-out: %s", name, fallback_reason)
 
-        return {
-            "ok": True,
-            "device": device_name,
-            "action": action,
-            "tuya_response": resp,
-        }
+        summary["mode"] = "local"
+        if fallback_reason:
+            summary["fallback_reason"] = fallback_reason
 
-    if action == "status":
-        device_id = _resolve_status_device_id(info)
-        status = tuya_client.get_status(device_id)
-        return {"ok": True, "device": device_name, "action": "status", "status": status}
+        if plan.has_delays:
+            _spawn(_run_scene_in_background(plan))
+            return {**summary, "scheduled": True}
 
-    raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+        results = await _execute_scene_plan(plan)
+        return {**summary, "ok": all(r["ok"] for r in results), "results": results}
+
+    try:
+        return await _run_idempotent(response, idempotency_key or idem, ("scene", name, local), _run)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 # --- IntentCP v1 routes ---
@@ -136,7 +409,10 @@ def _execute_single_action_now(device_name: str, action: str) -> dict[str, Any]:
 async def v1_device_action(
     device_name: str,
     action: str,
+    response: Response,
     delay: int = Query(0, ge=0, le=86400 * 30),
+    idem: str | None = Query(None, description="Idempotency key (alternative to the header)"),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ) -> dict[str, Any]:
     """Single action endpoint.
 
@@ -144,20 +420,22 @@ async def v1_device_action(
       /living_light/on
       /subdesk_light/off?delay=10
       /living_light/status
+      /living_light/on?idem=3f2a9c   (retries within the window are not re-executed)
     """
-    try:
+    async def _run() -> dict[str, Any]:
         if delay == 0:
-            return _execute_single_action_now(device_name, action)
+            return await _execute_single_action_now(device_name, action)
 
         # Schedule and return immediately
-        asyncio.create_task(_run_after_delay(delay, _execute_single_action_now, device_name, action))
-        return {
-            "ok": True,
-            "scheduled": True,
-            "device": device_name,
-            "action": action,
-            "delay": delay,
-        }
+        return _schedule_action(device_name, action, delay)
+
+    try:
+        return await _run_idempotent(
+            response,
+            idempotency_key or idem,
+            ("action", device_name, action, delay),
+            _run,
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -166,7 +444,12 @@ async def v1_device_action(
 
 @router.post("/sequence")
 @router.get("/sequence")
-async def v1_sequence(actions: str = Query(...)) -> dict[str, Any]:
+async def v1_sequence(
+    response: Response,
+    actions: str = Query(...),
+    idem: str | None = Query(None, description="Idempotency key (alternative to the header)"),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+) -> dict[str, Any]:
     """Execute multiple actions in order.
 
     Query:
@@ -181,89 +464,69 @@ async def v1_sequence(actions: str = Query(...)) -> dict[str, Any]:
     Notes:
       - Steps are executed in the order they appear.
       - Each step can have its own delay (relative to *now*).
+      - A delayed step identical to one already pending is not scheduled twice.
     """
-    try:
+    async def _run() -> dict[str, Any]:
         steps = _parse_sequence_actions(actions)
 
         scheduled: list[dict[str, Any]] = []
         for idx, step in enumerate(steps):
             # For now, we schedule each step independently relative to now.
-            asyncio.create_task(_run_after_delay(step.delay, _execute_single_action_now, step.device, step.action))
+            if step.delay > 0:
+                entry = _schedule_action(step.device, step.action, step.delay)
+            else:
+                _spawn(_run_after_delay(0, _execute_single_action_now, step.device, step.action))
+                entry = {"device": step.device, "action": step.action, "delay": 0}
             scheduled.append(
                 {
                     "index": idx,
                     "device": step.device,
                     "action": step.action,
-                    "delay": step.delay,
+                    "delay": entry["delay"],
+                    **({"deduplicated": True} if entry.get("deduplicated") else {}),
                 }
             )
 
         return {"ok": True, "scheduled": True, "count": len(scheduled), "steps": scheduled}
 
+    try:
+        return await _run_idempotent(response, idempotency_key or idem, ("sequence", actions), _run)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Helper functions to resolve Tuya command codes for ON/OFF based on device metadata
-def _command_code_on(info: DeviceInfo) -> str:
-    """
-    Decide which Tuya command code to use for turning a device ON.
-
-    Heuristic for now:
-    - Dimmable lights (supports_brightness): use 'switch_led'
-    - Everything else (Fingerbot, smart plug, etc.): use 'switch_1'
-    Later this can be driven fully from config.
-    """
-    if info.kind == DeviceKind.LIGHT and info.supports_brightness:
-        return "switch_led"
-    return "switch_1"
-
-
-def _command_code_off(info: DeviceInfo) -> str:
-    """
-    Decide which Tuya command code to use for turning a device OFF.
-
-    Same heuristic as _command_code_on; many Tuya devices use the same
-    boolean 'switch_1' (or 'switch_led') field for both on/off.
-    """
-    if info.kind == DeviceKind.LIGHT and info.supports_brightness:
-        return "switch_led"
-    return "switch_1"
-
-
 def _get_device_info(device_name: str) -> DeviceInfo:
-    info = DEVICE_REGISTRY.get(device_name)
+    info = get_device_registry().get(device_name)
     if not info:
         raise HTTPException(status_code=404, detail=f"Unknown device: {device_name}")
     return info
 
 
-def _resolve_on_device_id(info: DeviceInfo) -> str:
-    if getattr(info, "tuya_on_device_id", None):
-        return info.tuya_on_device_id  # type: ignore[return-value]
-    if info.tuya_device_id:
-        return info.tuya_device_id
-    raise HTTPException(status_code=500, detail="No Tuya device configured for ON")
-
-
-def _resolve_off_device_id(info: DeviceInfo) -> str:
-    if getattr(info, "tuya_off_device_id", None):
-        return info.tuya_off_device_id  # type: ignore[return-value]
-    if info.tuya_device_id:
-        return info.tuya_device_id
-    raise HTTPException(status_code=500, detail="No Tuya device configured for OFF")
+async def _drive(device_name: str, info: DeviceInfo, action: str, value: Any = None) -> dict[str, Any]:
+    """Run one action through the device's driver and wrap the standard payload.
 
-
-def _resolve_status_device_id(info: DeviceInfo) -> str:
-    # Prefer main device_id, then ON, then OFF as a fallback for status checks
-    if info.tuya_device_id:
-        return info.tuya_device_id
-    if getattr(info, "tuya_on_device_id", None):
-        return info.tuya_on_device_id  # type: ignore[return-value]
-    if getattr(info, "tuya_off_device_id", None):
-        return info.tuya_off_device_id  # type: ignore[return-value]
-    raise HTTPException(status_code=500, detail="No Tuya device configured for status")
+    Every call is recorded in the event log with its latency and outcome.
+    """
+    kind = "status" if action == "status" else "command"
+    extra: dict[str, Any] = {} if value is None else {"value": value}
+    started = time.perf_counter()
+    try:
+        result = await get_driver(info).execute(device_name, info, action, value)
+    except Exception as e:
+        extra["error"] = str(e)
+        latency_ms = (time.perf_counter() - started) * 1000
+        event_log.record(kind, device=device_name, action=action, ok=False, latency_ms=latency_ms, **extra)
+        if isinstance(e, (UnsupportedAction, InvalidValue, InvalidCommand)):
+            raise HTTPException(status_code=400, detail=str(e))
+        if isinstance(e, DriverError):
+            raise HTTPException(status_code=500, detail=str(e))
+        if isinstance(e, ExecutorSaturated):
+            raise HTTPException(status_code=503, detail=str(e))
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000
+    event_log.record(kind, device=device_name, action=action, ok=True, latency_ms=latency_ms, **extra)
+    return {"ok": True, "device": device_name, "action": action, **result}
 
 
 
@@ -272,15 +535,7 @@ def _resolve_status_device_id(info: DeviceInfo) -> str:
 async def device_on(device_name: str) -> dict[str, Any]:
     info = _get_device_info(device_name)
     try:
-        device_id = _resolve_on_device_id(info)
-        code = _command_code_on(info)
-        resp = tuya_client.send_command(device_id, code, True)
-        return {
-            "ok": True,
-            "device": device_name,
-            "action": "on",
-            "tuya_response": resp,
-        }
+        return await _drive(device_name, info, "on")
     except HTTPException:
         raise
     except Exception as e:
@@ -293,15 +548,7 @@ async def device_on(device_name: str) -> dict[str, Any]:
 async def device_off(device_name: str) -> dict[str, Any]:
     info = _get_device_info(device_name)
     try:
-        device_id = _resolve_off_device_id(info)
-        code = _command_code_off(info)
-        resp = tuya_client.send_command(device_id, code, False)
-        return {
-            "ok": True,
-            "device": device_name,
-            "action": "off",
-            "tuya_response": resp,
-        }
+        return await _drive(device_name, info, "off")
     except HTTPException:
         raise
     except Exception as e:
@@ -319,10 +566,8 @@ async def device_brightness(device_name: str, value: int) -> dict[str, Any]:
         raise HTTPException(status_code=400, detail="Brightness must be between 1 and 100")
 
     try:
-        if not info.tuya_device_id:
-            raise HTTPException(status_code=500, detail="No Tuya device configured for brightness control")
-        tuya_client.send_command(info.tuya_device_id, "bright_value_v2", value)
-        return {"ok": True, "device": device_name, "action": "brightness", "value": value}
+        result = await _drive(device_name, info, "brightness", value)
+        return {**result, "value": value}
     except HTTPException:
         raise
     except Exception as e:
@@ -333,63 +578,9 @@ async def device_brightness(device_name: str, value: int) -> dict[str, Any]:
 async def device_status(device_name: str) -> dict[str, Any]:
     info = _get_device_info(device_name)
     try:
-        device_id = _resolve_status_device_id(info)
-        status = tuya_client.get_status(device_id)
-        return {"ok": True, "device": device_name, "status": status}
+        result = await _drive(device_name, info, "status")
+        return {"ok": True, "device": device_name, "status": result["status"]}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/sequence/{name}")
-async def run_sequence(name: str) -> dict[str, Any]:
-    """
-    Basic preset sequences.
-    movie: turn off main lights (bed, subdesk)
-    sleep: turn off all lights
-    mood: turn on bed light with ~40% brightness
-    """
-    try:
-        if name == "movie":
-            for name in ["bed_light", "subdesk_light"]:
-                info = DEVICE_REGISTRY.get(name)
-                if info:
-                    device_id = _resolve_off_device_id(info)
-                    tuya_client.send_command(device_id, "switch_led", False)
-
-            return {"ok": True, "sequence": "movie"}
-
-        elif name == "sleep":
-            for name, info in DEVICE_REGISTRY.items():
-                try:
-                    device_id = _resolve_off_device_id(info)
-                except HTTPException:
-                    continue
-                tuya_client.send_command(device_id, "switch_led", False)
-
-            return {"ok": True, "sequence": "sleep"}
-
-        elif name == "mood":
-            info = DEVICE_REGISTRY.get("bed_light")
-            if not info:
-                raise HTTPException(status_code=404, detail="bed_light not defined")
-
-            device_id = _resolve_on_device_id(info)
-            tuya_client.send_command(device_id, "switch_led", True)
-            try:
-                if info.supports_brightness and info.tuya_device_id:
-                    tuya_client.send_command(info.tuya_device_id, "bright_value_v2", 40)
-            except Exception:
-                # brightness failure is non-fatal for mood sequence
-                pass
-
-            return {"ok": True, "sequence": "mood"}
-
-        else:
-            raise HTTPException(status_code=400, detail="Unknown sequence")
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,70 @@
+# src/intentcp_core/routers/events.py
+import re
+import time
+from datetime import datetime
+from typing import Any
+
+import anyio
+from fastapi import APIRouter, HTTPException, Query
+
+from ..domain.devices import get_device_registry
+from ..services.events import event_log
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# "Why didn't the light turn off last night?":
+#   GET /events?device=bed_light&since=12h
+#   GET /events?kind=job&since=2025-01-31T22:00
+# `since`/`until` take epoch seconds, ISO-8601 timestamps or a relative age (30m, 12h, 7d).
+
+_AGE_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time_param(value: str | None, name: str) -> float | None:
+    """Epoch seconds, ISO-8601 or an age like "30m"/"12h"/"7d" -> epoch seconds."""
+    if value is None:
+        return None
+    value = value.strip()
+    match = _AGE_RE.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * _AGE_UNITS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value!r}")
+
+
+def _device_keys(device: str) -> list[str]:
+    """A device alias plus the Tuya ids its low-level events are recorded under."""
+    info = get_device_registry().get(device)
+    if info is None:
+        return [device]
+    ids = (info.tuya_device_id, info.tuya_on_device_id, info.tuya_off_device_id)
+    return [device, *dict.fromkeys(i for i in ids if i)]
+
+
+@router.get("")
+@router.get("/")
+async def events_list(
+    device: str | None = Query(None, description="Device alias (or raw Tuya device id)"),
+    since: str | None = Query(None),
+    until: str | None = Query(None),
+    kind: str | None = Query(None, description="command, status, scene, schedule, job, schedule_run, rule, tuya"),
+    limit: int = Query(200, ge=1, le=5000),
+) -> dict[str, Any]:
+    devices = _device_keys(device) if device else None
+    events = await anyio.to_thread.run_sync(
+        lambda: event_log.query(
+            devices=devices,
+            since=parse_time_param(since, "since"),
+            until=parse_time_param(until, "until"),
+            kind=kind,
+            limit=limit,
+        )
+    )
+    return {"ok": True, "count": len(events), "events": events}
@@ -1,7 +1,14 @@
 from fastapi import APIRouter
 
+from ..services.sdk_executor import sdk_executor
+
 router = APIRouter(prefix="/health", tags=["health"])
 
 @router.get("/")
 async def health():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@router.get("/executor")
+async def executor_stats():
+    """Saturation of the worker pool that runs blocking Tuya/agent calls."""
+    return {"ok": True, **sdk_executor.stats()}
@@ -1,13 +1,31 @@
 # src/intentcp_core/routers/panel.py
 from __future__ import annotations
 
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
 
+import anyio
 import tomllib
-from fastapi import APIRouter, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Form, Query, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+
+from ..config.service import ConfigSnapshot
+from ..config.settings import settings_file
+from ..config.toml_edit import atomic_write_text
+from ..domain.devices import DeviceInfo, devices_file, get_device_registry
+from ..services.config_check import ConfigProblem, check_devices_toml
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/panel", tags=["panel"])
 
@@ -18,49 +36,110 @@ BASE_DIR = Path(__file__).resolve().parents[3]
 WEB_DIR = BASE_DIR / "web"
 TEMPLATES_DIR = WEB_DIR / "templates"
 
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+_templates = None
 
 # Config lives at repo root: intentcp-core/config/*.toml
 SETTINGS_FILE = BASE_DIR / "config" / "settings.toml"
 DEVICES_FILE = BASE_DIR / "config" / "devices.toml"
+# Compiled templates survive restarts here (next to the config snapshots).
+TEMPLATE_CACHE_DIR = BASE_DIR / "config" / ".cache" / "jinja"
+
+
+def _get_templates():
+    """Create the Jinja2 environment on first render (keeps jinja2 off the import path)."""
+    global _templates
+    if _templates is None:
+        import jinja2
+        from fastapi.templating import Jinja2Templates
+
+        bytecode_cache = None
+        try:
+            TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+        except OSError:
+            pass  # read-only install: templates are compiled once per process instead
+        env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(str(TEMPLATES_DIR)),
+            autoescape=True,
+            bytecode_cache=bytecode_cache,
+        )
+        _templates = Jinja2Templates(env=env)
+    return _templates
 
-# ─────────────────────────────────────────────────────────────
-# Simple in-process cache (reloads automatically when files change)
-# ─────────────────────────────────────────────────────────────
-_SETTINGS_CACHE: Dict[str, Any] = {"mtime": None, "raw": "", "obj": {}}
-_DEVICES_CACHE: Dict[str, Any] = {"mtime": None, "raw": "", "obj": {}}
 
+def _render(template_name: str, context: Dict[str, Any]) -> str:
+    return _get_templates().get_template(template_name).render(context)
 
-def _parse_toml(text: str) -> Dict[str, Any]:
-    if not text.strip():
-        return {}
-    return tomllib.loads(text)
 
+# --- cached, compressed responses -------------------------------------------
+#
+# Panel pages are a pure function of the config files' content (plus the query),
+# so each is rendered and gzipped once per content and served from memory; the
+# ETag (a hash of the body) lets a phone revalidate with a 304 instead of
+# downloading the page again. Keys carry the ConfigFile versions, so an edit
+# (through the panel, the CLI or an editor) simply misses the cache.
 
-def _load_toml_file(path: Path, cache: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-    """Load TOML text + parsed object with mtime-based caching."""
-    if not path.exists():
-        cache["mtime"] = None
-        cache["raw"] = ""
-        cache["obj"] = {}
-        return "", {}
+_RESPONSE_CACHE_SIZE = 64
+_GZIP_MIN_BYTES = 1024
 
-    mtime = path.stat().st_mtime
-    if cache.get("mtime") == mtime:
-        return cache.get("raw", ""), cache.get("obj", {})
 
-    raw = path.read_text(encoding="utf-8")
-    obj = _parse_toml(raw)
+@dataclass(frozen=True)
+class _Body:
+    etag: str
+    media_type: str
+    content: bytes
+    gzipped: Optional[bytes]
 
-    cache["mtime"] = mtime
-    cache["raw"] = raw
-    cache["obj"] = obj
-    return raw, obj
 
+_RESPONSES: "OrderedDict[Tuple[Any, ...], _Body]" = OrderedDict()
+_RESPONSES_LOCK = threading.Lock()
 
-def _invalidate_config_cache() -> None:
-    _SETTINGS_CACHE["mtime"] = None
-    _DEVICES_CACHE["mtime"] = None
+
+def _body(text: str, media_type: str = "text/html; charset=utf-8") -> _Body:
+    content = text.encode("utf-8")
+    etag = '"' + hashlib.blake2b(content, digest_size=12).hexdigest() + '"'
+    gzipped = gzip.compress(content, compresslevel=6) if len(content) >= _GZIP_MIN_BYTES else None
+    return _Body(etag, media_type, content, gzipped)
+
+
+def _cached_body(key: Tuple[Any, ...], render: Callable[[], str], media_type: str = "text/html; charset=utf-8") -> _Body:
+    with _RESPONSES_LOCK:
+        body = _RESPONSES.get(key)
+        if body is not None:
+            _RESPONSES.move_to_end(key)
+            return body
+    body = _body(render(), media_type)
+    with _RESPONSES_LOCK:
+        _RESPONSES[key] = body
+        while len(_RESPONSES) > _RESPONSE_CACHE_SIZE:
+            _RESPONSES.popitem(last=False)
+    return body
+
+
+def _send(request: Request, body: _Body) -> Response:
+    """The body as a response: 304 if the client has it, gzipped if it accepts that."""
+    headers = {"ETag": body.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    # Proxies may weaken the tag (W/"...") after re-encoding; compare the opaque part.
+    if if_none_match.strip() == "*" or body.etag in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    if body.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(body.gzipped, media_type=body.media_type, headers=headers)
+    return Response(body.content, media_type=body.media_type, headers=headers)
+
+
+def _parse_toml(text: str) -> Dict[str, Any]:
+    if not text.strip():
+        return {}
+    return tomllib.loads(text)
+
+
+def _save_text(path: Path, text: str) -> None:
+    """Write an edited config file atomically; an unchanged file is left alone."""
+    text = text.replace("\r\n", "\n")  # browsers submit CRLF
+    if not path.exists() or path.read_text(encoding="utf-8") != text:
+        atomic_write_text(path, text)
 
 
 def _format_toml_error(e: Exception) -> str:
@@ -80,27 +159,46 @@ def _mask_settings(d: Dict[str, Any]) -> Dict[str, Any]:
     return masked
 
 
+def _mask_device(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Mask the LAN key of a `[devices.*]` entry for display purposes."""
+    if not d.get("local_key"):
+        return d
+    return {**d, "local_key": "********"}
+
+
 def _render_or_error(request: Request, template_name: str, context: Dict[str, Any]) -> HTMLResponse:
     """Render a template; if it fails, return a readable HTML error page."""
     try:
-        return templates.TemplateResponse(template_name, context)
+        return _get_templates().TemplateResponse(request, template_name, context)
     except Exception as e:
-        details = (
-            f"Template render failed: {template_name}\n"
-            f"Error: {type(e).__name__}: {e}\n\n"
-            f"BASE_DIR: {BASE_DIR}\n"
-            f"TEMPLATES_DIR: {TEMPLATES_DIR}\n"
-            f"SETTINGS_FILE: {SETTINGS_FILE}\n"
-            f"DEVICES_FILE: {DEVICES_FILE}\n"
-            f"SETTINGS_FILE exists: {SETTINGS_FILE.exists()}\n"
-            f"DEVICES_FILE exists: {DEVICES_FILE.exists()}\n"
-        )
-        return HTMLResponse(
-            "<!doctype html><html><body style='font-family: ui-monospace, monospace; white-space: pre-wrap; padding: 20px;'>"
-            + details
-            + "</body></html>",
-            status_code=500,
-        )
+        return _render_error(template_name, e)
+
+
+def _render_error(template_name: str, e: Exception) -> HTMLResponse:
+    details = (
+        f"Template render failed: {template_name}\n"
+        f"Error: {type(e).__name__}: {e}\n\n"
+        f"BASE_DIR: {BASE_DIR}\n"
+        f"TEMPLATES_DIR: {TEMPLATES_DIR}\n"
+        f"SETTINGS_FILE: {SETTINGS_FILE}\n"
+        f"DEVICES_FILE: {DEVICES_FILE}\n"
+        f"SETTINGS_FILE exists: {SETTINGS_FILE.exists()}\n"
+        f"DEVICES_FILE exists: {DEVICES_FILE.exists()}\n"
+    )
+    return HTMLResponse(
+        "<!doctype html><html><body style='font-family: ui-monospace, monospace; white-space: pre-wrap; padding: 20px;'>"
+        + details
+        + "</body></html>",
+        status_code=500,
+    )
+
+
+def _cached_page(request: Request, key: Tuple[Any, ...], template_name: str, context: Callable[[], Dict[str, Any]]) -> Response:
+    """`_render_or_error` for pages that only depend on `key`: rendered once, then 304/gzip."""
+    try:
+        return _send(request, _cached_body(key, lambda: _render(template_name, context())))
+    except Exception as e:
+        return _render_error(template_name, e)
 
 
 @router.get("/ping")
@@ -134,42 +232,34 @@ async def panel_debug(request: Request):
 
 @router.get("/", response_class=HTMLResponse)
 async def panel_index(request: Request):
-    settings_raw, settings_obj = _load_toml_file(SETTINGS_FILE, _SETTINGS_CACHE)
-    devices_raw, devices_obj = _load_toml_file(DEVICES_FILE, _DEVICES_CACHE)
-
-    device_count = len((devices_obj.get("devices", {}) or {}).keys())
-    masked_settings = _mask_settings(settings_obj)
+    settings = settings_file().read()
+    devices = _current_devices()
 
-    return _render_or_error(
-        request,
-        "panel/index.html",
-        {
-            "request": request,
+    def context() -> Dict[str, Any]:
+        return {
             "settings_path": str(SETTINGS_FILE),
             "devices_path": str(DEVICES_FILE),
-            "device_count": device_count,
-            "settings_preview": masked_settings,
-        },
-    )
+            "device_count": len((devices.data.get("devices", {}) or {}).keys()),
+            "settings_preview": _mask_settings(settings.data),
+        }
+
+    return _cached_page(request, ("index", settings.version, devices.version), "panel/index.html", context)
 
 
 @router.get("/settings", response_class=HTMLResponse)
 async def panel_settings(request: Request, saved: int = 0):
-    raw, parsed = _load_toml_file(SETTINGS_FILE, _SETTINGS_CACHE)
-    preview = _mask_settings(parsed)
+    snapshot = settings_file().read()
 
-    return _render_or_error(
-        request,
-        "panel/settings.html",
-        {
-            "request": request,
+    def context() -> Dict[str, Any]:
+        return {
             "path": str(SETTINGS_FILE),
-            "raw_toml": raw,
-            "preview": preview,
+            "raw_toml": snapshot.text,
+            "preview": _mask_settings(snapshot.data),
             "saved": bool(saved),
             "error": None,
-        },
-    )
+        }
+
+    return _cached_page(request, ("settings", snapshot.version, bool(saved)), "panel/settings.html", context)
 
 
 @router.post("/settings", response_class=HTMLResponse)
@@ -191,51 +281,393 @@ async def panel_settings_save(request: Request, toml_text: str = Form(...)):
             },
         )
 
-    SETTINGS_FILE.write_text(toml_text, encoding="utf-8")
-    _invalidate_config_cache()
+    _save_text(SETTINGS_FILE, toml_text)
     return RedirectResponse(url="/panel/settings?saved=1", status_code=303)
 
 
-@router.get("/devices", response_class=HTMLResponse)
-async def panel_devices(request: Request, saved: int = 0):
-    raw, parsed = _load_toml_file(DEVICES_FILE, _DEVICES_CACHE)
-    devices = parsed.get("devices", {}) or {}
+def _discovered_devices(devices: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """LAN discovery cache rows, matched to aliases in devices.toml."""
+    from ..services.discovery import discovery_cache
 
-    return _render_or_error(
-        request,
-        "panel/devices.html",
+    aliases = {str(d.get("tuya_device_id")): a for a, d in devices.items() if isinstance(d, dict) and d.get("tuya_device_id")}
+    now = time.time()
+    return [
         {
-            "request": request,
-            "path": str(DEVICES_FILE),
-            "raw_toml": raw,
-            "device_names": sorted(list(devices.keys())),
-            "devices": devices,
-            "saved": bool(saved),
-            "error": None,
-        },
-    )
+            "device_id": device_id,
+            "alias": aliases.get(device_id),
+            "ip": entry.get("ip"),
+            "version": entry.get("version") or "?",
+            "age_s": int(now - entry.get("seen_at", now)),
+        }
+        for device_id, entry in discovery_cache.entries().items()
+    ]
 
 
-@router.post("/devices", response_class=HTMLResponse)
-async def panel_devices_save(request: Request, toml_text: str = Form(...)):
+def _telemetry_series() -> list[Dict[str, Any]]:
+    """Recorded telemetry series (empty until something was recorded)."""
+    from ..services.telemetry import telemetry_store
+
+    if not telemetry_store.path.exists():
+        return []
+    return telemetry_store.series()
+
+
+# --- device grid ---------------------------------------------------------------
+
+_DEFAULT_PAGE_SIZE = 50
+_MAX_PAGE_SIZE = 500
+
+_ROWS: Tuple[int, list[Dict[str, Any]]] = (0, [])
+
+
+def _current_devices() -> ConfigSnapshot:
+    """devices.toml from the shared cache; an empty stand-in (version 0) while the file does not parse."""
     try:
-        parsed = _parse_toml(toml_text)  # validate
-    except Exception as e:
-        # Render inline error (no redirect)
-        return _render_or_error(
-            request,
-            "panel/devices.html",
+        return devices_file().read()
+    except ValueError:
+        return ConfigSnapshot(DEVICES_FILE, "", "", {}, 0)
+
+
+def _device_rows(snapshot: ConfigSnapshot) -> list[Dict[str, Any]]:
+    """One display row per `[devices.*]` entry, built once per devices.toml content."""
+    global _ROWS
+    version, rows = _ROWS
+    if version == snapshot.version:
+        return rows
+    rows = []
+    for name, d in sorted((snapshot.data.get("devices", {}) or {}).items()):
+        d = d if isinstance(d, dict) else {}
+        words = [name, *(str(v) for k, v in d.items() if k != "local_key" and isinstance(v, (str, int)))]
+        kind = str(d.get("kind") or "")
+        # "state": readable Tuya state (switch + slider, kept live by the stream);
+        # "buttons": write-only (dual Fingerbots, agents); "none": sensors.
+        if kind == "sensor":
+            control = "none"
+        elif d.get("tuya_device_id") and d.get("driver") in (None, "", "tuya"):
+            control = "state"
+        else:
+            control = "buttons"
+        rows.append(
             {
-                "request": request,
-                "path": str(DEVICES_FILE),
-                "raw_toml": toml_text,
-                "device_names": [],
-                "devices": {},
-                "saved": False,
-                "error": _format_toml_error(e),
-            },
+                "name": name,
+                "kind": kind,
+                "location": str(d.get("location") or ""),
+                "fields": _mask_device(d),  # the grid is cached and served to every panel client
+                "search": " ".join(words).lower(),
+                "control": control,
+                "brightness": control == "state" and d.get("supports_brightness") is True,
+            }
         )
+    _ROWS = (snapshot.version, rows)
+    return rows
+
+
+def _filter_rows(rows: list[Dict[str, Any]], kind: str, location: str, q: str) -> list[Dict[str, Any]]:
+    terms = q.lower().split()
+    return [
+        r
+        for r in rows
+        if (not kind or r["kind"] == kind)
+        and (not location or r["location"] == location)
+        and all(t in r["search"] for t in terms)
+    ]
+
+
+def _grid_query(kind: str, location: str, q: str, per_page: int, page: int) -> str:
+    params = {"kind": kind, "location": location, "q": q, "page": page}
+    if per_page != _DEFAULT_PAGE_SIZE:
+        params["per_page"] = per_page
+    return urlencode({k: v for k, v in params.items() if v and not (k == "page" and v == 1)})
+
+
+def _grid_context(snapshot: ConfigSnapshot, kind: str, location: str, q: str, page: int, per_page: int) -> Dict[str, Any]:
+    rows = _device_rows(snapshot)
+    matched = _filter_rows(rows, kind, location, q)
+    pages = max(1, -(-len(matched) // per_page))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * per_page
+
+    def url(p: int) -> str:
+        query = _grid_query(kind, location, q, per_page, p)
+        return "/panel/devices" + ("?" + query if query else "")
+
+    return {
+        "rows": matched[start : start + per_page],
+        "total": len(rows),
+        "matched": len(matched),
+        "first": start + 1 if matched else 0,
+        "last": min(start + per_page, len(matched)),
+        "page": page,
+        "pages": pages,
+        "prev_url": url(page - 1) if page > 1 else None,
+        "next_url": url(page + 1) if page < pages else None,
+    }
+
+
+def _grid_html(snapshot: ConfigSnapshot, kind: str, location: str, q: str, page: int, per_page: int) -> _Body:
+    key = ("grid", snapshot.version, kind, location, q, page, per_page)
+    return _cached_body(key, lambda: _render("panel/_device_grid.html", _grid_context(snapshot, kind, location, q, page, per_page)))
+
+
+def _devices_context(
+    snapshot: ConfigSnapshot,
+    kind: str = "",
+    location: str = "",
+    q: str = "",
+    page: int = 1,
+    per_page: int = _DEFAULT_PAGE_SIZE,
+) -> Dict[str, Any]:
+    rows = _device_rows(snapshot)
+    devices = snapshot.data.get("devices", {}) or {}
+    return {
+        "path": str(DEVICES_FILE),
+        "grid_html": _grid_html(snapshot, kind, location, q, page, per_page).content.decode("utf-8"),
+        "kinds": sorted({r["kind"] for r in rows if r["kind"]}),
+        "locations": sorted({r["location"] for r in rows if r["location"]}),
+        "filters": {"kind": kind, "location": location, "q": q, "per_page": per_page},
+        "page_sizes": sorted({25, _DEFAULT_PAGE_SIZE, 100, 200, per_page}),
+        "discovered": _discovered_devices(devices),
+        "telemetry": _telemetry_series(),
+        # The editor loads /panel/devices/raw on demand; only a file with problems is inlined.
+        "raw_toml": None,
+        "saved": False,
+        "problems": [],
+    }
+
+
+@router.get("/devices", response_class=HTMLResponse)
+async def panel_devices(
+    request: Request,
+    saved: int = 0,
+    kind: str = "",
+    location: str = "",
+    q: str = "",
+    page: int = Query(1, ge=1),
+    per_page: int = Query(_DEFAULT_PAGE_SIZE, ge=1, le=_MAX_PAGE_SIZE),
+):
+    snapshot = _current_devices()
+    context = _devices_context(snapshot, kind, location, q, page, per_page)
+    context["saved"] = bool(saved)
+    if DEVICES_FILE.exists() and not await anyio.to_thread.run_sync(_devices_load):
+        # Broken outside the panel (the server keeps the last good registry): show why.
+        text = DEVICES_FILE.read_text(encoding="utf-8", errors="replace")
+        context.update({"raw_toml": text, "problems": await anyio.to_thread.run_sync(check_devices_toml, text)})
+    # Discovery and telemetry change by the second, so this page is not cached
+    # as a whole; the grid inside it is, and the page is still gzipped.
+    try:
+        return _send(request, _body(_render("panel/devices.html", context)))
+    except Exception as e:
+        return _render_error("panel/devices.html", e)
+
+
+@router.get("/devices/grid", response_class=HTMLResponse)
+async def panel_devices_grid(
+    request: Request,
+    kind: str = "",
+    location: str = "",
+    q: str = "",
+    page: int = Query(1, ge=1),
+    per_page: int = Query(_DEFAULT_PAGE_SIZE, ge=1, le=_MAX_PAGE_SIZE),
+):
+    """The device table alone (for filtering and paging without a page load)."""
+    try:
+        return _send(request, _grid_html(_current_devices(), kind, location, q, page, per_page))
+    except Exception as e:
+        return _render_error("panel/_device_grid.html", e)
+
+
+@router.get("/devices/raw")
+async def panel_devices_raw(request: Request):
+    """devices.toml as text, for the editor."""
+    snapshot = _current_devices()
+    if not snapshot.version:
+        text = DEVICES_FILE.read_text(encoding="utf-8", errors="replace") if DEVICES_FILE.exists() else ""
+        return _send(request, _body(text, "text/plain; charset=utf-8"))
+    return _send(request, _cached_body(("raw", snapshot.version), lambda: snapshot.text, "text/plain; charset=utf-8"))
+
+
+# --- live device state ---------------------------------------------------------
+
+_POWER_CODES = ("switch_led", "switch_1", "switch")
+# Other workers' writes (push ingestion runs on the leader only) are picked up
+# by a sweep of the shared state store; this worker's own writes wake it at once.
+_STREAM_SWEEP_S = 2.0
+_STREAM_SWEEP_OVERLAP_S = 1.0
+_STREAM_KEEPALIVE_S = 15.0
+# A command deletes the device's stored state; re-fetch it this long after
+# noticing, past panel.js's HOLD_MS, unless a report brings it back first.
+_STREAM_REFRESH_DELAY_S = 2.0
+
+# Status fetches started by streams, per device id: shared so several open
+# panels refresh a device once, and kept referenced until they finish.
+_FETCHING: set[str] = set()
+_FETCH_TASKS: set[asyncio.Task] = set()
+
+
+def _live_state(info: DeviceInfo, status: Dict[str, Any]) -> Dict[str, Any]:
+    """What the panel shows for a device: power and (for dimmers) brightness in %."""
+    from ..services.device_specs import spec_cache
+
+    codes = (info.switch_code, *_POWER_CODES) if info.switch_code else _POWER_CODES
+    state: Dict[str, Any] = {"on": next((status[c] for c in codes if isinstance(status.get(c), bool)), None)}
+    if info.supports_brightness and info.tuya_device_id:
+        state["brightness"] = spec_cache.brightness_percent(info.tuya_device_id, status)
+    return state
+
+
+async def _prime_states(device_ids: list[str]) -> None:
+    """One batched status fetch for devices with no stored state (lands via the store)."""
+    from ..services.sdk_executor import BACKGROUND, sdk_executor
+    from ..services.tuya_client import tuya_client
+
+    try:
+        await sdk_executor.run(tuya_client.get_status_batch, device_ids, priority=BACKGROUND)
+    except Exception as e:
+        logger.debug("Priming panel state for %d devices failed: %s", len(device_ids), e)
+    finally:
+        _FETCHING.difference_update(device_ids)
+
+
+def _fetch_states(device_ids: list[str]) -> None:
+    """Start `_prime_states` for the ids no other stream is already fetching."""
+    device_ids = [device_id for device_id in device_ids if device_id not in _FETCHING]
+    if not device_ids:
+        return
+    _FETCHING.update(device_ids)
+    task = asyncio.create_task(_prime_states(device_ids))
+    _FETCH_TASKS.add(task)
+    task.add_done_callback(_FETCH_TASKS.discard)
+
+
+@router.get("/devices/stream")
+async def panel_devices_stream(request: Request, devices: str = ""):
+    """Server-sent events with the state of the listed devices (`devices=a,b,c`).
+
+    Each device's stored state is sent on connect, then every change. Nothing is
+    polled from Tuya except batched fetches for devices with no stored state: on
+    connect, and shortly after a command invalidated one.
+    """
+    from ..drivers.registry import driver_name
+    from ..services.state_store import state_store
+
+    try:
+        registry = get_device_registry()
+    except Exception:
+        registry = {}  # an invalid devices.toml: nothing to watch
+    watched: Dict[str, list[Tuple[str, DeviceInfo]]] = {}
+    for name in list(dict.fromkeys(n for n in devices.split(",") if n))[:_MAX_PAGE_SIZE]:
+        info = registry.get(name)
+        if info is not None and info.tuya_device_id and driver_name(info) == "tuya":
+            watched.setdefault(info.tuya_device_id, []).append((name, info))
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+
+    def _on_state(device_id: str, values: Dict[str, Any], source: str) -> None:
+        # Called on the writer's thread.
+        if device_id in watched:
+            loop.call_soon_threadsafe(wake.set)
+
+    async def _events():
+        sent: Dict[str, Dict[str, Any]] = {}
+        seen: set[str] = set()  # watched ids with a stored state
+        refresh_at: Dict[str, float] = {}  # invalidated watched id -> when to fetch it
+        swept_at = 0.0
+
+        def _changes() -> str:
+            nonlocal swept_at
+            chunks = []
+            for device_id, status, updated_at in state_store.device_states_since(swept_at - _STREAM_SWEEP_OVERLAP_S):
+                swept_at = max(swept_at, updated_at)
+                if device_id not in watched:
+                    continue
+                seen.add(device_id)
+                refresh_at.pop(device_id, None)
+                for name, info in watched[device_id]:
+                    state = _live_state(info, status)
+                    if sent.get(name) != state:
+                        sent[name] = state
+                        chunks.append(f"data: {json.dumps({'device': name, **state})}\n\n")
+            return "".join(chunks)
+
+        def _invalidated() -> None:
+            # Commands (on any worker) delete the stored state, which the sweep
+            # cannot see: forget what was sent, so whatever comes next is sent
+            # even if unchanged, and fetch it unless a report arrives first.
+            if not seen:
+                return
+            for device_id in seen - state_store.device_ids_with_state(list(seen)):
+                seen.discard(device_id)
+                refresh_at[device_id] = time.monotonic() + _STREAM_REFRESH_DELAY_S
+                for name, _ in watched[device_id]:
+                    sent.pop(name, None)
+
+        unsubscribe = state_store.subscribe(_on_state)
+        try:
+            yield "retry: 3000\n\n" + _changes()
+            missing = [device_id for device_id in watched if device_id not in seen]
+            if missing:
+                _fetch_states(missing)
+            last_sent = time.monotonic()
+            while not await request.is_disconnected():
+                timeout = _STREAM_SWEEP_S
+                if refresh_at:
+                    timeout = max(0.0, min(timeout, min(refresh_at.values()) - time.monotonic()))
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+                chunk = _changes()
+                _invalidated()
+                now = time.monotonic()
+                due = [device_id for device_id, at in refresh_at.items() if at <= now]
+                if due:
+                    for device_id in due:
+                        del refresh_at[device_id]
+                    _fetch_states(due)
+                if not chunk and time.monotonic() - last_sent >= _STREAM_KEEPALIVE_S:
+                    chunk = ": keepalive\n\n"  # keeps proxies and phones from dropping the connection
+                if chunk:
+                    last_sent = time.monotonic()
+                    yield chunk
+        finally:
+            unsubscribe()
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _devices_load() -> bool:
+    """Whether devices.toml, as it is on disk, loads (the result is cached per content)."""
+    try:
+        devices_file().load()
+    except Exception:
+        return False
+    return True
+
+
+def _check_and_save(text: str) -> list[ConfigProblem]:
+    """Validate `text` and, only if it has no problems, save it and load the new
+    registry. Runs on a worker thread: validation reads cached specs from SQLite."""
+    problems = check_devices_toml(text)
+    if not problems:
+        _save_text(DEVICES_FILE, text)
+        get_device_registry()  # swap it in now rather than on the next command
+    return problems
+
+
+@router.post("/devices", response_class=HTMLResponse)
+async def panel_devices_save(request: Request, toml_text: str = Form(...)):
+    toml_text = toml_text.replace("\r\n", "\n")  # browsers submit CRLF
+    problems = await anyio.to_thread.run_sync(_check_and_save, toml_text)
+    if problems:
+        # Render inline errors (no redirect); the file on disk is untouched.
+        context = _devices_context(_current_devices())
+        context.update({"raw_toml": toml_text, "problems": problems})
+        return _render_or_error(request, "panel/devices.html", context)
 
-    DEVICES_FILE.write_text(toml_text, encoding="utf-8")
-    _invalidate_config_cache()
     return RedirectResponse(url="/panel/devices?saved=1", status_code=303)
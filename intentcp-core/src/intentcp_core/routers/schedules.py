@@ -0,0 +1,63 @@
+# src/intentcp_core/routers/schedules.py
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from pydantic import ValidationError
+
+from ..domain.schedules import ScheduleConfig
+from ..services.scheduler import ScheduleConflict, scheduler
+
+router = APIRouter(prefix="/schedules", tags=["schedules"])
+
+# Recurring automations ("every weekday 07:00 bed_light on"):
+#   GET    /schedules               list devices.toml + API schedules
+#   PUT    /schedules/wake_up       create/replace an API schedule (JSON body)
+#   DELETE /schedules/wake_up       remove an API schedule
+# Schedules in devices.toml ([schedules.*]) are read-only here.
+
+
+def _describe(name: str, config: ScheduleConfig, source: str) -> dict[str, Any]:
+    return {
+        "name": name,
+        "source": source,
+        "next_run": scheduler.next_run(config, name),
+        **config.model_dump(mode="json", exclude_none=True),
+    }
+
+
+@router.get("")
+@router.get("/")
+async def schedules_list() -> dict[str, Any]:
+    items = [_describe(name, config, source) for name, (config, source) in sorted(scheduler.all_schedules().items())]
+    return {"ok": True, "schedules": items}
+
+
+@router.get("/{name}")
+async def schedule_get(name: str) -> dict[str, Any]:
+    entry = scheduler.all_schedules().get(name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown schedule: {name}")
+    return {"ok": True, "schedule": _describe(name, *entry)}
+
+
+@router.put("/{name}")
+async def schedule_put(name: str, body: dict[str, Any]) -> dict[str, Any]:
+    try:
+        config = ScheduleConfig.model_validate(body)
+        scheduler.put_schedule(name, config)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except ScheduleConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, "schedule": _describe(name, config, "api")}
+
+
+@router.delete("/{name}")
+async def schedule_delete(name: str) -> dict[str, Any]:
+    if not scheduler.delete_schedule(name):
+        if name in scheduler.all_schedules():
+            raise HTTPException(status_code=409, detail=f"Schedule '{name}' is defined in devices.toml")
+        raise HTTPException(status_code=404, detail=f"Unknown schedule: {name}")
+    return {"ok": True, "deleted": name}
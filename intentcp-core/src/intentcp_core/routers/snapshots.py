@@ -0,0 +1,72 @@
+# src/intentcp_core/routers/snapshots.py
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query
+
+from ..services.snapshots import (
+    SnapshotError,
+    capture_snapshot,
+    delete_snapshot,
+    list_snapshots,
+    load_snapshot,
+    restore_snapshot,
+)
+
+router = APIRouter(prefix="/snapshots", tags=["snapshots"])
+
+# "Remember how the house looks, then restore it later":
+#   POST /snapshots/before_movie          capture current state
+#   POST /snapshots/before_movie/restore  send only what changed since
+
+
+@router.get("")
+@router.get("/")
+async def snapshots_list() -> dict[str, Any]:
+    return {"ok": True, "snapshots": list_snapshots()}
+
+
+@router.get("/{name}")
+async def snapshot_get(name: str) -> dict[str, Any]:
+    try:
+        return {"ok": True, "snapshot": load_snapshot(name)}
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {name}")
+
+
+@router.post("/{name}")
+async def snapshot_capture(name: str) -> dict[str, Any]:
+    try:
+        return {"ok": True, **(await capture_snapshot(name))}
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{name}/restore")
+@router.get("/{name}/restore")
+async def snapshot_restore(name: str, dry_run: bool = Query(False)) -> dict[str, Any]:
+    try:
+        result = await restore_snapshot(name, dry_run=dry_run)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {name}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    ok = all(r.get("ok") for r in result["results"].values())
+    return {"ok": ok, **result}
+
+
+@router.delete("/{name}")
+async def snapshot_delete(name: str) -> dict[str, Any]:
+    try:
+        delete_snapshot(name)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {name}")
+    return {"ok": True, "deleted": name}
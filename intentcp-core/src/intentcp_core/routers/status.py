@@ -1,5 +1,6 @@
 # src/intentcp_core/routers/status.py
 from fastapi import APIRouter, HTTPException
+from ..services.sdk_executor import sdk_executor
 from ..services.tuya_client import tuya_client
 
 router = APIRouter(prefix="/status", tags=["status"])
@@ -13,7 +14,7 @@ async def status_root():
 @router.get("/tuya-test/{device_id}")
 async def tuya_test(device_id: str):
     try:
-        status = tuya_client.get_status(device_id)
+        status = await sdk_executor.run(tuya_client.get_status, device_id)
         return {
             "ok": True,
             "device_id": device_id,
@@ -0,0 +1,42 @@
+# src/intentcp_core/routers/telemetry.py
+import time
+from typing import Any
+
+import anyio
+from fastapi import APIRouter, HTTPException, Query
+
+from ..services.telemetry import DAY, HOUR, MINUTE, telemetry_store
+from .events import parse_time_param
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+
+# Recorded data points (devices.toml `telemetry = [...]`):
+#   GET /telemetry                                  series + latest value + 24 h stats
+#   GET /telemetry/plug/cur_power?since=7d          range query (resolution picked automatically)
+#   GET /telemetry/plug/add_ele?since=90d&resolution=1d
+
+_RESOLUTIONS = {"1m": MINUTE, "1h": HOUR, "1d": DAY}
+
+
+@router.get("")
+@router.get("/")
+async def telemetry_series() -> dict[str, Any]:
+    return {"ok": True, "series": await anyio.to_thread.run_sync(telemetry_store.series)}
+
+
+@router.get("/{device}/{code}")
+async def telemetry_range(
+    device: str,
+    code: str,
+    since: str = Query("24h"),
+    until: str | None = Query(None),
+    resolution: str | None = Query(None, description="1m, 1h or 1d (default: fit the range)"),
+) -> dict[str, Any]:
+    if resolution is not None and resolution not in _RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="resolution must be one of 1m, 1h, 1d")
+    start = parse_time_param(since, "since")
+    end = parse_time_param(until, "until") or time.time()
+    result = await anyio.to_thread.run_sync(
+        lambda: telemetry_store.query(device, code, start, end, _RESOLUTIONS.get(resolution or ""))
+    )
+    return {"ok": True, **result}
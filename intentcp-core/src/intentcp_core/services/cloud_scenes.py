@@ -0,0 +1,230 @@
+# src/intentcp_core/services/cloud_scenes.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..config.settings import CONFIG_DIR, get_settings
+from ..config.toml_edit import atomic_write_text
+from ..domain.scenes import ScenePlan
+from .device_specs import InvalidCommand, spec_cache
+from .state_store import file_lock, lock_path
+from .tuya_client import tuya_client
+
+logger = logging.getLogger(__name__)
+
+# scene name -> {"scene_id", "home_id", "hash", "synced_at"}
+MAPPING_PATH = CONFIG_DIR / "cloud_scenes.json"
+
+# Remote scenes created by IntentCP carry this prefix so prune never touches
+# tap-to-run scenes the user made in the Smart Life app.
+REMOTE_NAME_PREFIX = "IntentCP · "
+
+_MAPPING_CACHE: Dict[str, Any] | None = None
+_MAPPING_MTIME_NS: int | None = None
+
+
+class CloudSceneError(Exception):
+    pass
+
+
+# ─────────────────────────────────────────────
+# Plan -> tap-to-run actions
+# ─────────────────────────────────────────────
+
+def is_offloadable(plan: ScenePlan) -> bool:
+    """Only immediate, Tuya-only scenes map onto a tap-to-run scene one-to-one."""
+    return bool(plan.nodes) and not plan.has_delays and all(n.driver == "tuya" for n in plan.nodes)
+
+
+def plan_actions(plan: ScenePlan) -> List[Dict[str, Any]]:
+    """Flatten the plan DAG into Tuya `dpIssue` actions in dependency order.
+
+    Tuya runs tap-to-run actions one after another, so a topological order keeps
+    every `after` constraint of the local plan. Values are what a local send
+    would put on the wire, so this reads (and may fetch) device specifications.
+    """
+    done: set[int] = set()
+    ordered: List[int] = []
+
+    def _visit(index: int) -> None:
+        if index in done:
+            return
+        done.add(index)
+        for dep in plan.nodes[index].depends_on:
+            _visit(dep)
+        ordered.append(index)
+
+    for node in plan.nodes:
+        _visit(node.index)
+
+    actions = []
+    for i in ordered:
+        node = plan.nodes[i]
+        # The same conversion TuyaDriver/tuya_client apply to a local batch:
+        # brightness percent to the device's range, codes mapped onto the ones
+        # the device has (InvalidCommand if it cannot take them).
+        commands = spec_cache.translate(node.device_id, spec_cache.scale_brightness(node.device_id, node.commands))
+        actions.append(
+            {
+                "executor": "dpIssue",
+                "entity_id": node.device_id,
+                "executor_property": {c["code"]: c["value"] for c in commands},
+            }
+        )
+    return actions
+
+
+def _actions_hash(actions: List[Dict[str, Any]]) -> str:
+    raw = json.dumps(actions, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def plan_hash(plan: ScenePlan) -> str:
+    return _actions_hash(plan_actions(plan))
+
+
+# ─────────────────────────────────────────────
+# Local mapping file
+# ─────────────────────────────────────────────
+
+def load_mapping() -> Dict[str, Any]:
+    """Read config/cloud_scenes.json (cached until the file changes)."""
+    global _MAPPING_CACHE, _MAPPING_MTIME_NS
+
+    mtime_ns = MAPPING_PATH.stat().st_mtime_ns if MAPPING_PATH.exists() else None
+    if _MAPPING_CACHE is None or _MAPPING_MTIME_NS != mtime_ns:
+        data: Dict[str, Any] = {}
+        if mtime_ns is not None:
+            try:
+                data = json.loads(MAPPING_PATH.read_text(encoding="utf-8"))
+            except Exception:
+                logger.warning("Ignoring unreadable %s", MAPPING_PATH)
+        _MAPPING_CACHE = data if isinstance(data, dict) else {}
+        _MAPPING_MTIME_NS = mtime_ns
+    return _MAPPING_CACHE
+
+
+def _save_mapping(mapping: Dict[str, Any]) -> None:
+    atomic_write_text(MAPPING_PATH, json.dumps(mapping, ensure_ascii=False, indent=2, sort_keys=True))
+
+
+def remote_scene_for(plan: ScenePlan) -> Optional[Dict[str, Any]]:
+    """Mapping entry for `plan` if the remote scene matches the current config."""
+    if not is_offloadable(plan):
+        return None
+    entry = load_mapping().get(plan.name)
+    if not entry:
+        return None
+    try:
+        digest = plan_hash(plan)
+    except InvalidCommand:
+        return None  # the local fan-out reports the bad command per batch
+    return entry if entry.get("hash") == digest else None
+
+
+# ─────────────────────────────────────────────
+# Tuya OpenAPI calls
+# ─────────────────────────────────────────────
+
+def _result(resp: Any, what: str) -> Any:
+    if not isinstance(resp, dict) or not resp.get("success"):
+        msg = resp.get("msg") if isinstance(resp, dict) else resp
+        raise CloudSceneError(f"{what} failed: {msg}")
+    return resp.get("result")
+
+
+def resolve_home_id() -> str:
+    configured = get_settings().tuya.home_id
+    if configured:
+        return str(configured)
+
+    homes = _result(tuya_client.request("GET", f"/v1.0/users/{tuya_client.user_id()}/homes"), "Listing homes")
+    if not homes:
+        raise CloudSceneError("The Tuya account has no home to create scenes in")
+    return str(homes[0]["home_id"])
+
+
+def trigger_remote_scene(entry: Dict[str, Any]) -> Any:
+    """Run a synced tap-to-run scene; raises CloudSceneError if Tuya refuses."""
+    resp = tuya_client.request("POST", f"/v1.0/homes/{entry['home_id']}/scenes/{entry['scene_id']}/trigger")
+    _result(resp, "Triggering scene")
+    return resp
+
+
+def sync_scenes(
+    plans: Iterable[ScenePlan],
+    dry_run: bool = False,
+    prune: bool = False,
+) -> List[Dict[str, Any]]:
+    """Create or update one tap-to-run scene per offloadable IntentCP scene.
+
+    Scenes whose plan hash already matches the mapping are left alone. With
+    `prune`, remote scenes for names not in `plans` are deleted as well.
+    Returns one report entry per scene.
+    """
+    with file_lock(lock_path("cloud_scenes")):
+        mapping = dict(load_mapping())
+        report: List[Dict[str, Any]] = []
+        home_id: str | None = None
+        seen: set[str] = set()
+
+        for plan in plans:
+            seen.add(plan.name)
+            entry = mapping.get(plan.name)
+
+            if not is_offloadable(plan):
+                if not plan.nodes:
+                    reason = "no commands"
+                elif plan.has_delays:
+                    reason = "has delayed steps"
+                else:
+                    reason = "uses non-Tuya devices"
+                report.append({"scene": plan.name, "action": "skipped", "reason": reason})
+                continue
+
+            try:
+                actions = plan_actions(plan)
+            except InvalidCommand as e:
+                report.append({"scene": plan.name, "action": "skipped", "reason": str(e)})
+                continue
+            digest = _actions_hash(actions)
+            if entry and entry.get("hash") == digest:
+                report.append({"scene": plan.name, "action": "unchanged", "scene_id": entry["scene_id"]})
+                continue
+
+            action = "updated" if entry else "created"
+            if dry_run:
+                report.append({"scene": plan.name, "action": action, "dry_run": True})
+                continue
+
+            if home_id is None:
+                home_id = resolve_home_id()
+            body = {"name": f"{REMOTE_NAME_PREFIX}{plan.name}", "background": "", "actions": actions}
+
+            if entry and entry.get("home_id") == home_id:
+                path = f"/v1.0/homes/{home_id}/scenes/{entry['scene_id']}"
+                _result(tuya_client.request("PUT", path, body=body), f"Updating scene '{plan.name}'")
+                scene_id = entry["scene_id"]
+            else:
+                path = f"/v1.0/homes/{home_id}/scenes"
+                scene_id = str(_result(tuya_client.request("POST", path, body=body), f"Creating scene '{plan.name}'"))
+
+            mapping[plan.name] = {"scene_id": scene_id, "home_id": home_id, "hash": digest, "synced_at": time.time()}
+            _save_mapping(mapping)
+            report.append({"scene": plan.name, "action": action, "scene_id": scene_id})
+
+        if prune:
+            for name in sorted(set(mapping) - seen):
+                entry = mapping[name]
+                if not dry_run:
+                    path = f"/v1.0/homes/{entry['home_id']}/scenes/{entry['scene_id']}"
+                    _result(tuya_client.request("DELETE", path), f"Deleting scene '{name}'")
+                    del mapping[name]
+                    _save_mapping(mapping)
+                report.append({"scene": name, "action": "deleted", "scene_id": entry["scene_id"], "dry_run": dry_run})
+
+        return report
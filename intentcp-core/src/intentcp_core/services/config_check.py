@@ -0,0 +1,164 @@
+# src/intentcp_core/services/config_check.py
+"""Checks an edited devices.toml before it is saved.
+
+Loading the file only tells "valid or not" with the first error. An editor
+needs every problem with the line it is on. It also needs the checks the
+loader cannot make: two aliases driving the same Tuya device, or a data point
+code the device does not have according to its cached specification.
+
+Runs blocking work (pydantic validation, state store reads for the specs),
+so call it on a worker thread.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import tomllib
+from pydantic import BaseModel, ValidationError
+
+from ..config.toml_edit import TomlDocument
+
+_TOML_ERROR_LINE = re.compile(r"at line (\d+)")
+# Cross-check errors name their entry: "scene 'evening' step 2: unknown device 'x'".
+_ENTRY_REFERENCE = re.compile(r"^(scene|rule|schedule) '([^']+)'")
+_ID_KEYS = ("tuya_device_id", "tuya_on_device_id", "tuya_off_device_id")
+
+
+@dataclass(frozen=True)
+class ConfigProblem:
+    message: str
+    line: Optional[int] = None  # 1-based
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.message}" if self.line else self.message
+
+
+def _validate_section(
+    doc: TomlDocument, data: Dict[str, Any], section: str, model: type[BaseModel], problems: List[ConfigProblem]
+) -> Dict[str, Any]:
+    raw = data.get(section, {})
+    if not isinstance(raw, dict):
+        problems.append(ConfigProblem(f"'{section}' must be a table of [{section}.<name>] entries", doc.line_of([section])))
+        return {}
+    entries = {}
+    for name, cfg in raw.items():
+        try:
+            entries[name] = model.model_validate(cfg)
+        except ValidationError as e:
+            for error in e.errors():
+                path = [section, name, *error["loc"]]
+                where = ".".join(str(p) for p in path)
+                problems.append(ConfigProblem(f"{where}: {error['msg']}", doc.line_of(path)))
+    return entries
+
+
+def _missing_ids(doc: TomlDocument, devices: Dict[str, Any], problems: List[ConfigProblem]) -> None:
+    """Tuya-driven devices the driver could not address (it fails only when one is used)."""
+    from ..drivers import driver_name
+
+    for name, info in devices.items():
+        if driver_name(info) == "tuya" and not any(getattr(info, key) for key in _ID_KEYS):
+            problems.append(
+                ConfigProblem(
+                    f"devices.{name}: no Tuya device configured (set tuya_device_id, "
+                    "or tuya_on_device_id/tuya_off_device_id)",
+                    doc.line_of(["devices", name]),
+                )
+            )
+
+
+def _duplicate_ids(doc: TomlDocument, devices: Dict[str, Any], problems: List[ConfigProblem]) -> None:
+    # One multi-gang switch may back several aliases, each with its own switch_code.
+    owners: Dict[Tuple[str, Optional[str]], str] = {}
+    for name, info in devices.items():
+        for key in _ID_KEYS:
+            device_id = getattr(info, key)
+            if not device_id:
+                continue
+            other = owners.setdefault((device_id, info.switch_code), name)
+            if other != name:
+                problems.append(
+                    ConfigProblem(
+                        f"devices.{name}.{key}: Tuya device '{device_id}' is already used by '{other}' "
+                        "(aliases sharing a multi-gang device need different switch_code values)",
+                        doc.line_of(["devices", name, key]),
+                    )
+                )
+
+
+def _unknown_codes(doc: TomlDocument, devices: Dict[str, Any], problems: List[ConfigProblem]) -> None:
+    """Codes the driver would send that the device's cached specification lacks.
+
+    Only devices whose specification is already cached are checked; this never
+    calls Tuya.
+    """
+    from ..domain.devices import DeviceKind
+    from ..drivers import driver_name
+    from ..drivers.tuya import command_code_off, command_code_on
+    from .device_specs import spec_cache
+
+    for name, info in devices.items():
+        if info.kind == DeviceKind.SENSOR or driver_name(info) != "tuya":
+            continue
+        checks: List[Tuple[str, str, str]] = []  # (device id, code, key that sets it)
+        on_id, off_id = info.tuya_on_device_id or info.tuya_device_id, info.tuya_off_device_id or info.tuya_device_id
+        if on_id:
+            checks.append((on_id, command_code_on(info), "switch_code"))
+        if off_id:
+            checks.append((off_id, command_code_off(info), "switch_code"))
+        if info.supports_brightness and info.tuya_device_id:
+            checks.append((info.tuya_device_id, info.brightness_code or "bright_value_v2", "brightness_code"))
+        for device_id, code, key in dict.fromkeys(checks):
+            spec = spec_cache.cached(device_id)
+            if spec is None or not spec.functions or spec.resolve_code(code) is not None:
+                continue
+            problems.append(
+                ConfigProblem(
+                    f"devices.{name}: {device_id} has no '{code}' data point "
+                    f"(supports: {', '.join(sorted(spec.functions))}; set {key})",
+                    doc.line_of(["devices", name, key]),
+                )
+            )
+
+
+def check_devices_toml(text: str) -> List[ConfigProblem]:
+    """Every problem that keeps `text` from loading, or a command from working, in line order.
+
+    An empty list means the file is safe to save: it loads exactly as the
+    server would load it (same models, same cross-checks).
+    """
+    from ..domain.devices import DeviceInfo
+    from ..domain.rules import RuleConfig, validate_rules
+    from ..domain.scenes import SceneConfig, validate_scenes
+    from ..domain.schedules import ScheduleConfig, validate_schedules
+
+    try:
+        doc = TomlDocument(text)
+        data = tomllib.loads(text)
+    except tomllib.TOMLDecodeError as e:
+        m = _TOML_ERROR_LINE.search(str(e))
+        return [ConfigProblem(f"invalid TOML: {e}", int(m.group(1)) if m else None)]
+
+    problems: List[ConfigProblem] = []
+    devices = _validate_section(doc, data, "devices", DeviceInfo, problems)
+    scenes = _validate_section(doc, data, "scenes", SceneConfig, problems)
+    rules = _validate_section(doc, data, "rules", RuleConfig, problems)
+    schedules = _validate_section(doc, data, "schedules", ScheduleConfig, problems)
+
+    if not problems:
+        # References between sections; these stop at the first problem, and on
+        # entries that failed above they would only report noise.
+        try:
+            validate_scenes(scenes, devices)
+            validate_rules(rules, devices, scenes)
+            validate_schedules(schedules, devices, scenes)
+        except ValueError as e:
+            m = _ENTRY_REFERENCE.match(str(e))
+            problems.append(ConfigProblem(str(e), doc.line_of([m.group(1) + "s", m.group(2)]) if m else None))
+
+    _missing_ids(doc, devices, problems)
+    _duplicate_ids(doc, devices, problems)
+    _unknown_codes(doc, devices, problems)
+    return sorted(problems, key=lambda p: (p.line is None, p.line or 0))
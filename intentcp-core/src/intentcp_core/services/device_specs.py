@@ -0,0 +1,244 @@
+# src/intentcp_core/services/device_specs.py
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .state_store import StateStore, state_store
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "tuya.spec."
+# Devices without a specification (some sub-devices, non-standard products) are
+# asked again after this long; fetch errors (cloud unreachable) after a short pause.
+_UNAVAILABLE_RETRY_S = 24 * 3600.0
+_ERROR_RETRY_S = 300.0
+
+# Codes that mean the same thing on different product generations; a command
+# for a code the device lacks is sent with the first alternative it has.
+_EQUIVALENT_CODES: Tuple[Tuple[str, ...], ...] = (
+    ("switch_led", "switch_1", "switch"),
+    ("bright_value_v2", "bright_value"),
+    ("temp_value_v2", "temp_value"),
+    ("colour_data_v2", "colour_data"),
+)
+BRIGHTNESS_CODES = ("bright_value_v2", "bright_value")
+# Standard Tuya ranges, used when a device's specification is not known.
+_DEFAULT_BRIGHTNESS_RANGES = {"bright_value_v2": {"min": 10, "max": 1000}, "bright_value": {"min": 25, "max": 255}}
+
+
+class InvalidCommand(ValueError):
+    """A command the device's specification says it cannot accept."""
+
+
+@dataclass(frozen=True)
+class FunctionSpec:
+    code: str
+    type: str
+    values: Dict[str, Any]
+
+    def check(self, value: Any) -> Optional[str]:
+        """Why `value` is not acceptable for this data point, or None."""
+        kind = self.type.lower()
+        if kind == "boolean" and not isinstance(value, bool):
+            return f"expects true/false, got {value!r}"
+        if kind == "integer":
+            if isinstance(value, bool) or not isinstance(value, int):
+                return f"expects an integer, got {value!r}"
+            low, high = self.values.get("min"), self.values.get("max")
+            if low is not None and high is not None and not low <= value <= high:
+                return f"{value} is outside {low}-{high}"
+        if kind == "enum":
+            allowed = self.values.get("range") or []
+            if allowed and value not in allowed:
+                return f"{value!r} is not one of {', '.join(map(str, allowed))}"
+        return None
+
+    def scale_percent(self, percent: int) -> int:
+        """Map 1-100 % onto the data point's min-max range (respecting `step`)."""
+        low = int(self.values.get("min", 0))
+        high = int(self.values.get("max", 100))
+        step = max(1, int(self.values.get("step", 1)))
+        raw = low + (high - low) * (min(max(percent, 1), 100) - 1) / 99
+        return min(high, low + round((raw - low) / step) * step)
+
+    def to_percent(self, raw: int) -> int:
+        """Inverse of `scale_percent`."""
+        low = int(self.values.get("min", 0))
+        high = int(self.values.get("max", 100))
+        if high <= low:
+            return 100
+        return min(100, max(1, round(1 + (raw - low) * 99 / (high - low))))
+
+
+@dataclass(frozen=True)
+class DeviceSpec:
+    category: str
+    functions: Dict[str, FunctionSpec]
+    status_codes: Tuple[str, ...]
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "DeviceSpec":
+        functions: Dict[str, FunctionSpec] = {}
+        for item in result.get("functions") or []:
+            if not isinstance(item, dict) or not item.get("code"):
+                continue
+            values = item.get("values") or {}
+            if isinstance(values, str):
+                try:
+                    values = json.loads(values)
+                except ValueError:
+                    values = {}
+            functions[item["code"]] = FunctionSpec(item["code"], str(item.get("type") or ""), values or {})
+        status = tuple(s["code"] for s in result.get("status") or [] if isinstance(s, dict) and s.get("code"))
+        return cls(str(result.get("category") or ""), functions, status)
+
+    def resolve_code(self, code: str) -> Optional[str]:
+        """`code`, or the equivalent code this device actually has; None if it has neither."""
+        if code in self.functions:
+            return code
+        for group in _EQUIVALENT_CODES:
+            if code in group:
+                return next((c for c in group if c in self.functions), None)
+        return None
+
+
+class SpecCache:
+    """Tuya device specifications (functions, ranges, data point types).
+
+    Each device's specification is fetched from the OpenAPI once and kept in
+    the shared state store, so it survives restarts and is shared by every
+    worker; `refresh()` fetches it again on demand. Commands are checked and
+    translated against it before they leave the process, so a wrong code or an
+    out-of-range value fails fast instead of costing a cloud round trip.
+
+    Lookups run on SDK worker threads (never the event loop): a miss costs one
+    blocking OpenAPI call.
+    """
+
+    def __init__(self, store: StateStore = state_store) -> None:
+        self._store = store
+        self._memory: Dict[str, DeviceSpec] = {}
+        # device id -> time before which Tuya is not asked again (no spec / error).
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, device_id: str) -> Optional[Dict[str, Any]]:
+        from .tuya_client import tuya_client
+
+        resp = tuya_client.request("GET", f"/v1.0/iot-03/devices/{device_id}/specification")
+        if not isinstance(resp, dict) or not resp.get("success"):
+            logger.info("No specification for %s: %s", device_id, resp.get("msg") if isinstance(resp, dict) else resp)
+            return None
+        return resp.get("result") or {}
+
+    def refresh(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a device's specification from Tuya and store it; returns the raw result."""
+        result = self._fetch(device_id)
+        now = time.time()
+        self._store.set_json(_KEY_PREFIX + device_id, {"fetched_at": now, "result": result})
+        with self._lock:
+            if result is not None:
+                self._memory[device_id] = DeviceSpec.from_result(result)
+                self._retry_at.pop(device_id, None)
+            else:
+                self._memory.pop(device_id, None)
+                self._retry_at[device_id] = now + _UNAVAILABLE_RETRY_S
+        return result
+
+    def cached(self, device_id: str) -> Optional[DeviceSpec]:
+        """The stored specification, without calling Tuya."""
+        with self._lock:
+            spec = self._memory.get(device_id)
+        if spec is not None:
+            return spec
+        entry = self._store.get_json(_KEY_PREFIX + device_id)
+        if not isinstance(entry, dict):
+            return None
+        result = entry.get("result")
+        with self._lock:
+            if isinstance(result, dict):
+                spec = self._memory[device_id] = DeviceSpec.from_result(result)
+            else:
+                self._retry_at[device_id] = entry.get("fetched_at", 0) + _UNAVAILABLE_RETRY_S
+        return spec
+
+    def get(self, device_id: str) -> Optional[DeviceSpec]:
+        """The device's specification, fetching it on first use; None if unavailable."""
+        spec = self.cached(device_id)
+        if spec is not None or time.time() < self._retry_at.get(device_id, 0.0):
+            return spec
+        try:
+            self.refresh(device_id)
+        except Exception as e:
+            # Never block a command on the spec: it goes out unchecked instead.
+            logger.warning("Fetching the specification of %s failed: %s", device_id, e)
+            with self._lock:
+                self._retry_at[device_id] = time.time() + _ERROR_RETRY_S
+            return None
+        with self._lock:
+            return self._memory.get(device_id)
+
+    def forget(self, device_id: str) -> None:
+        self._store.delete(_KEY_PREFIX + device_id)
+        with self._lock:
+            self._memory.pop(device_id, None)
+            self._retry_at.pop(device_id, None)
+
+    # --- command translation -----------------------------------------------
+
+    def translate(self, device_id: str, commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Map codes onto the ones the device has and check values; raises InvalidCommand.
+
+        Devices without a known specification get their commands unchanged.
+        """
+        spec = self.get(device_id)
+        if spec is None or not spec.functions:
+            return commands
+        translated = []
+        for cmd in commands:
+            code = spec.resolve_code(cmd["code"])
+            if code is None:
+                raise InvalidCommand(
+                    f"{device_id} has no '{cmd['code']}' data point (supports: {', '.join(sorted(spec.functions))})"
+                )
+            problem = spec.functions[code].check(cmd["value"])
+            if problem:
+                raise InvalidCommand(f"{device_id} {code}: {problem}")
+            translated.append({"code": code, "value": cmd["value"]})
+        return translated
+
+    @staticmethod
+    def _brightness_function(spec: Optional[DeviceSpec], code: str) -> FunctionSpec:
+        function = spec.functions.get(code) if spec is not None else None
+        return function or FunctionSpec(code, "Integer", _DEFAULT_BRIGHTNESS_RANGES.get(code, {"min": 0, "max": 100}))
+
+    def brightness_percent(self, device_id: str, status: Dict[str, Any]) -> Optional[int]:
+        """Brightness (1-100 %) from a device's status, using only the cached specification."""
+        for code in BRIGHTNESS_CODES:
+            raw = status.get(code)
+            if isinstance(raw, int) and not isinstance(raw, bool):
+                return self._brightness_function(self.cached(device_id), code).to_percent(raw)
+        return None
+
+    def scale_brightness(self, device_id: str, commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn 1-100 % brightness values into the device's own range (e.g. 10-1000).
+
+        Without a specification, `bright_value_v2` is assumed to be 10-1000 and
+        `bright_value` 25-255, the standard Tuya ranges.
+        """
+        spec = self.get(device_id)
+        scaled = []
+        for cmd in commands:
+            if cmd["code"] in BRIGHTNESS_CODES and isinstance(cmd["value"], int) and not isinstance(cmd["value"], bool):
+                code = (spec.resolve_code(cmd["code"]) if spec is not None else None) or cmd["code"]
+                cmd = {"code": code, "value": self._brightness_function(spec, code).scale_percent(cmd["value"])}
+            scaled.append(cmd)
+        return scaled
+
+
+spec_cache = SpecCache()
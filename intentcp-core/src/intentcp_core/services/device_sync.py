@@ -0,0 +1,176 @@
+# src/intentcp_core/services/device_sync.py
+from __future__ import annotations
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .device_specs import BRIGHTNESS_CODES, spec_cache
+from .tuya_client import tuya_client
+
+logger = logging.getLogger(__name__)
+
+# Tuya product category -> IntentCP kind. Categories not listed are reported
+# as skipped rather than guessed.
+_CATEGORY_KINDS = {
+    "dj": "light",  # light
+    "dd": "light",  # strip light
+    "xdd": "light",  # ceiling light
+    "fwd": "light",  # ambiance light
+    "dc": "light",  # string light
+    "tgq": "light",  # dimmer
+    "kg": "switch",  # switch
+    "cz": "switch",  # socket
+    "pc": "switch",  # power strip
+    "tdq": "switch",  # breaker
+    "szjqr": "switch",  # fingerbot
+    "kt": "aircon",
+    "ktkzq": "aircon",  # air conditioner controller
+    "tyy": "projector",
+    "mcs": "sensor",  # contact sensor
+    "pir": "sensor",  # motion sensor
+    "wsdcg": "sensor",  # temperature/humidity
+    "ywbj": "sensor",  # smoke
+    "rqbj": "sensor",  # gas
+    "sj": "sensor",  # water leak
+}
+_SWITCH_CODES = ("switch_led", "switch_1", "switch")
+_TEMPERATURE_CODES = ("temp_value_v2", "temp_value", "temp_set")
+
+# Fields owned by the cloud: refreshed on every sync. Everything else in an
+# existing block was chosen by the user and is left alone.
+_CLOUD_FIELDS = ("local_key", "switch_code", "brightness_code")
+
+
+class DeviceSyncError(RuntimeError):
+    pass
+
+
+def _result(resp: Any, what: str) -> Any:
+    if not isinstance(resp, dict) or not resp.get("success"):
+        msg = resp.get("msg") if isinstance(resp, dict) else resp
+        raise DeviceSyncError(f"{what} failed: {msg}")
+    return resp.get("result")
+
+
+def iter_cloud_devices(page_size: int = 100) -> Iterator[Dict[str, Any]]:
+    """Every device linked to the app account, fetched page by page."""
+    last_row_key = ""
+    while True:
+        params: Dict[str, Any] = {"size": page_size}
+        if last_row_key:
+            params["last_row_key"] = last_row_key
+        page = _result(
+            tuya_client.request("GET", "/v1.0/iot-01/associated-users/devices", params=params), "Listing devices"
+        ) or {}
+        yield from page.get("devices") or []
+        last_row_key = page.get("last_row_key") or ""
+        if not page.get("has_more") or not last_row_key:
+            return
+
+
+def fetch_specifications(device_ids: List[str], concurrency: int = 8) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Fetch specifications for many devices at once (bounded by `concurrency`); None where Tuya has none."""
+    if not device_ids:
+        return {}
+    tuya_client.user_id()  # log in once before fanning out
+    # Refreshing also updates the shared specification cache used to check commands.
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="intentcp-sync") as pool:
+        return dict(zip(device_ids, pool.map(spec_cache.refresh, device_ids)))
+
+
+def _first_code(spec: Dict[str, Any], candidates: Tuple[str, ...]) -> Optional[str]:
+    codes = {f.get("code") for f in spec.get("functions") or [] if isinstance(f, dict)}
+    return next((code for code in candidates if code in codes), None)
+
+
+def infer_block(device: Dict[str, Any], spec: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """A `[devices.*]` block for a cloud device, or None for unsupported categories."""
+    category = device.get("category") or (spec or {}).get("category") or ""
+    kind = _CATEGORY_KINDS.get(category)
+    if kind is None:
+        return None
+
+    block: Dict[str, Any] = {"kind": kind, "tuya_device_id": device["id"]}
+    spec = spec or {}
+    brightness_code = _first_code(spec, BRIGHTNESS_CODES)
+    block["supports_brightness"] = kind == "light" and brightness_code is not None
+    block["supports_temperature"] = _first_code(spec, _TEMPERATURE_CODES) is not None
+    name = (device.get("name") or "").strip()
+    product = (device.get("product_name") or "").strip()
+    if name or product:
+        block["note"] = f"{name} ({product})" if name and product and name != product else name or product
+
+    # Only record codes that differ from what the driver would pick anyway.
+    switch_code = _first_code(spec, _SWITCH_CODES)
+    default_switch = "switch_led" if kind == "light" and block["supports_brightness"] else "switch_1"
+    if switch_code and switch_code != default_switch and kind != "sensor":
+        block["switch_code"] = switch_code
+    if block["supports_brightness"] and brightness_code != "bright_value_v2":
+        block["brightness_code"] = brightness_code
+    if device.get("local_key") and not device.get("sub"):
+        block["local_key"] = device["local_key"]
+    return block
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def _alias_for(device: Dict[str, Any], taken: set) -> str:
+    base = _slug(device.get("name") or "") or f"device_{device['id'][-6:].lower()}"
+    if not base[0].isalpha():
+        base = f"device_{base}"
+    alias, n = base, 2
+    while alias in taken:
+        alias, n = f"{base}_{n}", n + 1
+    return alias
+
+
+def merge_devices(
+    existing: Dict[str, Dict[str, Any]],
+    cloud_devices: List[Dict[str, Any]],
+    specs: Dict[str, Optional[Dict[str, Any]]],
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """Merge cloud devices into `existing` aliases; returns (devices, report).
+
+    A cloud device already referenced by an alias (via any of its tuya_* ids)
+    keeps that alias and the user's fields; only cloud-owned fields are updated.
+    New devices get an alias derived from their Tuya name.
+    """
+    merged = {alias: dict(block) for alias, block in existing.items()}
+    by_id: Dict[str, str] = {}
+    for alias, block in existing.items():
+        for key in ("tuya_device_id", "tuya_on_device_id", "tuya_off_device_id"):
+            if block.get(key):
+                by_id.setdefault(str(block[key]), alias)
+
+    report: List[Dict[str, Any]] = []
+    for device in cloud_devices:
+        device_id = device.get("id")
+        if not device_id:
+            continue
+        entry = {"tuya_device_id": device_id, "name": device.get("name") or ""}
+        block = infer_block(device, specs.get(device_id))
+        alias = by_id.get(device_id)
+
+        if alias is not None:
+            current = merged[alias]
+            changed = []
+            if block is not None:
+                for key in _CLOUD_FIELDS:
+                    # Dual-bot lights reference the bots, not a single device: leave their codes alone.
+                    if key in block and current.get("tuya_device_id") == device_id and current.get(key) != block[key]:
+                        current[key] = block[key]
+                        changed.append(key)
+            report.append({**entry, "alias": alias, "action": "updated" if changed else "unchanged", "fields": changed})
+        elif block is None:
+            category = device.get("category") or (specs.get(device_id) or {}).get("category") or "?"
+            report.append({**entry, "alias": None, "action": "skipped", "reason": f"unsupported category '{category}'"})
+        else:
+            alias = _alias_for(device, set(merged))
+            merged[alias] = block
+            by_id[device_id] = alias
+            report.append({**entry, "alias": alias, "action": "added", "kind": block["kind"]})
+    return merged, report
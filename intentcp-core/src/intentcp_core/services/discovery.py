@@ -0,0 +1,232 @@
+# src/intentcp_core/services/discovery.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import anyio
+
+from ..config.settings import CONFIG_DIR
+from ..config.toml_edit import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# Tuya devices announce themselves every few seconds: protocol 3.1 in plain JSON
+# on 6666, 3.3+ encrypted with a well-known key on 6667.
+DISCOVERY_PORTS = (6666, 6667)
+_UDP_KEY = hashlib.md5(b"yGAdlopoPVldABfn").digest()
+_PREFIX = 0x000055AA
+
+CACHE_PATH = CONFIG_DIR / "discovered_devices.json"
+# Broadcasts arrive every ~5 s per device; persist at most this often.
+_FLUSH_INTERVAL = 10.0
+# Entries not refreshed by a broadcast for this long are dropped.
+ENTRY_TTL = 3 * 24 * 3600.0
+# An unchanged device only gets its `seen_at` re-persisted this often; far
+# below ENTRY_TTL, so it still never expires while announcing.
+_SEEN_REFRESH = 3600.0
+
+
+def parse_broadcast(data: bytes) -> Optional[Dict[str, Any]]:
+    """Decode one discovery datagram into `{device_id, ip, version, product_key}`."""
+    if len(data) < 28 or struct.unpack(">I", data[:4])[0] != _PREFIX:
+        return None
+    length = struct.unpack(">I", data[12:16])[0]
+    body = data[16 : 16 + length - 8]
+    if body[:4] == b"\0\0\0\0":
+        body = body[4:]
+
+    if not body.startswith(b"{"):
+        if not body or len(body) % 16:
+            return None
+        from Crypto.Cipher import AES
+
+        body = AES.new(_UDP_KEY, AES.MODE_ECB).decrypt(body)
+        body = body[: -body[-1]] if 1 <= body[-1] <= 16 else body
+
+    try:
+        info = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(info, dict) or not info.get("gwId") or not info.get("ip"):
+        return None
+    return {
+        "device_id": str(info["gwId"]),
+        "ip": str(info["ip"]),
+        "version": str(info.get("version") or ""),
+        "product_key": info.get("productKey"),
+    }
+
+
+class DiscoveryCache:
+    """Tuya device id -> last announced IP/protocol version, persisted in config/.
+
+    The file is written by the worker that listens for broadcasts and re-read
+    by the others when it changes, so every worker resolves the same IPs and a
+    restart does not have to wait for a fresh scan.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl: float = ENTRY_TTL) -> None:
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._mtime_ns: Optional[int] = -1
+        self._dirty = False
+        self._generation = 0
+
+    def _reload(self) -> None:
+        mtime_ns = self._path.stat().st_mtime_ns if self._path.exists() else None
+        if mtime_ns == self._mtime_ns or self._dirty:
+            return
+        entries: Dict[str, Dict[str, Any]] = {}
+        if mtime_ns is not None:
+            try:
+                entries = json.loads(self._path.read_text(encoding="utf-8"))
+            except Exception:
+                logger.warning("Ignoring unreadable %s", self._path)
+        self._entries = entries if isinstance(entries, dict) else {}
+        self._mtime_ns = mtime_ns
+        self._generation += 1
+
+    def version(self) -> int:
+        """Changes whenever an IP or protocol version changes (in any worker)."""
+        with self._lock:
+            self._reload()
+            return self._generation
+
+    def get(self, device_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(device_id)
+        if entry is None or time.time() - entry.get("seen_at", 0) > self._ttl:
+            return None
+        return entry
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Unexpired entries, newest first."""
+        cutoff = time.time() - self._ttl
+        with self._lock:
+            self._reload()
+            items = [(k, v) for k, v in self._entries.items() if v.get("seen_at", 0) >= cutoff]
+        return dict(sorted(items, key=lambda kv: -kv[1]["seen_at"]))
+
+    def update(self, found: Dict[str, Any]) -> None:
+        device_id = found["device_id"]
+        entry = {k: found[k] for k in ("ip", "version", "product_key")}
+        with self._lock:
+            self._reload()
+            previous = self._entries.get(device_id)
+            now = time.time()
+            if previous is None or any(previous.get(k) != v for k, v in entry.items()):
+                # IP/version changes invalidate open local sessions.
+                self._generation += 1
+                logger.info("Discovered Tuya device %s at %s (v%s)", device_id, entry["ip"], entry["version"])
+            elif now - previous.get("seen_at", 0) < _SEEN_REFRESH:
+                return
+            self._entries[device_id] = {**entry, "seen_at": now}
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            cutoff = time.time() - self._ttl
+            self._entries = {k: v for k, v in self._entries.items() if v.get("seen_at", 0) >= cutoff}
+            atomic_write_text(self._path, json.dumps(self._entries, indent=2, sort_keys=True))
+            self._mtime_ns = self._path.stat().st_mtime_ns
+            self._dirty = False
+
+
+class _BroadcastProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_found) -> None:
+        self._on_found = on_found
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            found = parse_broadcast(data)
+        except Exception:
+            found = None
+        if found is not None:
+            self._on_found(found)
+
+
+class DiscoveryService:
+    """Listen for Tuya UDP broadcasts and keep `discovery_cache` current."""
+
+    def __init__(self, cache: DiscoveryCache) -> None:
+        self._cache = cache
+        self._transports: List[asyncio.DatagramTransport] = []
+        self._flush_task: asyncio.Task | None = None
+
+    async def _listen(self, on_found) -> List[asyncio.DatagramTransport]:
+        loop = asyncio.get_running_loop()
+        transports = []
+        for port in DISCOVERY_PORTS:
+            try:
+                # reuse_port lets `intentcp devices discover` run next to the server.
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _BroadcastProtocol(on_found),
+                    local_addr=("0.0.0.0", port),
+                    family=socket.AF_INET,
+                    reuse_port=hasattr(socket, "SO_REUSEPORT"),
+                    allow_broadcast=True,
+                )
+            except OSError as e:
+                logger.warning("Cannot listen for Tuya discovery on UDP %d: %s", port, e)
+                continue
+            transports.append(transport)
+        return transports
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            try:
+                # fsyncs; kept off the loop that receives the broadcasts.
+                await anyio.to_thread.run_sync(self._cache.flush)
+            except Exception:
+                logger.exception("Persisting discovered devices failed")
+
+    async def start(self) -> None:
+        if self._transports:
+            return
+        self._transports = await self._listen(self._cache.update)
+        if self._transports:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._cache.flush()
+
+    async def scan(self, seconds: float) -> Dict[str, Dict[str, Any]]:
+        """Listen for `seconds`, record what was heard and return it by device id."""
+        found: Dict[str, Dict[str, Any]] = {}
+
+        def _on_found(item: Dict[str, Any]) -> None:
+            found[item["device_id"]] = item
+            self._cache.update(item)
+
+        transports = await self._listen(_on_found)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            for transport in transports:
+                transport.close()
+        self._cache.flush()
+        return found
+
+
+discovery_cache = DiscoveryCache()
+discovery_service = DiscoveryService(discovery_cache)
@@ -0,0 +1,94 @@
+# src/intentcp_core/services/dispatcher.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict
+
+from .sdk_executor import INTERACTIVE, sdk_executor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Lane:
+    queue: "asyncio.Queue[tuple[asyncio.Future, contextvars.Context, int, Callable[..., Any], tuple, dict]]" = field(
+        default_factory=asyncio.Queue
+    )
+    task: asyncio.Task | None = None
+
+
+class CommandDispatcher:
+    """Serialize commands per Tuya device while letting devices run in parallel.
+
+    Every command is submitted to a FIFO lane keyed by a Tuya device id. A lane is
+    an asyncio queue drained by a single worker task, so two commands for the same
+    device always complete in submission order. Lanes are created lazily on first
+    use and reaped after `idle_timeout` seconds without work. The blocking calls
+    themselves run on `sdk_executor`, so lanes share its bounded thread pool.
+    """
+
+    def __init__(self, idle_timeout: float = 30.0) -> None:
+        self._idle_timeout = idle_timeout
+        self._lanes: Dict[str, _Lane] = {}
+
+    @property
+    def active_lanes(self) -> list[str]:
+        return sorted(self._lanes.keys())
+
+    async def submit(
+        self, lane_key: str, fn: Callable[..., Any], *args: Any, priority: int = INTERACTIVE, **kwargs: Any
+    ) -> Any:
+        """Run blocking `fn(*args, **kwargs)` in `lane_key`'s lane and return its result."""
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+
+        lane = self._lanes.get(lane_key)
+        if lane is None or lane.task is None or lane.task.done():
+            lane = _Lane()
+            lane.task = asyncio.create_task(self._drain(lane_key, lane))
+            self._lanes[lane_key] = lane
+
+        # The call runs in the submitter's context (e.g. the event-log source),
+        # not in that of whoever happened to create the lane.
+        lane.queue.put_nowait((fut, contextvars.copy_context(), priority, fn, args, kwargs))
+        return await fut
+
+    async def _drain(self, lane_key: str, lane: _Lane) -> None:
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(lane.queue.get(), timeout=self._idle_timeout)
+                except asyncio.TimeoutError:
+                    if lane.queue.empty():
+                        break
+                    continue
+
+                fut, ctx, priority, fn, args, kwargs = item
+                if fut.done():
+                    # Caller went away (e.g. request cancelled) before we got to it.
+                    continue
+
+                try:
+                    result = await sdk_executor.run(ctx.run, fn, *args, priority=priority, **kwargs)
+                except Exception as e:
+                    if not fut.done():
+                        fut.set_exception(e)
+                else:
+                    if not fut.done():
+                        fut.set_result(result)
+        finally:
+            # No await between the idle check above and this point, so a concurrent
+            # submit() either enqueued before we broke out or will create a new lane.
+            if self._lanes.get(lane_key) is lane:
+                del self._lanes[lane_key]
+            while not lane.queue.empty():
+                fut, *_ = lane.queue.get_nowait()
+                if not fut.done():
+                    fut.set_exception(RuntimeError(f"Command lane {lane_key} shut down"))
+            logger.debug("Command lane %s reaped", lane_key)
+
+
+command_dispatcher = CommandDispatcher()
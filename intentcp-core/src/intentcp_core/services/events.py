@@ -0,0 +1,253 @@
+# src/intentcp_core/services/events.py
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config.settings import CONFIG_DIR, get_settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_DB_FILE = CONFIG_DIR / "events.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts         REAL NOT NULL,
+    kind       TEXT NOT NULL,
+    device     TEXT,
+    action     TEXT,
+    source     TEXT,
+    ok         INTEGER,
+    latency_ms REAL,
+    detail     TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_device_ts ON events (device, ts);
+"""
+
+# Where the current work came from ("GET /tuya/bed_light/off", "rule:door",
+# "job:42", ...). Set per request by EventSourceMiddleware and by background
+# services; asyncio tasks inherit it from whoever created them.
+event_source: ContextVar[Optional[str]] = ContextVar("intentcp_event_source", default=None)
+
+_Row = Tuple[float, str, Optional[str], Optional[str], Optional[str], Optional[int], Optional[float], Optional[str]]
+
+
+class EventLog:
+    """Append-only audit trail of commands, status fetches, schedules and failures.
+
+    `record()` only appends to an in-memory buffer; a background thread writes
+    the buffer to its own SQLite database (WAL, shared by all workers) in one
+    transaction per second, or sooner when it fills up. The same thread applies
+    retention: rows older than `event_retention_days`, and the oldest rows
+    beyond `event_max_rows`, are deleted and their pages returned to the OS.
+    """
+
+    def __init__(
+        self,
+        path: Path = EVENTS_DB_FILE,
+        flush_interval: float = 1.0,
+        max_buffer: int = 500,
+        prune_interval: float = 600.0,
+    ) -> None:
+        self.path = path
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+        self._prune_interval = prune_interval
+        self._buffer: List[_Row] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._local = threading.local()
+        self._enabled = True
+        self._last_prune = 0.0
+
+    # --- writing ---------------------------------------------------------
+
+    def record(
+        self,
+        kind: str,
+        device: Optional[str] = None,
+        action: Optional[str] = None,
+        ok: Optional[bool] = None,
+        latency_ms: Optional[float] = None,
+        source: Optional[str] = None,
+        **detail: Any,
+    ) -> None:
+        """Queue one event; never blocks on I/O and never raises."""
+        if not self._enabled:
+            return
+        try:
+            row: _Row = (
+                time.time(),
+                kind,
+                device,
+                action,
+                source or event_source.get(),
+                None if ok is None else int(ok),
+                None if latency_ms is None else round(latency_ms, 1),
+                json.dumps(detail, default=str, ensure_ascii=False) if detail else None,
+            )
+        except Exception:
+            logger.debug("Dropping unserializable %s event", kind, exc_info=True)
+            return
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self._max_buffer
+        if self._thread is None:
+            self._start_thread()
+        if full:
+            self._wake.set()
+
+    def _start_thread(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="intentcp-events", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.time() - self._last_prune > self._prune_interval:
+                    self._reload_settings()
+                    self.prune()
+            except Exception:
+                logger.exception("Writing the event log failed")
+
+    def _reload_settings(self) -> None:
+        try:
+            self._enabled = get_settings().runtime.events_enabled
+        except FileNotFoundError:
+            self._enabled = True
+
+    def _conn(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None)
+            # Must precede table creation to take effect on a new database.
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO events (ts, kind, device, action, source, ok, latency_ms, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def prune(self) -> None:
+        try:
+            runtime = get_settings().runtime
+            retention_days, max_rows = runtime.event_retention_days, runtime.event_max_rows
+        except FileNotFoundError:
+            retention_days, max_rows = 14.0, 100_000
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM events WHERE ts < ?", (time.time() - retention_days * 86400,)).rowcount
+        row = conn.execute("SELECT id FROM events ORDER BY id DESC LIMIT 1 OFFSET ?", (max_rows,)).fetchone()
+        if row is not None:
+            deleted += conn.execute("DELETE FROM events WHERE id <= ?", (row[0],)).rowcount
+        if deleted:
+            conn.execute("PRAGMA incremental_vacuum")
+            logger.info("Event log: pruned %d old event(s)", deleted)
+        self._last_prune = time.time()
+
+    def close(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final event log flush failed")
+
+    # --- reading ---------------------------------------------------------
+
+    def query(
+        self,
+        devices: Optional[Iterable[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        kind: Optional[str] = None,
+        limit: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """Newest-first events, filtered by device names/ids, time range and kind."""
+        self.flush()  # include what this worker has not written yet
+        clauses: List[str] = []
+        params: List[Any] = []
+        if devices is not None:
+            devices = list(devices)
+            clauses.append(f"device IN ({','.join('?' * len(devices))})")
+            params.extend(devices)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            "SELECT ts, kind, device, action, source, ok, latency_ms, detail FROM events "
+            f"{where} ORDER BY ts DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [
+            {
+                "ts": ts,
+                "kind": kind_,
+                "device": device,
+                "action": action,
+                "source": source,
+                "ok": None if ok is None else bool(ok),
+                "latency_ms": latency_ms,
+                **({"detail": json.loads(detail)} if detail else {}),
+            }
+            for ts, kind_, device, action, source, ok, latency_ms, detail in rows
+        ]
+
+
+class EventSourceMiddleware:
+    """ASGI middleware tagging events recorded during a request with its method and path."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = event_source.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            event_source.reset(token)
+
+
+event_log = EventLog()
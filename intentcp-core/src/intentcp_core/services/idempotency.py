@@ -0,0 +1,71 @@
+# src/intentcp_core/services/idempotency.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from .state_store import StateStore, state_store
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "idem."
+
+
+class IdempotencyCache:
+    """TTL'd cache of control responses keyed by an idempotency key.
+
+    The first request for a key executes; any repeat within `ttl` seconds after
+    it finished gets the same result back without executing again. Completed
+    results live in the shared state store, so a retry that lands on another
+    uvicorn worker is replayed too; repeats arriving while the first call is
+    still running on this worker wait for it. Failed executions are not cached
+    so a retry can succeed.
+    """
+
+    def __init__(self, ttl: float = 600.0, store: StateStore = state_store) -> None:
+        self._ttl = ttl
+        self._store = store
+        # In-flight calls on this worker (coalesced; removed once finished).
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _store_key(key: Hashable) -> str:
+        digest = hashlib.blake2b(json.dumps(key, default=str).encode(), digest_size=16).hexdigest()
+        return _KEY_PREFIX + digest
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return `(result, replayed)` for `key`, executing `fn` at most once per window."""
+        store_key = self._store_key(key)
+        fut = self._inflight.get(store_key)
+        if fut is not None:
+            return await asyncio.shield(fut), True
+
+        stored = self._store.get_json(store_key)
+        if isinstance(stored, dict) and "result" in stored:
+            return stored["result"], True
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[store_key] = fut
+        try:
+            result = await fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            # Mark retrieved so an un-awaited failure does not warn at GC time.
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            try:
+                # Stored as JSON, as a replay on another worker would serve it.
+                self._store.set_json(store_key, {"result": json.loads(json.dumps(result, default=str))}, ttl=self._ttl)
+            except Exception as e:
+                logger.warning("Could not store the idempotent result for %s: %s", key, e)
+        finally:
+            self._inflight.pop(store_key, None)
+        return result, False
+
+
+idempotency_cache = IdempotencyCache()
@@ -0,0 +1,108 @@
+# src/intentcp_core/services/leader.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, TextIO
+
+from .state_store import lock_path
+
+try:  # POSIX only; without flock every process considers itself the leader.
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Elect exactly one uvicorn worker on this host to run background services.
+
+    The leader holds a non-blocking `flock` on `config/.leader.lock` for as long as
+    its process lives; the kernel drops the lock when the process dies, at which
+    point the next follower to retry takes over. Leader-only services (scheduler,
+    push ingestion, ...) register start/stop hooks and are started on promotion.
+    """
+
+    def __init__(self, path: Path | None = None, retry_interval: float = 5.0) -> None:
+        self._path = path or lock_path("leader")
+        self._retry_interval = retry_interval
+        self._fh: Optional[TextIO] = None
+        self._task: asyncio.Task | None = None
+        self._on_start: List[Callable[[], Awaitable[None]]] = []
+        self._on_stop: List[Callable[[], Awaitable[None]]] = []
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fh is not None
+
+    def register(
+        self,
+        on_start: Callable[[], Awaitable[None]],
+        on_stop: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        if on_start in self._on_start:
+            return
+        self._on_start.append(on_start)
+        if on_stop is not None:
+            self._on_stop.append(on_stop)
+
+    def _try_acquire(self) -> bool:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self._path, "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{os.getpid()}\n")
+        fh.flush()
+        self._fh = fh
+        return True
+
+    async def _promote(self) -> None:
+        logger.info("Worker pid=%s elected leader; starting background services.", os.getpid())
+        for hook in self._on_start:
+            try:
+                await hook()
+            except Exception:
+                logger.exception("Leader start hook failed")
+
+    async def _campaign(self) -> None:
+        while not self.is_leader:
+            if self._try_acquire():
+                await self._promote()
+                return
+            await asyncio.sleep(self._retry_interval)
+
+    async def start(self) -> None:
+        if self._try_acquire():
+            await self._promote()
+        else:
+            logger.info("Worker pid=%s is a follower; another worker is leader.", os.getpid())
+            self._task = asyncio.create_task(self._campaign())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if not self.is_leader:
+            return
+        for hook in reversed(self._on_stop):
+            try:
+                await hook()
+            except Exception:
+                logger.exception("Leader stop hook failed")
+        if self._fh is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+leader_election = LeaderElection()
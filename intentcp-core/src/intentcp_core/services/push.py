@@ -0,0 +1,67 @@
+# src/intentcp_core/services/push.py
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from .sdk_executor import BACKGROUND, sdk_executor
+from .state_store import StateStore, state_store
+from .tuya_client import tuya_client
+
+logger = logging.getLogger(__name__)
+
+# Tuya message-service protocol number for device data-point reports.
+_PROTOCOL_DEVICE_REPORT = 4
+
+
+class PushIngestion:
+    """Ingest Tuya MQTT status reports into the shared device state.
+
+    Runs only on the leader worker so that one MQTT subscription feeds every
+    process; followers read the resulting state from the store.
+    """
+
+    def __init__(self, store: StateStore = state_store) -> None:
+        self._store = store
+        self._mq: Optional[Any] = None
+
+    def _on_message(self, msg: Dict[str, Any]) -> None:
+        if msg.get("protocol") != _PROTOCOL_DEVICE_REPORT:
+            return
+        data = msg.get("data") or {}
+        device_id = data.get("devId")
+        status = data.get("status") or []
+        if not device_id or not isinstance(status, list):
+            return
+
+        values = {item["code"]: item.get("value") for item in status if isinstance(item, dict) and "code" in item}
+        if values:
+            self._store.put_device_state(device_id, values, source="push", merge=True)
+
+    def _start_blocking(self) -> None:
+        from tuya_iot import TuyaOpenMQ
+
+        api = tuya_client._ensure_connected()
+        mq = TuyaOpenMQ(api)
+        mq.add_message_listener(self._on_message)
+        mq.start()
+        self._mq = mq
+
+    async def start(self) -> None:
+        try:
+            await sdk_executor.run(self._start_blocking, priority=BACKGROUND)
+            logger.info("Tuya push ingestion started.")
+        except Exception:
+            logger.exception("Failed to start Tuya push ingestion; falling back to polling only.")
+
+    async def stop(self) -> None:
+        if self._mq is None:
+            return
+        mq, self._mq = self._mq, None
+        try:
+            await sdk_executor.run(mq.stop)
+        except Exception:
+            logger.exception("Failed to stop Tuya push ingestion")
+
+
+push_ingestion = PushIngestion()
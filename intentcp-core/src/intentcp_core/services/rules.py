@@ -0,0 +1,285 @@
+# src/intentcp_core/services/rules.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..config.settings import get_settings
+from ..domain.devices import get_device_registry, get_registry_version, get_rule_registry
+from ..domain.rules import RuleAction, RuleCondition, RuleConfig
+from ..domain.sun import is_sun_up
+from .events import event_log, event_source
+from .sdk_executor import BACKGROUND, ExecutorSaturated, sdk_executor
+from .state_store import StateStore, state_store
+from .tuya_client import tuya_client
+
+logger = logging.getLogger(__name__)
+
+ActionRunner = Callable[[RuleAction], Awaitable[Any]]
+
+_MISSING = object()
+_SWEEP_OVERLAP = 1.0
+
+
+class RuleEngine:
+    """Evaluate `[rules.*]` from devices.toml against device state changes.
+
+    Rules are compiled into an index keyed by (device alias, data point code), so
+    a state report only evaluates the rules that watch one of its data points.
+    Reports written by this worker (push, LAN sessions, polls) arrive instantly
+    through `StateStore.subscribe`; a short sweep of the shared store picks up
+    writes made by other workers. Comparing against the last value seen per data
+    point turns both feeds into change events, so duplicates are harmless.
+
+    Runs on the elected leader only, like the scheduler.
+    """
+
+    def __init__(self, store: StateStore = state_store, sweep_interval: float = 1.0) -> None:
+        self._store = store
+        self._sweep_interval = sweep_interval
+        self._runner: Optional[ActionRunner] = None
+        self._version: Optional[int] = None
+        self._index: Dict[Tuple[str, str], List[Tuple[str, RuleConfig]]] = {}
+        self._aliases_by_device_id: Dict[str, List[str]] = {}
+        self._last: Dict[Tuple[str, str], Any] = {}
+        self._pending: Dict[str, asyncio.TimerHandle] = {}
+        # What the index was built from; unchanged entries keep their objects across reloads.
+        self._rules: Dict[str, RuleConfig] = {}
+        self._devices: Dict[str, Any] = {}
+        self._last_fired: Dict[str, float] = {}
+        self._running_actions: Set[asyncio.Task] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._unsubscribe: Callable[[], None] | None = None
+        self._swept_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def set_runner(self, runner: ActionRunner) -> None:
+        self._runner = runner
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._swept_at = time.time()
+        self._compile()
+        self._unsubscribe = self._store.subscribe(self._on_state)
+        self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+        self._rules = {}
+        self._devices = {}
+        self._index.clear()
+        self._aliases_by_device_id.clear()
+        self._last.clear()
+        self._version = None
+        self._loop = None
+
+    # --- compilation -----------------------------------------------------
+
+    def _compile(self) -> None:
+        version = get_registry_version()
+        registry = get_device_registry()
+
+        index: Dict[Tuple[str, str], List[Tuple[str, RuleConfig]]] = {}
+        for name, rule in get_rule_registry().items():
+            if rule.enabled:
+                index.setdefault((rule.trigger.device, rule.trigger.code), []).append((name, rule))
+
+        aliases_by_device_id: Dict[str, List[str]] = {}
+        for alias in sorted({alias for alias, _ in index}):
+            info = registry[alias]
+            for device_id in dict.fromkeys(
+                i for i in (info.tuya_device_id, info.tuya_on_device_id, info.tuya_off_device_id) if i
+            ):
+                aliases_by_device_id.setdefault(device_id, []).append(alias)
+
+        # Debounce timers belong to the rule definitions they were started for:
+        # keep those of rules (and trigger devices) the reload did not touch.
+        rules = {name: rule for entries in index.values() for name, rule in entries}
+        for name, handle in list(self._pending.items()):
+            rule = rules.get(name)
+            device = rule.trigger.device if rule is not None else None
+            if rule is not self._rules.get(name) or registry.get(device) is not self._devices.get(device):
+                handle.cancel()
+                del self._pending[name]
+        self._rules = rules
+        self._devices = registry
+
+        self._index = index
+        self._aliases_by_device_id = aliases_by_device_id
+        self._last = {key: value for key, value in self._last.items() if key in index}
+        self._version = version
+
+        # Seed the last known values so states that predate the engine do not fire.
+        for device_id, aliases in aliases_by_device_id.items():
+            status = self._store.get_device_state(device_id) or {}
+            for alias in aliases:
+                for code, value in status.items():
+                    if (alias, code) in index:
+                        self._last.setdefault((alias, code), value)
+
+        count = sum(len(rules) for rules in index.values())
+        logger.info("Rule engine: %d rule(s) watching %d data point(s)", count, len(index))
+
+    # --- events ----------------------------------------------------------
+
+    def _on_state(self, device_id: str, values: Dict[str, Any], source: str) -> None:
+        # Runs on the writer's thread: filter cheaply and hop onto the event loop.
+        loop = self._loop
+        if loop is None or device_id not in self._aliases_by_device_id:
+            return
+        try:
+            loop.call_soon_threadsafe(self._on_report, device_id, dict(values))
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    def _on_report(self, device_id: str, values: Dict[str, Any]) -> None:
+        for alias in self._aliases_by_device_id.get(device_id, ()):
+            for code, value in values.items():
+                key = (alias, code)
+                rules = self._index.get(key)
+                if not rules:
+                    continue
+                previous = self._last.get(key, _MISSING)
+                if previous is not _MISSING and previous == value:
+                    continue
+                self._last[key] = value
+                for name, rule in rules:
+                    self._evaluate(name, rule, key, previous, value)
+
+    def _evaluate(self, name: str, rule: RuleConfig, key: Tuple[str, str], previous: Any, value: Any) -> None:
+        trigger = rule.trigger
+        if not trigger.matches(value):
+            pending = self._pending.pop(name, None)
+            if pending is not None:
+                pending.cancel()
+            return
+        if trigger.is_change_trigger:
+            if previous is _MISSING:
+                return  # first sighting: nothing to compare against
+        elif previous is not _MISSING and trigger.matches(previous):
+            return  # still matching: only the edge fires
+
+        if rule.debounce > 0:
+            pending = self._pending.pop(name, None)
+            if pending is not None:
+                pending.cancel()
+            assert self._loop is not None
+            self._pending[name] = self._loop.call_later(rule.debounce, self._on_debounced, name, rule, key)
+        else:
+            self._fire(name, rule)
+
+    def _on_debounced(self, name: str, rule: RuleConfig, key: Tuple[str, str]) -> None:
+        self._pending.pop(name, None)
+        value = self._last.get(key, _MISSING)
+        if value is not _MISSING and rule.trigger.matches(value):
+            self._fire(name, rule)
+
+    def _fire(self, name: str, rule: RuleConfig) -> None:
+        now = time.monotonic()
+        last = self._last_fired.get(name)
+        if last is not None and now - last < rule.cooldown:
+            logger.debug("Rule %s suppressed by its %.0fs cooldown", name, rule.cooldown)
+            return
+        if not self._condition_holds(name, rule.condition):
+            return
+        self._last_fired[name] = now
+
+        task = asyncio.create_task(self._run_actions(name, rule))
+        self._running_actions.add(task)
+        task.add_done_callback(self._running_actions.discard)
+
+    def _condition_holds(self, name: str, condition: RuleCondition) -> bool:
+        if condition.sun is None:
+            return True
+        try:
+            location = get_settings().location
+        except FileNotFoundError:
+            location = None
+        if location is None:
+            logger.warning("Rule %s has a sun condition but settings.toml has no [location]; skipped", name)
+            return False
+        up = is_sun_up(datetime.now(timezone.utc), location.latitude, location.longitude, condition.sun_offset)
+        return up == (condition.sun == "up")
+
+    async def _run_actions(self, name: str, rule: RuleConfig) -> None:
+        if self._runner is None:
+            logger.warning("Rule %s fired but no action runner is configured", name)
+            return
+        logger.info("Rule %s fired", name)
+        event_source.set(f"rule:{name}")
+        started = time.perf_counter()
+        errors = []
+        for action in rule.actions:
+            try:
+                await self._runner(action)
+            except Exception as e:
+                target = action.scene or f"{action.device}:{action.action}"
+                logger.warning("Rule %s action %s failed: %s", name, target, e)
+                errors.append(f"{target}: {e}")
+        event_log.record(
+            "rule",
+            device=rule.trigger.device,
+            action=name,
+            ok=not errors,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            **({"errors": errors} if errors else {}),
+        )
+
+    # --- cross-worker sweep / optional polling ----------------------------
+
+    def _sweep(self) -> None:
+        # Overlap the previous sweep a little: timestamps are taken before commit,
+        # so a write from another process can land slightly "in the past".
+        rows = self._store.device_states_since(self._swept_at - _SWEEP_OVERLAP)
+        for device_id, status, updated_at in rows:
+            self._swept_at = max(self._swept_at, updated_at)
+            if device_id in self._aliases_by_device_id:
+                self._on_report(device_id, status)
+
+    async def _sweep_loop(self) -> None:
+        last_poll = 0.0
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            try:
+                if get_registry_version() != self._version:
+                    self._compile()
+                self._sweep()
+
+                try:
+                    poll_interval = get_settings().runtime.rule_poll_interval
+                except FileNotFoundError:
+                    poll_interval = 0.0
+                if poll_interval > 0 and self._aliases_by_device_id and time.monotonic() - last_poll >= poll_interval:
+                    last_poll = time.monotonic()
+                    # Results land in the state store and come back through the listener.
+                    await sdk_executor.run(
+                        tuya_client.get_status_batch, list(self._aliases_by_device_id), priority=BACKGROUND
+                    )
+            except ExecutorSaturated:
+                logger.debug("Rule poll skipped: SDK executor saturated")
+            except Exception:
+                logger.exception("Rule engine sweep failed")
+
+
+rule_engine = RuleEngine()
@@ -0,0 +1,339 @@
+# src/intentcp_core/services/scheduler.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from ..domain.devices import get_device_registry, get_registry_version, get_scene_registry, get_schedule_registry
+from ..domain.rules import RuleAction
+from ..domain.schedules import ScheduleConfig, validate_schedules
+from .events import event_log, event_source
+from .state_store import StateStore, state_store
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[str, str], Awaitable[Any]]
+ActionRunner = Callable[[RuleAction], Awaitable[Any]]
+
+
+class ScheduleConflict(Exception):
+    """The schedule name belongs to devices.toml and cannot be changed via the API."""
+
+
+@dataclass(frozen=True)
+class _Job:
+    job_id: int
+    device: str
+    action: str
+
+
+@dataclass(frozen=True)
+class _Occurrence:
+    name: str
+    generation: int
+    fire_at: float  # nominal cron time (before jitter); the claim key
+
+
+@dataclass
+class _Recurring:
+    config: ScheduleConfig
+    generation: int
+
+
+class Scheduler:
+    """Delayed actions and recurring schedules persisted in the shared state store.
+
+    Any worker may `schedule()` a job; it is written to the store and returned
+    immediately. Only the elected leader runs the timer loop: a min-heap of due
+    times fed by local schedules and by polling the store for jobs added by other
+    workers. Jobs are claimed atomically before running, so each fires once even
+    across a leader hand-over, and pending jobs survive restarts.
+
+    Recurring schedules (`[schedules.*]` in devices.toml, or created through the
+    API) share the same heap: only each one's next occurrence is queued, and the
+    last claimed occurrence is stored so a new leader knows what was missed.
+    """
+
+    def __init__(
+        self,
+        store: StateStore = state_store,
+        poll_interval: float = 1.0,
+        dedupe_window: float = 5.0,
+    ) -> None:
+        self._store = store
+        self._poll_interval = poll_interval
+        self._dedupe_window = dedupe_window
+        self._runner: Optional[JobRunner] = None
+        self._action_runner: Optional[ActionRunner] = None
+        self._heap: List[Tuple[float, int, Union[_Job, _Occurrence]]] = []
+        self._seq = itertools.count()
+        self._known: Set[int] = set()
+        self._last_synced_id = 0
+        self._recurring: Dict[str, _Recurring] = {}
+        self._generations = itertools.count(1)
+        self._schedules_version: Any = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        # Jobs and occurrences being run; referenced until done, cancelled by stop().
+        self._running: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def set_runner(self, runner: JobRunner) -> None:
+        self._runner = runner
+
+    def set_action_runner(self, runner: ActionRunner) -> None:
+        """Runner for the actions of recurring schedules."""
+        self._action_runner = runner
+
+    def schedule(self, device: str, action: str, delay: float) -> Dict[str, Any]:
+        """Persist a delayed action; identical jobs due within the dedupe window collapse."""
+        due_at = time.time() + delay
+
+        existing = self._store.find_pending_job(device, action, due_at, self._dedupe_window)
+        if existing is not None:
+            event_log.record(
+                "schedule", device=device, action=action, job_id=existing["id"], delay=delay, deduplicated=True
+            )
+            return {"job_id": existing["id"], "due_at": existing["due_at"], "deduplicated": True}
+
+        job_id = self._store.add_job(device, action, due_at)
+        event_log.record("schedule", device=device, action=action, job_id=job_id, delay=delay)
+        if self.running:
+            self._push(job_id, device, action, due_at)
+        return {"job_id": job_id, "due_at": due_at, "deduplicated": False}
+
+    def _push(self, job_id: int, device: str, action: str, due_at: float) -> None:
+        if job_id in self._known:
+            return
+        self._known.add(job_id)
+        self._push_entry(due_at, _Job(job_id, device, action))
+
+    def _push_entry(self, due_at: float, entry: Union[_Job, _Occurrence]) -> None:
+        heapq.heappush(self._heap, (due_at, next(self._seq), entry))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _sync_from_store(self) -> None:
+        for job in self._store.pending_jobs(after_id=self._last_synced_id):
+            self._last_synced_id = max(self._last_synced_id, job["id"])
+            self._push(job["id"], job["device"], job["action"], job["due_at"])
+
+    # --- recurring schedules ---------------------------------------------
+
+    def all_schedules(self) -> Dict[str, Tuple[ScheduleConfig, str]]:
+        """name -> (schedule, source) for devices.toml ("config") and API ("api") schedules."""
+        result: Dict[str, Tuple[ScheduleConfig, str]] = {}
+        for name, spec in self._store.list_schedules().items():
+            try:
+                result[name] = (ScheduleConfig.model_validate(spec), "api")
+            except ValueError as e:
+                logger.warning("Ignoring invalid stored schedule %s: %s", name, e)
+        # devices.toml wins over a stale API entry of the same name.
+        for name, config in get_schedule_registry().items():
+            result[name] = (config, "config")
+        return result
+
+    def put_schedule(self, name: str, config: ScheduleConfig) -> None:
+        """Create or replace an API schedule (ValueError on unknown devices/scenes)."""
+        if name in get_schedule_registry():
+            raise ScheduleConflict(f"Schedule '{name}' is defined in devices.toml")
+        validate_schedules({name: config}, get_device_registry(), get_scene_registry())
+        self._store.put_schedule(name, config.model_dump(mode="json", exclude_none=True))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def delete_schedule(self, name: str) -> bool:
+        """Remove an API schedule; False if there is none by that name."""
+        deleted = self._store.delete_schedule(name)
+        if deleted and self._wakeup is not None:
+            self._wakeup.set()
+        return deleted
+
+    def next_run(self, config: ScheduleConfig, name: str) -> Optional[float]:
+        """Next nominal occurrence (no jitter), as seen from any worker."""
+        if not config.enabled:
+            return None
+        running = self._recurring.get(name)
+        if running is not None:
+            for _, _, entry in self._heap:
+                if isinstance(entry, _Occurrence) and entry.name == name and entry.generation == running.generation:
+                    return entry.fire_at
+        return config.next_fire(time.time())
+
+    def _sync_schedules(self) -> None:
+        version = (get_registry_version(), self._store.schedules_version())
+        if version == self._schedules_version:
+            return
+        self._schedules_version = version
+
+        now = time.time()
+        current = self.all_schedules()
+        for name, recurring in list(self._recurring.items()):
+            config = current.get(name, (None, None))[0]
+            if config is None or not config.enabled or config != recurring.config:
+                # Queued occurrences of the old definition are skipped by generation.
+                del self._recurring[name]
+        for name, (config, _) in current.items():
+            if not config.enabled or name in self._recurring:
+                continue
+            recurring = _Recurring(config=config, generation=next(self._generations))
+            self._recurring[name] = recurring
+            self._plan_next(name, recurring, self._store.schedule_last_fire(name, default=now), now)
+
+    def _plan_next(self, name: str, recurring: _Recurring, after: float, now: float) -> None:
+        config = recurring.config
+        fire_at = config.next_fire(after)
+        if fire_at < now - config.grace:
+            # Missed while no leader was running (restart, hand-over, sleep).
+            if config.missed == "run_once":
+                logger.info("Schedule %s missed a run; catching up once", name)
+                fire_at = now
+            else:
+                logger.info("Schedule %s missed a run; skipping to the next occurrence", name)
+                fire_at = config.next_fire(now)
+        due_at = fire_at + (random.uniform(0, config.jitter) if config.jitter else 0.0)
+        self._push_entry(due_at, _Occurrence(name, recurring.generation, fire_at))
+
+    async def _fire_occurrence(self, entry: _Occurrence) -> None:
+        recurring = self._recurring.get(entry.name)
+        if recurring is None or recurring.generation != entry.generation:
+            return
+        self._plan_next(entry.name, recurring, entry.fire_at, time.time())
+        if not self._store.claim_schedule_run(entry.name, entry.fire_at):
+            return
+        if self._action_runner is None:
+            logger.warning("Schedule %s is due but no action runner is configured", entry.name)
+            return
+        logger.info("Running schedule %s", entry.name)
+        event_source.set(f"schedule:{entry.name}")
+        started = time.perf_counter()
+        errors = []
+        for action in recurring.config.actions:
+            try:
+                await self._action_runner(action)
+            except Exception as e:
+                target = action.scene or f"{action.device}:{action.action}"
+                logger.warning("Schedule %s action %s failed: %s", entry.name, target, e)
+                errors.append(f"{target}: {e}")
+        event_log.record(
+            "schedule_run",
+            action=entry.name,
+            ok=not errors,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            late_by=round(time.time() - entry.fire_at, 3),
+            **({"errors": errors} if errors else {}),
+        )
+
+    # --- timer loop ------------------------------------------------------
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        requeued = self._store.requeue_running_jobs()
+        if requeued:
+            logger.warning("Re-queued %d job(s) left running by a previous leader.", requeued)
+        self._wakeup = asyncio.Event()
+        self._sync_from_store()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # A worker that lost leadership must not keep firing what it popped.
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self._running.clear()
+        self._heap.clear()
+        self._known.clear()
+        self._last_synced_id = 0
+        self._recurring.clear()
+        self._schedules_version = None
+
+    async def _loop(self) -> None:
+        assert self._wakeup is not None
+        last_prune = 0.0
+        while True:
+            try:
+                self._sync_from_store()
+            except Exception:
+                logger.exception("Scheduler failed to sync jobs from the state store")
+            try:
+                self._sync_schedules()
+            except Exception:
+                logger.exception("Scheduler failed to load recurring schedules")
+
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, entry = heapq.heappop(self._heap)
+                if isinstance(entry, _Job):
+                    task = asyncio.create_task(self._fire(entry.job_id, entry.device, entry.action, due_at))
+                else:
+                    task = asyncio.create_task(self._fire_occurrence(entry))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if now - last_prune > 3600:
+                self._store.prune_jobs(older_than=7 * 86400)
+                self._store.prune_kv()
+                last_prune = now
+
+            timeout = self._poll_interval
+            if self._heap:
+                timeout = max(0.0, min(timeout, self._heap[0][0] - now))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, job_id: int, device: str, action: str, due_at: float) -> None:
+        self._known.discard(job_id)
+        if not self._store.claim_job(job_id):
+            return
+        if self._runner is None:
+            self._store.finish_job(job_id, error="no job runner configured")
+            return
+        event_source.set(f"job:{job_id}")
+        started = time.perf_counter()
+        error = None
+        try:
+            await self._runner(device, action)
+        except asyncio.CancelledError:
+            # stop() mid-command: record it rather than leave the job "running"
+            # for the next leader to re-queue and send a second time.
+            self._store.finish_job(job_id, error="cancelled: scheduler stopped")
+            raise
+        except Exception as e:
+            logger.warning("Scheduled job %s (%s:%s) failed: %s", job_id, device, action, e)
+            error = f"{type(e).__name__}: {e}"
+        self._store.finish_job(job_id, error=error)
+        event_log.record(
+            "job",
+            device=device,
+            action=action,
+            ok=error is None,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            job_id=job_id,
+            late_by=round(time.time() - due_at, 3),
+            **({"error": error} if error else {}),
+        )
+
+
+scheduler = Scheduler()
@@ -0,0 +1,199 @@
+# src/intentcp_core/services/sdk_executor.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first. Interactive: commands a person (or rule/schedule) is waiting
+# on; normal: on-demand status reads; background: polling and sampling loops.
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+# Share of the queue a priority may fill before its new calls are rejected, so
+# background work gives up long before it can crowd out a button press.
+_ADMISSION = {INTERACTIVE: 1.0, NORMAL: 0.75, BACKGROUND: 0.5}
+
+_DEFAULT_WORKERS = 8
+_DEFAULT_QUEUE_LIMIT = 64
+
+
+class ExecutorSaturated(RuntimeError):
+    """The SDK executor's queue is too full to admit a call at this priority."""
+
+
+class _Call:
+    __slots__ = ("fn", "args", "kwargs", "ctx", "loop", "fut", "priority", "queued_at")
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        loop: asyncio.AbstractEventLoop,
+        fut: asyncio.Future,
+        priority: int,
+    ) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        # Worker threads run the call in the submitter's context (e.g. the event-log source).
+        self.ctx = contextvars.copy_context()
+        self.loop = loop
+        self.fut = fut
+        self.priority = priority
+        self.queued_at = time.monotonic()
+
+
+def _settle(fut: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if fut.done():
+        return  # caller was cancelled while the call ran
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+class SdkExecutor:
+    """Bounded thread pool for the blocking Tuya SDK, LAN and agent calls.
+
+    anyio's default thread limiter is shared with everything else in the server,
+    so a slow cloud or a long sequence could tie up all its threads and stall
+    unrelated requests. Blocking device calls go through this pool instead: at
+    most `runtime.sdk_workers` threads, a priority queue in front of them
+    (interactive before normal before background, FIFO within a priority), and
+    admission control that rejects new calls with `ExecutorSaturated` once the
+    queue holds its priority's share of `runtime.sdk_queue_limit`.
+
+    Threads are started on demand and stay for the life of the process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_limit: Optional[int] = None) -> None:
+        self._fixed_workers = workers
+        self._fixed_queue_limit = queue_limit
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int, _Call]] = []
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._active = 0
+        self._max_queued = 0
+        self._submitted = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._rejected = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._failed = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._completed = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._waits: Deque[float] = deque(maxlen=512)
+
+    def _limits(self) -> Tuple[int, int]:
+        try:
+            runtime = get_settings().runtime
+            workers, queue_limit = runtime.sdk_workers, runtime.sdk_queue_limit
+        except FileNotFoundError:
+            workers, queue_limit = _DEFAULT_WORKERS, _DEFAULT_QUEUE_LIMIT
+        return self._fixed_workers or workers, self._fixed_queue_limit or queue_limit
+
+    async def run(self, fn: Callable[..., Any], *args: Any, priority: int = NORMAL, **kwargs: Any) -> Any:
+        """Run blocking `fn(*args, **kwargs)` on the pool and return its result."""
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        call = _Call(fn, args, kwargs, loop, fut, priority)
+        workers, queue_limit = self._limits()
+
+        with self._cond:
+            if len(self._queue) >= max(1, int(queue_limit * _ADMISSION[priority])):
+                self._rejected[priority] += 1
+                message = (
+                    f"SDK executor saturated: {len(self._queue)} call(s) queued, "
+                    f"{self._active}/{workers} worker(s) busy ({PRIORITY_NAMES[priority]} call rejected)"
+                )
+                logger.warning(message)
+                raise ExecutorSaturated(message)
+            heapq.heappush(self._queue, (priority, next(self._seq), call))
+            self._submitted[priority] += 1
+            self._max_queued = max(self._max_queued, len(self._queue))
+            if len(self._queue) > self._idle and len(self._threads) < workers:
+                self._spawn()
+            else:
+                self._cond.notify()
+
+        # A cancelled caller leaves `fut` cancelled; the worker skips or discards it.
+        return await fut
+
+    def _spawn(self) -> None:
+        thread = threading.Thread(
+            target=self._work, name=f"intentcp-sdk-{len(self._threads) + 1}", daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue:
+                    self._cond.wait()
+                self._idle -= 1
+                _, _, call = heapq.heappop(self._queue)
+                if call.fut.cancelled():
+                    continue
+                self._active += 1
+                self._waits.append(time.monotonic() - call.queued_at)
+
+            result: Any = None
+            error: Optional[BaseException] = None
+            try:
+                result = call.ctx.run(call.fn, *call.args, **call.kwargs)
+            except BaseException as e:  # handed to the awaiting coroutine
+                error = e
+
+            with self._cond:
+                self._active -= 1
+                if error is None:
+                    self._completed[call.priority] += 1
+                else:
+                    self._failed[call.priority] += 1
+            try:
+                call.loop.call_soon_threadsafe(_settle, call.fut, result, error)
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+    def stats(self) -> Dict[str, Any]:
+        """Saturation metrics: pool size, queue depth, per-priority counters, queue wait."""
+        workers, queue_limit = self._limits()
+        with self._cond:
+            waits = sorted(self._waits)
+            queued = dict.fromkeys(PRIORITY_NAMES.values(), 0)
+            for priority, _, _ in self._queue:
+                queued[PRIORITY_NAMES[priority]] += 1
+            result = {
+                "workers": workers,
+                "threads": len(self._threads),
+                "active": self._active,
+                "queue_limit": queue_limit,
+                "queued": queued,
+                "max_queued": self._max_queued,
+                "submitted": {PRIORITY_NAMES[p]: n for p, n in self._submitted.items()},
+                "completed": {PRIORITY_NAMES[p]: n for p, n in self._completed.items()},
+                "failed": {PRIORITY_NAMES[p]: n for p, n in self._failed.items()},
+                "rejected": {PRIORITY_NAMES[p]: n for p, n in self._rejected.items()},
+            }
+        if waits:
+            result["wait_ms"] = {
+                "p50": round(waits[len(waits) // 2] * 1000, 1),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1),
+                "max": round(waits[-1] * 1000, 1),
+            }
+        return result
+
+
+sdk_executor = SdkExecutor()
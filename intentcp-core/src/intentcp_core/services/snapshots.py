@@ -0,0 +1,173 @@
+# src/intentcp_core/services/snapshots.py
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import anyio
+
+from ..config.settings import CONFIG_DIR
+from ..config.toml_edit import atomic_write_text
+from ..domain.devices import get_device_registry
+from ..drivers import driver_name
+from .dispatcher import command_dispatcher
+from .sdk_executor import sdk_executor
+from .tuya_client import tuya_client
+
+SNAPSHOT_DIR = CONFIG_DIR / "snapshots"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Data points that describe user-visible state and can be written back.
+# Read-only points (power metering, fault flags, countdowns) are ignored.
+RESTORABLE_CODES = (
+    "switch_led",
+    "switch",
+    "switch_1",
+    "switch_2",
+    "switch_3",
+    "switch_4",
+    "work_mode",
+    "bright_value",
+    "bright_value_v2",
+    "temp_value",
+    "temp_value_v2",
+    "colour_data",
+    "colour_data_v2",
+    "mode",
+    "temp_set",
+)
+_SWITCH_CODES = ("switch_led", "switch", "switch_1")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _snapshot_path(name: str) -> Path:
+    if not _NAME_RE.match(name):
+        raise SnapshotError(f"Invalid snapshot name: {name!r} (use letters, digits, '_' or '-')")
+    return SNAPSHOT_DIR / f"{name}.json"
+
+
+def _stateful_devices() -> Dict[str, str]:
+    """alias -> Tuya device id for devices whose state can be read back.
+
+    Dual-Fingerbot lights (separate ON/OFF bots) have no readable light state,
+    so they are left out of snapshots.
+    """
+    return {
+        alias: info.tuya_device_id
+        for alias, info in get_device_registry().items()
+        if info.tuya_device_id and driver_name(info) == "tuya"
+    }
+
+
+def _restore_commands(saved: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Commands needed to move a device from `current` to `saved` state."""
+    switch_code = next((c for c in _SWITCH_CODES if c in saved), None)
+    if switch_code is not None and saved[switch_code] is False:
+        # Restoring "off": only the switch matters, and writing brightness or
+        # colour to a light would typically turn it back on.
+        if current.get(switch_code) is False:
+            return []
+        return [{"code": switch_code, "value": False}]
+
+    commands = []
+    for code, value in saved.items():
+        if code in RESTORABLE_CODES and current.get(code) != value:
+            commands.append({"code": code, "value": value})
+    # Switch first so the remaining values apply to a powered device.
+    commands.sort(key=lambda c: c["code"] != switch_code)
+    return commands
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    if not SNAPSHOT_DIR.exists():
+        return []
+    items = []
+    for path in sorted(SNAPSHOT_DIR.glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        items.append(
+            {
+                "name": path.stem,
+                "created_at": data.get("created_at"),
+                "device_count": len(data.get("devices") or {}),
+            }
+        )
+    return items
+
+
+def load_snapshot(name: str) -> Dict[str, Any]:
+    path = _snapshot_path(name)
+    if not path.exists():
+        raise FileNotFoundError(name)
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def delete_snapshot(name: str) -> None:
+    path = _snapshot_path(name)
+    if not path.exists():
+        raise FileNotFoundError(name)
+    path.unlink()
+
+
+async def capture_snapshot(name: str) -> Dict[str, Any]:
+    """Capture the restorable state of every readable device in one batched fetch."""
+    path = _snapshot_path(name)
+    devices = _stateful_devices()
+    states = await sdk_executor.run(tuya_client.get_status_batch, list(devices.values()))
+
+    snapshot: Dict[str, Any] = {"name": name, "created_at": time.time(), "devices": {}}
+    missing: List[str] = []
+    for alias, device_id in devices.items():
+        status = states.get(device_id)
+        if status is None:
+            missing.append(alias)
+            continue
+        restorable = {k: v for k, v in status.items() if k in RESTORABLE_CODES}
+        if restorable:
+            snapshot["devices"][alias] = {"tuya_device_id": device_id, "status": restorable}
+
+    await anyio.to_thread.run_sync(atomic_write_text, path, json.dumps(snapshot, ensure_ascii=False, indent=2))
+    return {"name": name, "devices": sorted(snapshot["devices"]), "unreachable": missing}
+
+
+async def restore_snapshot(name: str, dry_run: bool = False) -> Dict[str, Any]:
+    """Diff a snapshot against current state and send only the changed data points.
+
+    Commands are batched per device (one request each) and devices are restored
+    in parallel through their command lanes.
+    """
+    snapshot = load_snapshot(name)
+    saved_devices: Dict[str, Dict[str, Any]] = snapshot.get("devices") or {}
+    device_ids = [d["tuya_device_id"] for d in saved_devices.values()]
+    current = await sdk_executor.run(tuya_client.get_status_batch, device_ids)
+
+    plan: Dict[str, Dict[str, Any]] = {}
+    for alias, entry in saved_devices.items():
+        device_id = entry["tuya_device_id"]
+        commands = _restore_commands(entry.get("status") or {}, current.get(device_id) or {})
+        if commands:
+            plan[alias] = {"tuya_device_id": device_id, "commands": commands}
+
+    if dry_run or not plan:
+        return {"name": name, "dry_run": dry_run, "changes": plan, "results": {}}
+
+    async def _apply(alias: str, entry: Dict[str, Any]) -> tuple[str, Any]:
+        device_id = entry["tuya_device_id"]
+        try:
+            resp = await command_dispatcher.submit(device_id, tuya_client.send_commands, device_id, entry["commands"])
+            return alias, {"ok": True, "tuya_response": resp}
+        except Exception as e:
+            return alias, {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    results = dict(await asyncio.gather(*(_apply(alias, entry) for alias, entry in plan.items())))
+    return {"name": name, "dry_run": False, "changes": plan, "results": results}
@@ -0,0 +1,294 @@
+# src/intentcp_core/services/state_store.py
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..config.settings import CONFIG_DIR
+
+try:  # POSIX only; Windows hosts fall back to a single-process assumption.
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+STATE_DB_FILE = CONFIG_DIR / "runtime.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS device_state (
+    device_id  TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    source     TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    device      TEXT NOT NULL,
+    action      TEXT NOT NULL,
+    due_at      REAL NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',
+    created_at  REAL NOT NULL,
+    finished_at REAL,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (state, due_at);
+CREATE TABLE IF NOT EXISTS schedules (
+    name       TEXT PRIMARY KEY,
+    spec       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schedule_runs (
+    name      TEXT PRIMARY KEY,
+    last_fire REAL NOT NULL
+);
+"""
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Blocking cross-process exclusive lock on `path` (no-op without fcntl)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class StateStore:
+    """Runtime state shared by every uvicorn worker on this host.
+
+    Backed by a SQLite database in WAL mode under `config/`, so readers never block
+    the writer and each worker process sees the same token, device state and jobs.
+    Connections are per-thread because calls arrive from both the event loop and
+    SDK worker threads.
+    """
+
+    def __init__(self, path: Path = STATE_DB_FILE) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._listeners: List[Callable[[str, Dict[str, Any], str], None]] = []
+
+    def _conn(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    # --- key/value -------------------------------------------------------
+
+    def get_json(self, key: str) -> Any:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return json.loads(value)
+
+    def set_json(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._conn().execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value), expires_at),
+        )
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def prune_kv(self) -> None:
+        """Drop expired key/value entries (reads already ignore them)."""
+        self._conn().execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    # --- device state (status cache / shadow) ----------------------------
+
+    def get_device_state(self, device_id: str, max_age: float | None = None) -> Optional[Dict[str, Any]]:
+        """Return `{code: value}` for a device, or None if unknown or older than `max_age`."""
+        row = self._conn().execute(
+            "SELECT status, updated_at FROM device_state WHERE device_id = ?", (device_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, updated_at = row
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        return json.loads(status)
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any], str], None]) -> Callable[[], None]:
+        """Call `callback(device_id, values, source)` for every state written by this process.
+
+        `values` are the data points reported by that write (not the merged state).
+        Callbacks run on the writer's thread (SDK, MQTT or event loop), so they must
+        be quick and hand off any real work. Returns an unsubscribe function.
+        """
+        self._listeners.append(callback)
+
+        def _unsubscribe() -> None:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+        return _unsubscribe
+
+    def put_device_state(self, device_id: str, status: Dict[str, Any], source: str, merge: bool = False) -> None:
+        conn = self._conn()
+        reported = status
+        if merge:
+            current = self.get_device_state(device_id) or {}
+            current.update(status)
+            status = current
+        conn.execute(
+            "INSERT INTO device_state (device_id, status, source, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(device_id) DO UPDATE SET status = excluded.status, "
+            "source = excluded.source, updated_at = excluded.updated_at",
+            (device_id, json.dumps(status), source, time.time()),
+        )
+        for callback in list(self._listeners):
+            try:
+                callback(device_id, reported, source)
+            except Exception:
+                logger.exception("Device state listener failed")
+
+    def device_states_since(self, since: float) -> List[Tuple[str, Dict[str, Any], float]]:
+        """`(device_id, status, updated_at)` for every device state written after `since`."""
+        rows = self._conn().execute(
+            "SELECT device_id, status, updated_at FROM device_state WHERE updated_at > ?", (since,)
+        ).fetchall()
+        return [(device_id, json.loads(status), updated_at) for device_id, status, updated_at in rows]
+
+    def device_ids_with_state(self, device_ids: List[str]) -> Set[str]:
+        """Those of `device_ids` that have a stored state (not invalidated since)."""
+        if not device_ids:
+            return set()
+        rows = self._conn().execute(
+            f"SELECT device_id FROM device_state WHERE device_id IN ({','.join('?' * len(device_ids))})", device_ids
+        ).fetchall()
+        return {device_id for (device_id,) in rows}
+
+    def invalidate_device_state(self, device_id: str) -> None:
+        self._conn().execute("DELETE FROM device_state WHERE device_id = ?", (device_id,))
+
+    # --- scheduled jobs --------------------------------------------------
+
+    def add_job(self, device: str, action: str, due_at: float) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO jobs (device, action, due_at, created_at) VALUES (?, ?, ?, ?)",
+            (device, action, due_at, time.time()),
+        )
+        return int(cur.lastrowid)
+
+    def find_pending_job(self, device: str, action: str, due_at: float, window: float) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT id, due_at FROM jobs WHERE state = 'pending' AND device = ? AND action = ? "
+            "AND due_at BETWEEN ? AND ? ORDER BY due_at LIMIT 1",
+            (device, action, due_at - window, due_at + window),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "due_at": row[1]}
+
+    def pending_jobs(self, after_id: int = 0) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT id, device, action, due_at FROM jobs WHERE state = 'pending' AND id > ? ORDER BY id",
+            (after_id,),
+        ).fetchall()
+        return [{"id": r[0], "device": r[1], "action": r[2], "due_at": r[3]} for r in rows]
+
+    def claim_job(self, job_id: int) -> bool:
+        """Atomically move a job from pending to running; False if someone else did."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET state = 'running' WHERE id = ? AND state = 'pending'", (job_id,)
+        )
+        return cur.rowcount == 1
+
+    def finish_job(self, job_id: int, error: str | None = None) -> None:
+        self._conn().execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, error = ? WHERE id = ?",
+            ("failed" if error else "done", time.time(), error, job_id),
+        )
+
+    def requeue_running_jobs(self) -> int:
+        """Return jobs orphaned by a dead leader to the pending state."""
+        cur = self._conn().execute("UPDATE jobs SET state = 'pending' WHERE state = 'running'")
+        return cur.rowcount
+
+    def prune_jobs(self, older_than: float) -> None:
+        self._conn().execute(
+            "DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than,),
+        )
+
+
+    # --- recurring schedules ---------------------------------------------
+
+    def list_schedules(self) -> Dict[str, Dict[str, Any]]:
+        """Schedules created through the API: name -> stored spec."""
+        rows = self._conn().execute("SELECT name, spec FROM schedules ORDER BY name").fetchall()
+        return {name: json.loads(spec) for name, spec in rows}
+
+    def put_schedule(self, name: str, spec: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT INTO schedules (name, spec, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET spec = excluded.spec, updated_at = excluded.updated_at",
+            (name, json.dumps(spec), time.time()),
+        )
+
+    def delete_schedule(self, name: str) -> bool:
+        cur = self._conn().execute("DELETE FROM schedules WHERE name = ?", (name,))
+        return cur.rowcount == 1
+
+    def schedules_version(self) -> tuple:
+        """Changes whenever an API schedule is added, replaced or removed."""
+        return tuple(self._conn().execute("SELECT COUNT(*), MAX(updated_at) FROM schedules").fetchone())
+
+    def schedule_last_fire(self, name: str, default: float) -> float:
+        """Last claimed occurrence of a schedule; records `default` for new schedules."""
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO schedule_runs (name, last_fire) VALUES (?, ?)", (name, default))
+        return conn.execute("SELECT last_fire FROM schedule_runs WHERE name = ?", (name,)).fetchone()[0]
+
+    def claim_schedule_run(self, name: str, fire_at: float) -> bool:
+        """Record occurrence `fire_at` as run; False if it (or a later one) already was."""
+        cur = self._conn().execute(
+            "INSERT INTO schedule_runs (name, last_fire) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET last_fire = excluded.last_fire "
+            "WHERE schedule_runs.last_fire < excluded.last_fire",
+            (name, fire_at),
+        )
+        return cur.rowcount == 1
+
+
+state_store = StateStore()
+
+
+def lock_path(name: str) -> Path:
+    return CONFIG_DIR / f".{name}.lock"
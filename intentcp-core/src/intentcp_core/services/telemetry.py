@@ -0,0 +1,309 @@
+# src/intentcp_core/services/telemetry.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+
+from ..config.settings import CONFIG_DIR, get_settings
+from ..domain.devices import get_device_registry
+from .sdk_executor import BACKGROUND, ExecutorSaturated, sdk_executor
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_DB_FILE = CONFIG_DIR / "telemetry.sqlite3"
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+# Resolution (seconds) -> how long its buckets are kept (None = forever).
+RETENTION: Dict[int, Optional[int]] = {MINUTE: 7 * DAY, HOUR: 400 * DAY, DAY: None}
+# Range queries pick the finest kept resolution that stays under this many points.
+MAX_POINTS = 1500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id     INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    code   TEXT NOT NULL,
+    UNIQUE (device, code)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    series     INTEGER NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket     INTEGER NOT NULL,
+    count      INTEGER NOT NULL,
+    sum        REAL NOT NULL,
+    min        REAL NOT NULL,
+    max        REAL NOT NULL,
+    last       REAL NOT NULL,
+    PRIMARY KEY (series, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def _numeric(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+class TelemetryStore:
+    """Per-minute/hour/day aggregates of numeric data points in SQLite.
+
+    Nothing is stored per sample: samples are folded into an in-memory minute
+    bucket (count/sum/min/max/last) and each finished minute is written with a
+    single transaction for all series. Closed hours are rolled up from their
+    minutes and closed days from their hours, then expired buckets are deleted,
+    so the database stays small and the SD card sees about one write a minute.
+    """
+
+    def __init__(self, path: Path = TELEMETRY_DB_FILE) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._series: Dict[Tuple[str, str], int] = {}
+        self._open: Dict[Tuple[int, int], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _series_id(self, device: str, code: str) -> int:
+        key = (device, code)
+        series_id = self._series.get(key)
+        if series_id is None:
+            conn = self._conn()
+            conn.execute("INSERT OR IGNORE INTO series (device, code) VALUES (?, ?)", key)
+            series_id = conn.execute("SELECT id FROM series WHERE device = ? AND code = ?", key).fetchone()[0]
+            self._series[key] = series_id
+        return series_id
+
+    # --- writing ---------------------------------------------------------
+
+    def add(self, device: str, code: str, value: Any, ts: Optional[float] = None) -> None:
+        number = _numeric(value)
+        if number is None:
+            return
+        bucket = int(ts if ts is not None else time.time()) // MINUTE * MINUTE
+        key = (self._series_id(device, code), bucket)
+        with self._lock:
+            agg = self._open.get(key)
+            if agg is None:
+                self._open[key] = [1, number, number, number, number]
+            else:
+                agg[0] += 1
+                agg[1] += number
+                agg[2] = min(agg[2], number)
+                agg[3] = max(agg[3], number)
+                agg[4] = number
+
+    def flush(self, now: Optional[float] = None, include_open: bool = False) -> int:
+        """Write finished minute buckets (all of them with `include_open`); returns rows written."""
+        current = int(now if now is not None else time.time()) // MINUTE * MINUTE
+        with self._lock:
+            done = {k: v for k, v in self._open.items() if include_open or k[1] < current}
+            for key in done:
+                del self._open[key]
+        if not done:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            # Merge rather than replace: a restart can split one minute in two writes.
+            conn.executemany(
+                "INSERT INTO rollups (series, resolution, bucket, count, sum, min, max, last) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(series, resolution, bucket) DO UPDATE SET "
+                "count = count + excluded.count, sum = sum + excluded.sum, "
+                "min = MIN(min, excluded.min), max = MAX(max, excluded.max), last = excluded.last",
+                [(series, MINUTE, bucket, *agg) for (series, bucket), agg in done.items()],
+            )
+        return len(done)
+
+    def _roll_up(self, source: int, target: int, until: int) -> None:
+        """Aggregate closed `target` buckets before `until` from `source` buckets.
+
+        Each series resumes at its own latest `target` bucket, which is
+        aggregated again: a series that started after others were rolled up is
+        still covered, and so is a source bucket flushed after its hour (or
+        day) was first rolled up.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            # `last` of a bucket is the `last` of its latest source bucket.
+            conn.execute(
+                "INSERT OR REPLACE INTO rollups (series, resolution, bucket, count, sum, min, max, last) "
+                "SELECT r.series, ?, r.bucket / ? * ?, SUM(r.count), SUM(r.sum), MIN(r.min), MAX(r.max), "
+                "(SELECT r2.last FROM rollups r2 WHERE r2.series = r.series AND r2.resolution = ? "
+                " AND r2.bucket / ? = r.bucket / ? ORDER BY r2.bucket DESC LIMIT 1) "
+                "FROM (SELECT s.id AS series, COALESCE("
+                " (SELECT MAX(bucket) FROM rollups WHERE series = s.id AND resolution = ?), 0) AS rolled "
+                " FROM series s) w "
+                "JOIN rollups r ON r.series = w.series AND r.resolution = ? AND r.bucket >= w.rolled AND r.bucket < ? "
+                "GROUP BY r.series, r.bucket / ?",
+                (target, target, target, source, target, target, target, source, until, target),
+            )
+
+    def compact(self, now: Optional[float] = None) -> None:
+        """Roll closed hours/days up and delete buckets past their retention."""
+        now_i = int(now if now is not None else time.time())
+        self._roll_up(MINUTE, HOUR, now_i // HOUR * HOUR)
+        self._roll_up(HOUR, DAY, now_i // DAY * DAY)
+        conn = self._conn()
+        deleted = 0
+        for resolution, keep in RETENTION.items():
+            if keep is not None:
+                deleted += conn.execute(
+                    "DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (resolution, now_i - keep)
+                ).rowcount
+        if deleted:
+            conn.execute("PRAGMA incremental_vacuum")
+
+    # --- reading ---------------------------------------------------------
+
+    def series(self) -> List[Dict[str, Any]]:
+        """Every recorded series with its latest minute and 24 h min/avg/max."""
+        since = int(time.time()) - DAY
+        rows = self._conn().execute(
+            "SELECT s.device, s.code, "
+            "(SELECT last FROM rollups WHERE series = s.id AND resolution = ? ORDER BY bucket DESC LIMIT 1), "
+            "(SELECT MAX(bucket) FROM rollups WHERE series = s.id AND resolution = ?), "
+            "MIN(r.min), SUM(r.sum) / SUM(r.count), MAX(r.max) "
+            "FROM series s LEFT JOIN rollups r ON r.series = s.id AND r.resolution = ? AND r.bucket >= ? "
+            "GROUP BY s.id ORDER BY s.device, s.code",
+            (MINUTE, MINUTE, MINUTE, since),
+        ).fetchall()
+        return [
+            {"device": d, "code": c, "last": last, "last_at": last_at, "min_24h": lo, "avg_24h": avg, "max_24h": hi}
+            for d, c, last, last_at, lo, avg, hi in rows
+        ]
+
+    def query(
+        self,
+        device: str,
+        code: str,
+        since: float,
+        until: float,
+        resolution: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Points `{ts, avg, min, max, last}` for a time range at a fitting resolution."""
+        if resolution is None:
+            span = max(until - since, 1)
+            oldest_needed = time.time() - since
+            resolution = DAY
+            for candidate in (MINUTE, HOUR, DAY):
+                keep = RETENTION[candidate]
+                if (keep is None or keep >= oldest_needed) and span / candidate <= MAX_POINTS:
+                    resolution = candidate
+                    break
+        row = self._conn().execute("SELECT id FROM series WHERE device = ? AND code = ?", (device, code)).fetchone()
+        points: List[Dict[str, Any]] = []
+        if row is not None:
+            for bucket, count, total, lo, hi, last in self._conn().execute(
+                "SELECT bucket, count, sum, min, max, last FROM rollups "
+                "WHERE series = ? AND resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+                (row[0], resolution, int(since) // resolution * resolution, until),
+            ):
+                points.append({"ts": bucket, "avg": total / count, "min": lo, "max": hi, "last": last})
+        return {"device": device, "code": code, "resolution": resolution, "points": points}
+
+
+class TelemetryRecorder:
+    """Sample the `telemetry` data points of devices.toml devices (leader only).
+
+    Every `runtime.telemetry_interval` seconds one batched status call covers all
+    recorded devices (it shares the status cache with everything else); the
+    values go into `telemetry_store`.
+    """
+
+    def __init__(self, store: TelemetryStore) -> None:
+        self._store = store
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _targets() -> Dict[str, Tuple[str, List[str]]]:
+        """Tuya device id -> (alias, codes) for every device with `telemetry` codes."""
+        return {
+            info.tuya_device_id: (alias, list(info.telemetry))
+            for alias, info in get_device_registry().items()
+            if info.telemetry and info.tuya_device_id
+        }
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await anyio.to_thread.run_sync(lambda: self._store.flush(include_open=True))
+
+    def _sample(self, targets: Dict[str, Tuple[str, List[str]]]) -> None:
+        from .tuya_client import tuya_client
+
+        now = time.time()
+        states = tuya_client.get_status_batch(list(targets))
+        for device_id, (alias, codes) in targets.items():
+            status = states.get(device_id) or {}
+            for code in codes:
+                if code in status:
+                    self._store.add(alias, code, status[code], ts=now)
+
+    def _maintain(self) -> None:
+        self._store.flush()
+        self._store.compact()
+
+    async def _loop(self) -> None:
+        last_compact = 0.0
+        while True:
+            try:
+                interval = get_settings().runtime.telemetry_interval
+            except FileNotFoundError:
+                interval = 0.0
+            if interval <= 0:
+                await asyncio.sleep(60)
+                continue
+
+            started = time.monotonic()
+            try:
+                targets = self._targets()
+                if targets:
+                    try:
+                        await sdk_executor.run(self._sample, targets, priority=BACKGROUND)
+                    except ExecutorSaturated:
+                        logger.debug("Telemetry sample skipped: SDK executor saturated")
+                # Flushing is cheap (finished minutes only); compaction runs every few minutes.
+                if time.monotonic() - last_compact > 300:
+                    await anyio.to_thread.run_sync(self._maintain)
+                    last_compact = time.monotonic()
+                else:
+                    await anyio.to_thread.run_sync(self._store.flush)
+            except Exception:
+                logger.exception("Telemetry sampling failed")
+            await asyncio.sleep(max(1.0, interval - (time.monotonic() - started)))
+
+
+telemetry_store = TelemetryStore()
+telemetry_recorder = TelemetryRecorder(telemetry_store)
@@ -1,83 +1,320 @@
 from __future__ import annotations
 
-from typing import Any, Optional
-from tuya_iot import TuyaOpenAPI
-from ..config.settings import settings
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+from ..config.settings import get_settings
+from .device_specs import spec_cache
+from .events import event_log
+from .state_store import file_lock, lock_path, state_store
+from .tuya_local import tuya_local
 import logging
 
+if TYPE_CHECKING:
+    from tuya_iot import TuyaOpenAPI
+
 logger = logging.getLogger(__name__)
 
+# Shared (cross-worker) token entry in the state store.
+_TOKEN_KEY = "tuya.token"
+# Do not hand out a shared token that expires within this many seconds.
+_TOKEN_EXPIRY_MARGIN_S = 60
+# Max device ids per batched status call accepted by the OpenAPI.
+_STATUS_BATCH_SIZE = 20
+# LAN devices in a status batch are queried in parallel and waited for this
+# long in total; the rest (stale IP, unreachable) join the batched cloud call.
+_LOCAL_BATCH_DEADLINE_S = 1.0
+_LOCAL_BATCH_WORKERS = 8
+
+
+def _succeeded(resp: Any) -> bool:
+    return not (isinstance(resp, dict) and resp.get("success") is False)
+
+
+def _failure(resp: Any) -> Dict[str, Any]:
+    if _succeeded(resp):
+        return {}
+    return {"error": f"code={resp.get('code')} {resp.get('msg') or ''}".strip()}
+
+
+def _record(call: str, device_id: Optional[str], transport: str, started: float, ok: bool, **detail: Any) -> None:
+    """Event log entry for one call that actually left the process (not cache hits)."""
+    latency_ms = (time.perf_counter() - started) * 1000
+    event_log.record("tuya", device=device_id, action=call, ok=ok, latency_ms=latency_ms, transport=transport, **detail)
+
 
 class TuyaClient:
     def __init__(self) -> None:
-        self._api: Optional[TuyaOpenAPI] = None
+        # The SDK (and its requests/paho/Crypto imports) is only loaded on first use.
+        self._api: Optional["TuyaOpenAPI"] = None
+        self._local_pool: Optional[ThreadPoolExecutor] = None
+        self._local_pool_lock = threading.Lock()
+
+    def _token_identity(self) -> str:
+        settings = get_settings()
+        return f"{settings.tuya.endpoint}|{settings.tuya.access_id}|{settings.tuya.username}"
+
+    def _load_shared_token(self) -> Optional[Dict[str, Any]]:
+        entry = state_store.get_json(_TOKEN_KEY)
+        if not isinstance(entry, dict) or entry.get("identity") != self._token_identity():
+            return None
+        response = entry.get("response")
+        if not isinstance(response, dict):
+            return None
+
+        from tuya_iot.openapi import TuyaTokenInfo
 
-    def _ensure_connected(self) -> TuyaOpenAPI:
+        expire_ms = TuyaTokenInfo(response).expire_time
+        if expire_ms <= (time.time() + _TOKEN_EXPIRY_MARGIN_S) * 1000:
+            return None
+        return response
+
+    def _reset_token(self) -> None:
+        """Drop the local client and the shared token (e.g. after code=1010)."""
+        self._api = None
+        state_store.delete(_TOKEN_KEY)
+
+    def _ensure_connected(self) -> "TuyaOpenAPI":
         if self._api is not None:
             return self._api
 
+        from tuya_iot import TuyaOpenAPI
+        from tuya_iot.openapi import TuyaTokenInfo
+
+        settings = get_settings()
         api = TuyaOpenAPI(
             settings.tuya.endpoint,
             settings.tuya.access_id,
             settings.tuya.access_key,
         )
 
-        logger.info(
-            "Connecting to Tuya OpenAPI (endpoint=%s, username=%s)...",
-            settings.tuya.endpoint,
-            settings.tuya.username,
-        )
-        try:
-            ok = api.connect(
+        # Serialize logins across workers: the first one logs in and shares the
+        # token, everyone waiting on the lock then reuses it instead of logging in.
+        with file_lock(lock_path("tuya_login")):
+            shared = self._load_shared_token()
+            if shared is not None:
+                api.token_info = TuyaTokenInfo(shared)
+                self._api = api
+                logger.info("Reusing shared Tuya OpenAPI token.")
+                return self._api
+
+            logger.info(
+                "Connecting to Tuya OpenAPI (endpoint=%s, username=%s)...",
+                settings.tuya.endpoint,
                 settings.tuya.username,
-                settings.tuya.password,
-                settings.tuya.country_code,
-                settings.tuya.app_schema,
             )
-        except Exception as e:
-            logger.exception("Tuya OpenAPI connect() raised an exception.")
-            raise RuntimeError(f"Tuya OpenAPI connect() failed: {e}") from e
+            try:
+                ok = api.connect(
+                    settings.tuya.username,
+                    settings.tuya.password,
+                    settings.tuya.country_code,
+                    settings.tuya.app_schema,
+                )
+            except Exception as e:
+                logger.exception("Tuya OpenAPI connect() raised an exception.")
+                raise RuntimeError(f"Tuya OpenAPI connect() failed: {e}") from e
+
+            # connect() returns the login response dict in current SDK versions.
+            if not ok or (isinstance(ok, dict) and not ok.get("success")):
+                logger.error("Tuya OpenAPI login failed. Check access_id/access_key/endpoint/username/password.")
+                raise RuntimeError("Tuya OpenAPI login failed (connect() returned False).")
 
-        if not ok:
-            logger.error("Tuya OpenAPI login failed. Check access_id/access_key/endpoint/username/password.")
-            raise RuntimeError("Tuya OpenAPI login failed (connect() returned False).")
+            if isinstance(ok, dict):
+                state_store.set_json(_TOKEN_KEY, {"identity": self._token_identity(), "response": ok})
 
         self._api = api
         logger.info("Tuya OpenAPI connected successfully.")
         return self._api
 
-    def send_command(self, device_id: str, code: str, value: Any) -> Any:
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any] | None = None,
+        body: Dict[str, Any] | None = None,
+    ) -> Any:
+        """Call an OpenAPI endpoint, reconnecting and retrying once on an invalid token."""
         api = self._ensure_connected()
-        payload = {"commands": [{"code": code, "value": value}]}
-
-        resp = api.post(
-            f"/v1.0/iot-03/devices/{device_id}/commands",
-            payload,
-        )
+        resp = self._call(api, method, path, params, body)
 
         # If token is invalid/expired, clear client and retry once.
         if isinstance(resp, dict) and resp.get("code") == 1010:
-            logger.warning("Tuya token invalid (code=1010), reconnecting and retrying command once...")
-            self._api = None
+            logger.warning("Tuya token invalid (code=1010) on %s %s, reconnecting and retrying once...", method, path)
+            self._reset_token()
             api = self._ensure_connected()
-            resp = api.post(
-                f"/v1.0/iot-03/devices/{device_id}/commands",
-                payload,
-            )
+            resp = self._call(api, method, path, params, body)
+
+        return resp
+
+    @staticmethod
+    def _call(api: "TuyaOpenAPI", method: str, path: str, params: Dict[str, Any] | None, body: Dict[str, Any] | None) -> Any:
+        if method == "GET":
+            return api.get(path, params)
+        if method == "POST":
+            return api.post(path, body)
+        if method == "PUT":
+            return api.put(path, body)
+        if method == "DELETE":
+            return api.delete(path, params)
+        raise ValueError(f"Unsupported method: {method}")
 
+    def user_id(self) -> str:
+        """Tuya user id (uid) of the logged-in app account."""
+        return self._ensure_connected().token_info.uid
+
+    def send_command(self, device_id: str, code: str, value: Any) -> Any:
+        return self.send_commands(device_id, [{"code": code, "value": value}])
+
+    def send_commands(self, device_id: str, commands: List[Dict[str, Any]]) -> Any:
+        """Send several data-point commands to one device in a single request.
+
+        Devices with a local key go over the LAN first and use the cloud only
+        if that fails. Codes and values are checked against the device's cached
+        specification first (`InvalidCommand` if it cannot take them).
+        """
+        commands = spec_cache.translate(device_id, commands)
+        if tuya_local.available(device_id):
+            started = time.perf_counter()
+            try:
+                resp = tuya_local.send_commands(device_id, commands)
+                state_store.invalidate_device_state(device_id)
+                _record("commands", device_id, "local", started, True, commands=commands)
+                return resp
+            except Exception as e:
+                logger.warning("Local control of %s failed, using the cloud: %s", device_id, e)
+                _record("commands", device_id, "local", started, False, error=str(e))
+
+        started = time.perf_counter()
+        try:
+            resp = self.request("POST", f"/v1.0/iot-03/devices/{device_id}/commands", body={"commands": commands})
+        except Exception as e:
+            _record("commands", device_id, "cloud", started, False, commands=commands, error=str(e))
+            raise
+        _record("commands", device_id, "cloud", started, _succeeded(resp), commands=commands, **_failure(resp))
+
+        # The cached status no longer reflects reality once a command went out.
+        state_store.invalidate_device_state(device_id)
         return resp
 
     def get_status(self, device_id: str) -> Any:
-        api = self._ensure_connected()
-        resp = api.get(f"/v1.0/iot-03/devices/{device_id}/status")
+        cached = state_store.get_device_state(device_id, max_age=get_settings().runtime.status_cache_ttl)
+        if cached is not None:
+            return {
+                "success": True,
+                "result": [{"code": k, "value": v} for k, v in cached.items()],
+                "cached": True,
+            }
 
-        if isinstance(resp, dict) and resp.get("code") == 1010:
-            logger.warning("Tuya token invalid (code=1010) on status call, reconnecting and retrying once...")
-            self._api = None
-            api = self._ensure_connected()
-            resp = api.get(f"/v1.0/iot-03/devices/{device_id}/status")
+        local = self._get_local_status(device_id)
+        if local is not None:
+            return {
+                "success": True,
+                "result": [{"code": k, "value": v} for k, v in local.items()],
+                "transport": "local",
+            }
+
+        started = time.perf_counter()
+        try:
+            resp = self.request("GET", f"/v1.0/iot-03/devices/{device_id}/status")
+        except Exception as e:
+            _record("status", device_id, "cloud", started, False, error=str(e))
+            raise
+        _record("status", device_id, "cloud", started, _succeeded(resp), **_failure(resp))
+
+        if isinstance(resp, dict) and resp.get("success") and isinstance(resp.get("result"), list):
+            values = {item["code"]: item.get("value") for item in resp["result"] if "code" in item}
+            state_store.put_device_state(device_id, values, source="poll")
 
         return resp
 
+    def _get_local_status(self, device_id: str) -> Optional[Dict[str, Any]]:
+        if not tuya_local.available(device_id):
+            return None
+        started = time.perf_counter()
+        try:
+            values = tuya_local.get_status(device_id)
+        except Exception as e:
+            logger.warning("Local status of %s failed, using the cloud: %s", device_id, e)
+            _record("status", device_id, "local", started, False, error=str(e))
+            return None
+        _record("status", device_id, "local", started, True)
+        state_store.put_device_state(device_id, values, source="local")
+        return values
+
+    def _get_local_statuses(self, device_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Local status of the LAN-reachable `device_ids`, queried in parallel within a deadline."""
+        local = [device_id for device_id in device_ids if tuya_local.available(device_id)]
+        if not local:
+            return {}
+        if len(local) == 1:
+            values = self._get_local_status(local[0])
+            return {} if values is None else {local[0]: values}
+        with self._local_pool_lock:
+            if self._local_pool is None:
+                self._local_pool = ThreadPoolExecutor(_LOCAL_BATCH_WORKERS, thread_name_prefix="tuya-local-status")
+        futures = {self._local_pool.submit(self._get_local_status, device_id): device_id for device_id in local}
+        done, pending = wait(futures, timeout=_LOCAL_BATCH_DEADLINE_S)
+        for future in pending:
+            # Late answers still land in the state store; this call does not wait for them.
+            future.cancel()
+        return {futures[f]: f.result() for f in done if f.result() is not None}
+
+    def get_status_batch(self, device_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return `{device_id: {code: value}}` using the shared cache and batched calls.
+
+        Devices the cloud did not report (offline, unknown id) are absent from the result.
+        """
+        ttl = get_settings().runtime.status_cache_ttl
+        result: Dict[str, Dict[str, Any]] = {}
+        uncached: List[str] = []
+        for device_id in dict.fromkeys(device_ids):
+            cached = state_store.get_device_state(device_id, max_age=ttl)
+            if cached is not None:
+                result[device_id] = cached
+            else:
+                uncached.append(device_id)
+        result.update(self._get_local_statuses(uncached))
+        missing = [device_id for device_id in uncached if device_id not in result]
+
+        for i in range(0, len(missing), _STATUS_BATCH_SIZE):
+            chunk = missing[i : i + _STATUS_BATCH_SIZE]
+            started = time.perf_counter()
+            resp = self.request("GET", "/v1.0/iot-03/devices/status", params={"device_ids": ",".join(chunk)})
+            _record("status_batch", None, "cloud", started, _succeeded(resp), device_ids=chunk, **_failure(resp))
+
+            if not (isinstance(resp, dict) and resp.get("success")):
+                logger.warning("Batch status call failed for %s: %s", chunk, resp)
+                continue
+
+            for entry in resp.get("result") or []:
+                device_id = entry.get("id")
+                if not device_id:
+                    continue
+                values = {item["code"]: item.get("value") for item in entry.get("status") or [] if "code" in item}
+                state_store.put_device_state(device_id, values, source="poll")
+                result[device_id] = values
+
+        return result
+
+    def get_online_batch(self, device_ids: Iterable[str]) -> Dict[str, bool]:
+        """Return `{device_id: online}` from batched device-info calls (never cached).
+
+        Devices the cloud does not know are absent from the result.
+        """
+        ids = list(dict.fromkeys(device_ids))
+        online: Dict[str, bool] = {}
+        for i in range(0, len(ids), _STATUS_BATCH_SIZE):
+            chunk = ids[i : i + _STATUS_BATCH_SIZE]
+            resp = self.request("GET", "/v1.0/devices", params={"device_ids": ",".join(chunk)})
+            if not (isinstance(resp, dict) and resp.get("success")):
+                logger.warning("Batch device info call failed for %s: %s", chunk, resp)
+                continue
+            result = resp.get("result") or {}
+            for entry in result.get("devices", []) if isinstance(result, dict) else result:
+                if isinstance(entry, dict) and entry.get("id"):
+                    online[entry["id"]] = bool(entry.get("online"))
+        return online
+
 
-tuya_client = TuyaClient()
\ No newline at end of file
+tuya_client = TuyaClient()
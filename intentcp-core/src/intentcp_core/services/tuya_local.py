@@ -0,0 +1,463 @@
+# src/intentcp_core/services/tuya_local.py
+from __future__ import annotations
+
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from ..config.settings import get_settings
+from .discovery import discovery_cache
+
+if TYPE_CHECKING:
+    from ..domain.devices import DeviceInfo
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────
+# Tuya LAN protocol (v3.3 / v3.4, "55AA" framing)
+# ─────────────────────────────────────────────
+
+LOCAL_PORT = 6668
+
+PREFIX = 0x000055AA
+SUFFIX = 0x0000AA55
+_HEADER = struct.Struct(">4I")  # prefix, seqno, cmd, length (payload + trailer)
+
+SESS_KEY_NEG_START = 0x03
+SESS_KEY_NEG_RESP = 0x04
+SESS_KEY_NEG_FINISH = 0x05
+CONTROL = 0x07
+STATUS = 0x08
+HEART_BEAT = 0x09
+DP_QUERY = 0x0A
+CONTROL_NEW = 0x0D
+DP_QUERY_NEW = 0x10
+
+# Commands sent without the "3.x" + 12 zero bytes version header.
+_NO_VERSION_HEADER = {DP_QUERY, DP_QUERY_NEW, HEART_BEAT, SESS_KEY_NEG_START, SESS_KEY_NEG_RESP, SESS_KEY_NEG_FINISH}
+_VERSION_HEADER_LEN = 15
+
+# Data point ids of the standard Tuya instruction sets, used when a device has
+# no `local_dps` mapping in devices.toml.
+_LIGHT_DPS = {"switch_led": 20, "work_mode": 21, "bright_value_v2": 22, "temp_value_v2": 23, "colour_data_v2": 24}
+_SWITCH_DPS = {"switch_1": 1, "switch_2": 2, "switch_3": 3, "switch_4": 4, "switch": 1}
+
+HEARTBEAT_INTERVAL = 10.0
+# After a local failure the device is served from the cloud for this long.
+FAILURE_BACKOFF = 30.0
+
+
+class LocalProtocolError(Exception):
+    pass
+
+
+def _aes(key: bytes):
+    from Crypto.Cipher import AES
+
+    return AES.new(key, AES.MODE_ECB)
+
+
+def _encrypt(key: bytes, data: bytes, pad: bool = True) -> bytes:
+    if pad:
+        n = 16 - len(data) % 16
+        data += bytes([n]) * n
+    return _aes(key).encrypt(data)
+
+
+def _decrypt(key: bytes, data: bytes) -> bytes:
+    if not data or len(data) % 16:
+        raise LocalProtocolError(f"encrypted payload has invalid length {len(data)}")
+    out = _aes(key).decrypt(data)
+    n = out[-1]
+    if not 1 <= n <= 16 or out[-n:] != bytes([n]) * n:
+        raise LocalProtocolError("bad padding (wrong local_key?)")
+    return out[:-n]
+
+
+@dataclass
+class Frame:
+    seqno: int
+    cmd: int
+    retcode: Optional[int]
+    payload: bytes
+
+
+def pack_frame(version: str, key: bytes, seqno: int, cmd: int, payload: bytes) -> bytes:
+    """Encrypt and frame `payload` the way a Tuya app does for `version`."""
+    header_tag = version.encode() + b"\0" * 12
+    if version == "3.3":
+        body = _encrypt(key, payload)
+        if cmd not in _NO_VERSION_HEADER:
+            body = header_tag + body
+        header = _HEADER.pack(PREFIX, seqno, cmd, len(body) + 8)
+        crc = binascii.crc32(header + body) & 0xFFFFFFFF
+        return header + body + struct.pack(">2I", crc, SUFFIX)
+
+    if cmd not in _NO_VERSION_HEADER:
+        payload = header_tag + payload
+    body = _encrypt(key, payload)
+    header = _HEADER.pack(PREFIX, seqno, cmd, len(body) + 36)
+    mac = hmac.new(key, header + body, hashlib.sha256).digest()
+    return header + body + mac + struct.pack(">I", SUFFIX)
+
+
+def unpack_frame(version: str, key: bytes, header: bytes, rest: bytes) -> Frame:
+    """Verify and decrypt one frame (`header` is 16 bytes, `rest` its declared length)."""
+    prefix, seqno, cmd, length = _HEADER.unpack(header)
+    if prefix != PREFIX or struct.unpack(">I", rest[-4:])[0] != SUFFIX:
+        raise LocalProtocolError("bad frame prefix/suffix")
+
+    if version == "3.3":
+        body, trailer = rest[:-8], rest[-8:-4]
+        if struct.unpack(">I", trailer)[0] != binascii.crc32(header + body) & 0xFFFFFFFF:
+            raise LocalProtocolError("CRC mismatch")
+    else:
+        body, trailer = rest[:-36], rest[-36:-4]
+        if not hmac.compare_digest(trailer, hmac.new(key, header + body, hashlib.sha256).digest()):
+            raise LocalProtocolError("HMAC mismatch (wrong local_key?)")
+
+    # Device -> app frames start with a 4-byte return code; encrypted data is
+    # block-aligned, optionally preceded by the 15-byte version header.
+    retcode = None
+    if len(body) % 16 in (3, 4):
+        retcode = struct.unpack(">I", body[:4])[0]
+        body = body[4:]
+    if body.startswith(version.encode()) and len(body) % 16 == _VERSION_HEADER_LEN:
+        body = body[_VERSION_HEADER_LEN:]
+
+    payload = _decrypt(key, body) if body else b""
+    if payload.startswith(version.encode() + b"\0"):
+        payload = payload[_VERSION_HEADER_LEN:]
+    return Frame(seqno=seqno, cmd=cmd, retcode=retcode, payload=payload)
+
+
+def _dps_of(frame: Frame) -> Optional[Dict[str, Any]]:
+    if not frame.payload:
+        return None
+    try:
+        data = json.loads(frame.payload.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    dps = data.get("dps")
+    if dps is None and isinstance(data.get("data"), dict):
+        dps = data["data"].get("dps")
+    return dps if isinstance(dps, dict) else None
+
+
+# ─────────────────────────────────────────────
+# Per-device connection
+# ─────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class LocalDeviceConfig:
+    device_id: str
+    local_key: str
+    ip: str
+    version: str = "3.3"
+    dps: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def codes_by_dp(self) -> Dict[str, str]:
+        inverse: Dict[str, str] = {}
+        for code, dp in self.dps.items():
+            inverse.setdefault(str(dp), code)
+        return inverse
+
+
+class LocalConnection:
+    """One persistent TCP session with a device; callers serialize on `lock`."""
+
+    def __init__(self, config: LocalDeviceConfig, timeout: float, on_status: Callable[[Dict[str, Any]], None]) -> None:
+        self.config = config
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+        self._timeout = timeout
+        self._on_status = on_status
+        self._sock: Optional[socket.socket] = None
+        self._key = config.local_key.encode("utf-8")
+        self._seqno = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._sock is not None
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._key = self.config.local_key.encode("utf-8")
+
+    def _open(self) -> None:
+        sock = socket.create_connection((self.config.ip, LOCAL_PORT), timeout=self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        if self.config.version == "3.4":
+            self._negotiate_session_key()
+
+    def _next_seqno(self) -> int:
+        self._seqno = (self._seqno + 1) & 0xFFFFFFFF
+        return self._seqno
+
+    def _send(self, cmd: int, payload: bytes) -> int:
+        assert self._sock is not None
+        seqno = self._next_seqno()
+        self._sock.sendall(pack_frame(self.config.version, self._key, seqno, cmd, payload))
+        return seqno
+
+    def _recv_exact(self, n: int) -> bytes:
+        assert self._sock is not None
+        buf = b""
+        while len(buf) < n:
+            chunk = self._sock.recv(n - len(buf))
+            if not chunk:
+                raise LocalProtocolError("connection closed by device")
+            buf += chunk
+        return buf
+
+    def _recv(self) -> Frame:
+        header = self._recv_exact(_HEADER.size)
+        length = _HEADER.unpack(header)[3]
+        if length > 64 * 1024:
+            raise LocalProtocolError(f"implausible frame length {length}")
+        return unpack_frame(self.config.version, self._key, header, self._recv_exact(length))
+
+    def _negotiate_session_key(self) -> None:
+        """v3.4: derive a per-connection session key from two nonces."""
+        local_nonce = os.urandom(16)
+        self._send(SESS_KEY_NEG_START, local_nonce)
+        frame = self._recv()
+        if frame.cmd != SESS_KEY_NEG_RESP or len(frame.payload) < 48:
+            raise LocalProtocolError("unexpected session key negotiation response")
+
+        remote_nonce, proof = frame.payload[:16], frame.payload[16:48]
+        if not hmac.compare_digest(proof, hmac.new(self._key, local_nonce, hashlib.sha256).digest()):
+            raise LocalProtocolError("device failed session key proof (wrong local_key?)")
+        self._send(SESS_KEY_NEG_FINISH, hmac.new(self._key, remote_nonce, hashlib.sha256).digest())
+
+        mixed = bytes(a ^ b for a, b in zip(local_nonce, remote_nonce))
+        self._key = _encrypt(self._key, mixed, pad=False)
+
+    def request(self, cmd: int, body: Dict[str, Any], want_dps: bool) -> Optional[Dict[str, Any]]:
+        """Send one command and wait for its reply; returns the reply's dps, if any.
+
+        Unsolicited STATUS frames that arrive meanwhile are reported through
+        `on_status` so the shared state cache stays current.
+        """
+        if self._sock is None:
+            self._open()
+        seqno = self._send(cmd, json.dumps(body, separators=(",", ":")).encode("utf-8"))
+        self.last_used = time.monotonic()
+
+        acked = False
+        while True:
+            frame = self._recv()
+            dps = _dps_of(frame)
+            if frame.cmd == STATUS and dps:
+                self._on_status(dps)
+            if frame.seqno == seqno:
+                if frame.retcode not in (None, 0):
+                    raise LocalProtocolError(f"device returned error code {frame.retcode}: {frame.payload[:64]!r}")
+                if not want_dps or dps is not None:
+                    return dps
+                # Some firmwares ack first and send the dps as a STATUS frame.
+                acked = True
+            elif frame.cmd == STATUS and (acked or not want_dps):
+                return dps
+
+    def heartbeat(self) -> None:
+        if self._sock is None:
+            return
+        body = {"gwId": self.config.device_id, "devId": self.config.device_id}
+        seqno = self._send(HEART_BEAT, json.dumps(body).encode("utf-8"))
+        while True:
+            frame = self._recv()
+            dps = _dps_of(frame)
+            if frame.cmd == STATUS and dps:
+                self._on_status(dps)
+            if frame.cmd == HEART_BEAT or frame.seqno == seqno:
+                self.last_used = time.monotonic()
+                return
+
+
+# ─────────────────────────────────────────────
+# Transport used by TuyaClient
+# ─────────────────────────────────────────────
+
+def _device_config(info: "DeviceInfo") -> Optional[LocalDeviceConfig]:
+    if not (info.tuya_device_id and info.local_key):
+        return None
+    found = discovery_cache.get(info.tuya_device_id) or {}
+    ip = info.local_ip or found.get("ip")
+    if not ip:
+        return None
+    version = info.local_version or (found.get("version") if found.get("version") in ("3.3", "3.4") else "3.3")
+    defaults = _LIGHT_DPS if info.supports_brightness else _SWITCH_DPS
+    return LocalDeviceConfig(
+        device_id=info.tuya_device_id,
+        local_key=info.local_key,
+        ip=ip,
+        version=version,
+        dps={**defaults, **info.local_dps},
+    )
+
+
+class TuyaLocalTransport:
+    """Talks to devices that have a `local_key` in devices.toml over the LAN.
+
+    Connections are opened on first use, kept alive with heartbeats from a
+    background thread, and dropped on any error. A device that failed is put on
+    a short backoff so TuyaClient goes straight to the cloud in the meantime.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._configs: Dict[str, LocalDeviceConfig] = {}
+        self._configs_version: Any = object()
+        self._connections: Dict[str, LocalConnection] = {}
+        self._backoff_until: Dict[str, float] = {}
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _refresh_configs(self) -> Dict[str, LocalDeviceConfig]:
+        from ..domain.devices import get_device_registry, get_registry_version
+
+        # The IP cache is part of the key: a device that moved gets a new session.
+        version = (get_registry_version(), discovery_cache.version())
+        if version != self._configs_version:
+            configs = {}
+            for info in get_device_registry().values():
+                cfg = _device_config(info)
+                if cfg is not None:
+                    configs[cfg.device_id] = cfg
+            with self._lock:
+                # Config for a device changed: its open session is stale.
+                for device_id, conn in list(self._connections.items()):
+                    if configs.get(device_id) != conn.config:
+                        conn.close()
+                        del self._connections[device_id]
+                self._configs = configs
+                self._configs_version = version
+        return self._configs
+
+    def _config(self, device_id: str) -> LocalDeviceConfig:
+        cfg = self._refresh_configs().get(device_id)
+        if cfg is None:
+            # Removed (or its key/IP dropped) by a reload since `available()`.
+            raise LocalProtocolError(f"{device_id} is not configured for local control")
+        return cfg
+
+    def available(self, device_id: str) -> bool:
+        if device_id not in self._refresh_configs():
+            return False
+        return self._backoff_until.get(device_id, 0.0) <= time.monotonic()
+
+    def _connection(self, device_id: str) -> LocalConnection:
+        with self._lock:
+            conn = self._connections.get(device_id)
+            if conn is None:
+                # Re-checked under the lock: a reload may have dropped it after `available()`.
+                cfg = self._configs.get(device_id)
+                if cfg is None:
+                    raise LocalProtocolError(f"{device_id} is not configured for local control")
+                timeout = get_settings().runtime.local_timeout
+                conn = LocalConnection(cfg, timeout, lambda dps, d=device_id: self._publish(d, dps))
+                self._connections[device_id] = conn
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="tuya-local-heartbeat", daemon=True)
+                self._heartbeat_thread.start()
+        return conn
+
+    def _publish(self, device_id: str, dps: Dict[str, Any]) -> None:
+        from .state_store import state_store
+
+        cfg = self._configs.get(device_id)
+        if cfg is None:
+            return
+        codes = cfg.codes_by_dp
+        values = {codes[dp]: v for dp, v in dps.items() if dp in codes}
+        if values:
+            state_store.put_device_state(device_id, values, source="local", merge=True)
+
+    def _call(self, device_id: str, fn: Callable[[LocalConnection], Any]) -> Any:
+        conn = self._connection(device_id)
+        with conn.lock:
+            try:
+                return fn(conn)
+            except Exception as e:
+                conn.close()
+                self._backoff_until[device_id] = time.monotonic() + FAILURE_BACKOFF
+                raise LocalProtocolError(f"{conn.config.ip}: {type(e).__name__}: {e}") from e
+
+    def send_commands(self, device_id: str, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        cfg = self._config(device_id)
+        unknown = [c["code"] for c in commands if c["code"] not in cfg.dps]
+        if unknown:
+            raise LocalProtocolError(f"no local dp id for {', '.join(unknown)} (add them to local_dps)")
+        dps = {str(cfg.dps[c["code"]]): c["value"] for c in commands}
+        now = int(time.time())
+
+        def _do(conn: LocalConnection) -> None:
+            if cfg.version == "3.3":
+                body = {"devId": device_id, "uid": device_id, "t": str(now), "dps": dps}
+                conn.request(CONTROL, body, want_dps=False)
+            else:
+                conn.request(CONTROL_NEW, {"protocol": 5, "t": now, "data": {"dps": dps}}, want_dps=False)
+
+        self._call(device_id, _do)
+        return {"success": True, "result": True, "t": now * 1000, "transport": "local"}
+
+    def get_status(self, device_id: str) -> Dict[str, Any]:
+        """Return `{code: value}` for the data points that have a known code."""
+        cfg = self._config(device_id)
+
+        def _do(conn: LocalConnection) -> Optional[Dict[str, Any]]:
+            if cfg.version == "3.3":
+                body = {"gwId": device_id, "devId": device_id, "uid": device_id, "t": str(int(time.time()))}
+                return conn.request(DP_QUERY, body, want_dps=True)
+            return conn.request(DP_QUERY_NEW, {}, want_dps=True)
+
+        dps = self._call(device_id, _do) or {}
+        codes = cfg.codes_by_dp
+        return {codes[dp]: v for dp, v in dps.items() if dp in codes}
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(HEARTBEAT_INTERVAL / 2):
+            with self._lock:
+                conns = list(self._connections.items())
+            for device_id, conn in conns:
+                if not conn.is_open or time.monotonic() - conn.last_used < HEARTBEAT_INTERVAL:
+                    continue
+                # A busy connection is alive by definition.
+                if not conn.lock.acquire(blocking=False):
+                    continue
+                try:
+                    conn.heartbeat()
+                except Exception as e:
+                    logger.info("Local session with %s dropped: %s", device_id, e)
+                    conn.close()
+                finally:
+                    conn.lock.release()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+
+
+tuya_local = TuyaLocalTransport()
@@ -1,13 +1,25 @@
 # src/intentcp_core/services/windows_agent.py
-import httpx
-from ..config.settings import settings
+from ..config.settings import get_settings
 
 
 class WindowsAgentClient:
-    def __init__(self) -> None:
-        self.base_url = settings.windows_agent.base_url.rstrip("/")
+    def __init__(self, base_url: str | None = None) -> None:
+        # Without an explicit URL, settings are read on first request so
+        # importing this module never reads settings.
+        self._base_url: str | None = base_url.rstrip("/") if base_url else None
+
+    @property
+    def base_url(self) -> str:
+        if self._base_url is None:
+            agent = get_settings().windows_agent
+            if agent is None or agent.base_url is None:
+                raise RuntimeError("windows_agent.base_url is not configured in settings.toml")
+            self._base_url = str(agent.base_url).rstrip("/")
+        return self._base_url
 
     def _post(self, path: str, json: dict | None = None):
+        import httpx
+
         url = f"{self.base_url}{path}"
         resp = httpx.post(url, json=json or {})
         resp.raise_for_status()
@@ -22,4 +34,4 @@ class WindowsAgentClient:
         return self._post("/browser/youtube", {"url": url})
 
 
-windows_agent = WindowsAgentClient()
\ No newline at end of file
+windows_agent = WindowsAgentClient()
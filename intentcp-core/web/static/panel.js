@@ -147,49 +147,264 @@
     });
   };
 
-  const bootDevices = async () => {
-    bootThemeToggle();
-    await checkHealth();
+  // Device grid: filtering and paging swap the table in place. The server
+  // answers repeat queries with 304 (ETag), so the browser cache does the rest.
+  const bootDeviceGrid = (onSwap) => {
+    const grid = $("#deviceGrid");
+    const form = $("#deviceFilter");
+    if (!grid || !form) return;
 
-    const ta = $("textarea[name='toml_text']");
-    if (ta) {
-      const initial = ta.value;
-      window.addEventListener("beforeunload", (e) => {
-        if (ta.value !== initial) {
-          e.preventDefault();
-          e.returnValue = "";
-        }
+    let seq = 0;
+    const load = async (query) => {
+      const mine = ++seq;
+      grid.classList.add("loading");
+      try {
+        const res = await fetch("/panel/devices/grid" + (query ? "?" + query : ""));
+        if (!res.ok) throw new Error("grid http " + res.status);
+        const html = await res.text();
+        if (mine !== seq) return; // a newer request won
+        grid.innerHTML = html;
+        if (onSwap) onSwap();
+        history.replaceState(null, "", "/panel/devices" + (query ? "?" + query : ""));
+      } catch (_e) {
+        if (mine === seq) window.location.href = "/panel/devices" + (query ? "?" + query : "");
+      } finally {
+        if (mine === seq) grid.classList.remove("loading");
+      }
+    };
+
+    const formQuery = () => {
+      const params = new URLSearchParams();
+      new FormData(form).forEach((v, k) => {
+        if (v && !(k === "per_page" && v === "50")) params.set(k, v);
       });
+      return params.toString();
+    };
+
+    let typing = null;
+    form.addEventListener("input", (e) => {
+      clearTimeout(typing);
+      typing = setTimeout(() => load(formQuery()), e.target.type === "search" ? 250 : 0);
+    });
+    form.addEventListener("submit", (e) => {
+      e.preventDefault();
+      load(formQuery());
+    });
+    grid.addEventListener("click", (e) => {
+      const a = e.target.closest("a[data-grid-nav]");
+      if (!a) return;
+      e.preventDefault();
+      load(new URL(a.href).search.slice(1));
+    });
+  };
+
+  const bootDeviceEditor = () => {
+    const details = $("#deviceEditor");
+    const ta = $("textarea[name='toml_text']");
+    if (!ta) return null;
+
+    let initial = ta.value;
+    const fill = async () => {
+      if (!ta.dataset.src || ta.dataset.loading) return;
+      ta.dataset.loading = "1";
+      try {
+        const res = await fetch(ta.dataset.src);
+        if (!res.ok) throw new Error("raw http " + res.status);
+        ta.value = initial = await res.text();
+        delete ta.dataset.src;
+        ta.disabled = false;
+        const save = ta.form && ta.form.querySelector("button[type='submit']");
+        if (save) save.disabled = false;
+      } catch (_e) {
+        ta.placeholder = "Could not load devices.toml — reload the page.";
+      } finally {
+        delete ta.dataset.loading;
+      }
+    };
+    if (details) {
+      details.addEventListener("toggle", () => details.open && fill());
+      if (details.open) fill();
     }
 
-    // quick action buttons
-    $$("button[data-action='tuya']").forEach((btn) => {
-      btn.addEventListener("click", async () => {
-        const device = btn.dataset.device;
-        const cmd = btn.dataset.cmd;
-        const resEl = $("#res-" + device);
-        if (resEl) resEl.textContent = "calling…";
-        btn.disabled = true;
+    // "line N" links next to validation problems select that line in the editor.
+    $$("a[data-line]").forEach((a) => {
+      a.addEventListener("click", (e) => {
+        e.preventDefault();
+        const lines = ta.value.split("\n");
+        const n = Math.min(Number(a.dataset.line), lines.length) - 1;
+        const start = lines.slice(0, n).reduce((acc, l) => acc + l.length + 1, 0);
+        ta.focus();
+        ta.setSelectionRange(start, start + lines[n].length);
+        const lineHeight = parseFloat(getComputedStyle(ta).lineHeight) || 19;
+        ta.scrollTop = Math.max(0, (n - 3) * lineHeight);
+      });
+    });
+
+    window.addEventListener("beforeunload", (e) => {
+      if (!ta.disabled && ta.value !== initial) {
+        e.preventDefault();
+        e.returnValue = "";
+      }
+    });
+    return ta;
+  };
+
+  // ------------------------------
+  // Live device controls
+  // ------------------------------
+  // Commands go out at once and the row shows the intended state right away;
+  // the state stream (/panel/devices/stream) then confirms or corrects it. A
+  // failed command rolls the row back to the last state the server reported.
+  const HOLD_MS = 1500; // ignore stream updates this long after our own command
+  const SLIDER_MS = 200; // coalesce slider moves into one call per this interval
+
+  const bootDeviceLive = () => {
+    const devices = {}; // name -> { confirmed, inflight, holdUntil, nextBrightness, timer }
+    let source = null;
+
+    const entry = (name) =>
+      (devices[name] = devices[name] || { confirmed: {}, inflight: 0, holdUntil: 0, nextBrightness: null, timer: null });
+
+    const rowOf = (name) => document.querySelector(`[data-live="${CSS.escape(name)}"]`);
+
+    const render = (name, state) => {
+      const row = rowOf(name);
+      if (!row) return;
+      const power = row.querySelector("[data-power]");
+      const powerText = row.querySelector(".live__power");
+      if (power) power.checked = state.on === true;
+      if (powerText) powerText.textContent = state.on == null ? "?" : state.on ? "on" : "off";
+      const slider = row.querySelector("[data-brightness]");
+      const brightnessText = row.querySelector(".live__brightness");
+      // Never move the slider under the user's finger.
+      if (slider && state.brightness != null && document.activeElement !== slider) slider.value = state.brightness;
+      if (brightnessText) brightnessText.textContent = state.brightness == null ? "?" : `${state.brightness}%`;
+      row.classList.toggle("live--unknown", state.on == null);
+      const d = devices[name];
+      row.classList.toggle("live--pending", !!d && (d.inflight > 0 || d.nextBrightness != null));
+    };
+
+    const message = (name, text, bad) => {
+      const el = document.getElementById("res-" + name);
+      if (!el) return;
+      el.textContent = text || "";
+      el.classList.toggle("bad", !!bad);
+    };
+
+    const send = async (name, path, optimistic) => {
+      const d = entry(name);
+      d.inflight += 1;
+      render(name, { ...d.confirmed, ...optimistic });
+      message(name, "");
+      try {
+        const r = await tryFetchJson(`/tuya/devices/${encodeURIComponent(name)}/${path}`, { method: "POST" });
+        if (!r.ok) throw new Error((r.data && r.data.detail) || `http ${r.status}`);
+        d.confirmed = { ...d.confirmed, ...optimistic };
+      } catch (e) {
+        message(name, String(e.message || e), true);
+      } finally {
+        d.inflight -= 1;
+        d.holdUntil = Date.now() + HOLD_MS;
+        if (d.nextBrightness != null && !d.timer) d.timer = setTimeout(() => flushBrightness(name), SLIDER_MS);
+        else if (d.inflight === 0) render(name, d.confirmed);
+        // Show whatever the stream confirmed during the hold once it is over.
+        setTimeout(() => {
+          if (d.inflight === 0 && d.nextBrightness == null && Date.now() >= d.holdUntil) render(name, d.confirmed);
+        }, HOLD_MS);
+      }
+    };
+
+    // Slider: one call per SLIDER_MS while dragging, always ending on the last value.
+    const flushBrightness = (name) => {
+      const d = entry(name);
+      d.timer = null;
+      if (d.nextBrightness == null || d.inflight > 0) return; // send() reschedules when done
+      const value = d.nextBrightness;
+      d.nextBrightness = null;
+      send(name, `brightness/${value}`, { brightness: value });
+    };
+
+    document.addEventListener("change", (e) => {
+      const power = e.target.closest("[data-power]");
+      if (!power) return;
+      const on = power.checked;
+      send(power.dataset.power, on ? "on" : "off", { on });
+    });
+
+    document.addEventListener("input", (e) => {
+      const slider = e.target.closest("[data-brightness]");
+      if (!slider) return;
+      const name = slider.dataset.brightness;
+      const d = entry(name);
+      d.nextBrightness = Number(slider.value);
+      const text = rowOf(name) && rowOf(name).querySelector(".live__brightness");
+      if (text) text.textContent = `${slider.value}%`;
+      if (!d.timer) d.timer = setTimeout(() => flushBrightness(name), SLIDER_MS);
+    });
 
+    const connect = () => {
+      if (source) source.close();
+      source = null;
+      const names = $$("[data-live]").map((el) => el.dataset.live);
+      if (!names.length || !window.EventSource) return;
+      // Rows start from whatever we already know (e.g. after paging back).
+      names.forEach((name) => devices[name] && render(name, devices[name].confirmed));
+      source = new EventSource("/panel/devices/stream?devices=" + encodeURIComponent(names.join(",")));
+      source.onmessage = (ev) => {
+        let msg;
         try {
-          const r = await callTuya(device, cmd);
-          const txt = r.data ? JSON.stringify(r.data) : `(http ${r.status})`;
-          if (resEl) resEl.textContent = txt;
+          msg = JSON.parse(ev.data);
         } catch (_e) {
-          if (resEl) resEl.textContent = "error";
-        } finally {
-          btn.disabled = false;
+          return;
         }
-      });
+        const { device, ...state } = msg;
+        const d = entry(device);
+        d.confirmed = state;
+        if (d.inflight === 0 && d.nextBrightness == null && Date.now() >= d.holdUntil) render(device, state);
+      };
+    };
+
+    connect();
+    return connect;
+  };
+
+  const bootDevices = async () => {
+    bootThemeToggle();
+    const reconnect = bootDeviceLive();
+    bootDeviceGrid(reconnect);
+    const ta = bootDeviceEditor();
+
+    // On/Off buttons for write-only devices (delegated: the grid is replaced when filtering)
+    document.addEventListener("click", async (e) => {
+      const btn = e.target.closest("button[data-action='tuya']");
+      if (!btn) return;
+      const device = btn.dataset.device;
+      const cmd = btn.dataset.cmd;
+      const resEl = document.getElementById("res-" + device);
+      if (resEl) resEl.textContent = "calling…";
+      btn.disabled = true;
+
+      try {
+        const r = await callTuya(device, cmd);
+        const txt = r.data ? JSON.stringify(r.data) : `(http ${r.status})`;
+        if (resEl) resEl.textContent = txt;
+      } catch (_e) {
+        if (resEl) resEl.textContent = "error";
+      } finally {
+        btn.disabled = false;
+      }
     });
 
     const hintBtn = $("#btnFormatHint");
     if (hintBtn && ta) {
-      hintBtn.addEventListener("click", () => {
+      hintBtn.addEventListener("click", (e) => {
+        e.preventDefault(); // the button sits in the editor's <summary>
         const example = `# Example devices.toml\n\n[devices.living_light]\nkind = "switch"\ntuya_on_device_id = "..."\ntuya_off_device_id = "..."\n\n[devices.subdesk_light]\nkind = "dimmer"\ntuya_device_id = "..."\n`;
         alert(example);
       });
     }
+
+    await checkHealth();
   };
 
   window.IntentCP = {